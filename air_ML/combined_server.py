@@ -8,6 +8,7 @@ import logging
 import sys
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from quart import Quart, request, jsonify
 from quart_cors import cors
@@ -34,6 +35,8 @@ HTTP_PORT = int(os.getenv('PORT', 5002))
 WS_PORT = HTTP_PORT + 1  # WebSocket port will be HTTP_PORT + 1
 DISPLAY_MODE = os.getenv('DISPLAY_MODE', 'save')
 SAVE_DIR = os.getenv('SAVE_DIR', 'frames')
+# The chatbot keeps one conversation, so turns are handled one at a time by default
+CHAT_MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', 1))
 
 # Add startup logging
 logger.info("Starting Combined Server with configuration:")
@@ -42,6 +45,7 @@ logger.info(f"HTTP PORT: {HTTP_PORT}")
 logger.info(f"WebSocket PORT: {WS_PORT}")
 logger.info(f"DISPLAY_MODE: {DISPLAY_MODE}")
 logger.info(f"SAVE_DIR: {SAVE_DIR}")
+logger.info(f"CHAT_MAX_CONCURRENCY: {CHAT_MAX_CONCURRENCY}")
 
 # Initialize database before starting server
 logger.info("Initializing database...")
@@ -60,6 +64,30 @@ app = cors(app)
 api_key = load_api_key()
 chatbot = OpenAIChatBot(api_key)
 
+# Blocking work runs off the event loop so frame ingestion never waits on it.
+# Chat turns (blocking OpenAI calls) get a bounded pool, summarization runs in
+# the background, and frames are decoded and saved on their own single thread.
+chat_executor = ThreadPoolExecutor(max_workers=CHAT_MAX_CONCURRENCY, thread_name_prefix="chat")
+summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+frame_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frames")
+summary_future = None
+
+def schedule_summarization():
+    """Start summarizing conversations in the background unless a run is already in progress."""
+    global summary_future
+    if summary_future is not None and not summary_future.done():
+        logger.info("Summarization already running, skipping")
+        return
+    summary_future = summary_executor.submit(summarize_conversations)
+    summary_future.add_done_callback(_log_summary_result)
+
+def _log_summary_result(future):
+    try:
+        summaries = future.result()
+        logger.info(f"Background summarization finished for {len(summaries or {})} persons")
+    except Exception as e:
+        logger.error(f"Background summarization failed: {e}")
+
 # Frame handler from original server.py
 class FrameHandler:
     def __init__(self, mode='save'):
@@ -82,6 +110,16 @@ class FrameHandler:
             cv2.imwrite(filename, frame)
             logger.debug(f"Saved frame to {filename}")
 
+    def decode_and_handle(self, image_b64, frame_count):
+        """Decode a base64 JPEG and handle it; returns False if it could not be decoded."""
+        image_data = base64.b64decode(image_b64)
+        np_arr = np.frombuffer(image_data, np.uint8)
+        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        if frame is None:
+            return False
+        self.handle_frame(frame, frame_count)
+        return True
+
     def cleanup(self):
         if self.mode == 'window':
             cv2.destroyAllWindows()
@@ -119,12 +157,11 @@ async def handle_websocket(websocket):
                     frame_count += 1
                     
                     try:
-                        image_data = base64.b64decode(data["image"])
-                        np_arr = np.frombuffer(image_data, np.uint8)
-                        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+                        decoded = await asyncio.get_running_loop().run_in_executor(
+                            frame_executor, frame_handler.decode_and_handle, data["image"], frame_count
+                        )
                         
-                        if frame is not None:
-                            frame_handler.handle_frame(frame, frame_count)
+                        if decoded:
                             await websocket.send(json.dumps({
                                 "type": "frame_ack",
                                 "frame_number": frame_count,
@@ -157,9 +194,9 @@ async def receive_transcription():
     
     if text.lower().strip() in ['exit', 'quit', 'bye', 'exit.', 'quit.', 'bye.']:
         response = "Goodbye! Have a great day!"
-        summarize_conversations()
+        schedule_summarization()
     else:
-        response = chatbot.respond(text)
+        response = await asyncio.get_running_loop().run_in_executor(chat_executor, chatbot.respond, text)
     
     return jsonify({
         'status': 'success',
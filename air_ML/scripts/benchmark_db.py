@@ -0,0 +1,73 @@
+"""
+Measure the per-frame database overhead of the old and the pooled access paths.
+
+Each simulated frame sets the active person and reads that person back, which
+is what the camera loop and the chatbot do. Runs against a temporary database.
+
+Usage: python scripts/benchmark_db.py [frames]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.connection import ConnectionPool
+from src.database.db_operations import DatabaseOperations
+
+PERSONS = 50
+
+def create_database(db_path):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute('''
+            CREATE TABLE persons (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT DEFAULT 'Unknown',
+                age INTEGER, gender TEXT, emotion TEXT, ethnicity TEXT, embedding BLOB
+            )
+        ''')
+        connection.execute("CREATE TABLE legacy_active_person (id INTEGER PRIMARY KEY)")
+        connection.execute("CREATE TABLE active_person (slot INTEGER PRIMARY KEY CHECK (slot = 0), id INTEGER)")
+        connection.executemany(
+            "INSERT INTO persons (age, gender, emotion, ethnicity) VALUES (?, ?, ?, ?)",
+            [(20 + i, "Man", "neutral", "asian") for i in range(PERSONS)]
+        )
+
+def legacy_frame(db_path, person_id):
+    """Connection per call and DELETE+INSERT, as before."""
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("DELETE FROM legacy_active_person")
+        connection.execute("INSERT INTO legacy_active_person (id) VALUES (?)", (person_id,))
+        connection.commit()
+    with sqlite3.connect(db_path) as connection:
+        connection.execute(
+            "SELECT id, name, age, gender, emotion, ethnicity FROM persons WHERE id = ?", (person_id,)
+        ).fetchone()
+
+def pooled_frame(db_ops, person_id):
+    db_ops.set_active_person(person_id)
+    db_ops.fetch_person_data(person_id)
+
+def run(label, frame_fn, target, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        frame_fn(target, i % PERSONS + 1)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {frames} frames in {elapsed:.3f}s, {1000 * elapsed / frames:.3f} ms/frame")
+    return elapsed
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "benchmark.db")
+        create_database(db_path)
+        legacy = run("legacy", legacy_frame, db_path, frames)
+
+        pool = ConnectionPool(db_path)
+        pooled = run("pooled", pooled_frame, DatabaseOperations(db_path, pool=pool), frames)
+        pool.close_all()
+    print(f"Speedup: {legacy / pooled:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Check that WebSocket frame ingestion keeps its throughput while chat requests are in flight.
+
+The chatbot and summarization are replaced by local stubs that block like the
+OpenAI calls do, so no API key or network access is needed.
+
+Usage: python scripts/load_test_server.py [frames] [chat_requests] [chat_latency_seconds]
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ.setdefault("PORT", "5102")
+os.environ["DISPLAY_MODE"] = "none"  # Don't write frames to disk
+
+import aiohttp
+import cv2
+import numpy as np
+import websockets
+
+import combined_server
+
+CHAT_LATENCY = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+
+def stub_respond(text):
+    time.sleep(CHAT_LATENCY)
+    return f"stub reply to: {text}"
+
+def stub_summarize():
+    time.sleep(CHAT_LATENCY)
+    return {}
+
+async def send_frames(frames):
+    """Send frames one at a time, waiting for each ack, and return frames per second."""
+    _, jpeg = cv2.imencode(".jpg", np.zeros((480, 640, 3), dtype=np.uint8))
+    message = json.dumps({"type": "image", "image": base64.b64encode(jpeg.tobytes()).decode()})
+    async with websockets.connect(f"ws://127.0.0.1:{combined_server.WS_PORT}", max_size=2**25) as websocket:
+        await websocket.recv()  # ready
+        start = time.perf_counter()
+        for _ in range(frames):
+            await websocket.send(message)
+            await websocket.recv()
+        return frames / (time.perf_counter() - start)
+
+async def send_chat(session, text):
+    async with session.post(
+        f"http://127.0.0.1:{combined_server.HTTP_PORT}/transcription",
+        json={"text": text, "timestamp": time.time()}
+    ) as response:
+        return await response.json()
+
+async def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    chat_requests = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    combined_server.chatbot.respond = stub_respond
+    combined_server.summarize_conversations = stub_summarize
+    server = asyncio.create_task(combined_server.app.run_task(host="127.0.0.1", port=combined_server.HTTP_PORT))
+    await asyncio.sleep(2)
+
+    idle_fps = await send_frames(frames)
+    async with aiohttp.ClientSession() as session:
+        chats = [asyncio.create_task(send_chat(session, f"hello {i}")) for i in range(chat_requests)]
+        chats.append(asyncio.create_task(send_chat(session, "bye")))
+        await asyncio.sleep(0.1)
+        loaded_fps = await send_frames(frames)
+        await asyncio.gather(*chats)
+
+    print(f"Frame throughput idle:           {idle_fps:.1f} fps")
+    print(f"Frame throughput with chat load: {loaded_fps:.1f} fps "
+          f"({chat_requests} requests x {CHAT_LATENCY}s stub latency)")
+    server.cancel()
+
+if __name__ == "__main__":
+    asyncio.run(main())
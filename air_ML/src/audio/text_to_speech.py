@@ -1,23 +1,42 @@
-import os
-import pygame
-from gtts import gTTS
+import threading
+from src.config.settings import TTS_ENGINES, TTS_PIPER_MODEL, TTS_CACHE_DIR, TTS_MEMORY_CLIPS, TTS_JAW_SERIAL_PORT
+from src.audio.tts_service import TTSService, JawController, create_engine
+
+# Spoken often enough to synthesize at startup
+COMMON_PHRASES = [
+    "Hello!",
+    "Goodbye! Have a great day!",
+]
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_tts_service():
+    """Return the shared TTS service, creating it and preloading common phrases on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            engines = []
+            for name in TTS_ENGINES:
+                try:
+                    engines.append(create_engine(name, model_path=TTS_PIPER_MODEL) if name == "piper" else create_engine(name))
+                except ValueError as e:
+                    print(f"[WARNING] Skipping TTS engine: {e}")
+            jaw = None
+            if TTS_JAW_SERIAL_PORT:
+                try:
+                    jaw = JawController.connect(TTS_JAW_SERIAL_PORT)
+                except Exception as e:
+                    print(f"[WARNING] Jaw not connected on {TTS_JAW_SERIAL_PORT}: {e}")
+            _service = TTSService(engines, TTS_CACHE_DIR, memory_clips=TTS_MEMORY_CLIPS, jaw=jaw)
+            _service.preload(COMMON_PHRASES)
+        return _service
 
 def speak(text):
     """
-    Convert text to speech using gTTS and play the output audio.
+    Convert text to speech and play it, reusing cached audio for repeated phrases.
     """
     try:
-        tts = gTTS(text=text, lang='en')
-        audio_file = "response.mp3"
-        tts.save(audio_file)
-
-        pygame.mixer.init()
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            continue
-
-        pygame.mixer.quit()
-        os.remove(audio_file)
+        get_tts_service().speak(text)
     except Exception as e:
         print(f"[ERROR] Failed to generate speech: {e}")
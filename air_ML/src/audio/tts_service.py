@@ -0,0 +1,336 @@
+"""
+Text-to-speech with a content-addressed clip cache and jaw-synced playback.
+
+Synthesized audio is stored on disk under a hash of engine, voice and text,
+together with its amplitude envelope and the jaw open/close segments derived
+from it, so a repeated phrase skips synthesis and analysis entirely. Decoded
+clips are also kept in memory and played from there.
+
+This module only depends on pygame and numpy (plus the chosen engine), so
+the Arduino scripts in air_hardware import it by path.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import pygame
+
+ENVELOPE_FRAME_SECONDS = 0.02  # One envelope value per 20 ms of audio
+JAW_OPEN_THRESHOLD = 0.35  # Normalized envelope level that opens the jaw
+JAW_CLOSE_THRESHOLD = 0.2  # Lower close level so the jaw doesn't chatter around one value
+JAW_MIN_SEGMENT_SECONDS = 0.08  # The servo can't follow anything shorter
+GTTS_TIMEOUT_SECONDS = 3.0  # Give up on Google TTS quickly when the network is down
+GTTS_RETRY_SECONDS = 60.0  # After a failed request, skip gTTS this long
+
+class GTTSEngine:
+    """
+    Google TTS; needs network access, returns mp3.
+
+    Requests time out after `timeout` seconds, and after a failure the engine
+    refuses for `retry_after` seconds, so offline every new phrase goes
+    straight to the next engine instead of waiting on the network.
+    """
+    name = "gtts"
+    extension = "mp3"
+
+    def __init__(self, lang="en", tld="com", timeout=GTTS_TIMEOUT_SECONDS, retry_after=GTTS_RETRY_SECONDS):
+        self.voice = f"{lang}-{tld}"
+        self.lang = lang
+        self.tld = tld
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._unavailable_until = 0.0
+
+    def synthesize(self, text):
+        if time.monotonic() < self._unavailable_until:
+            raise RuntimeError("gTTS failed recently, not retrying yet")
+        try:
+            from gtts import gTTS
+            buffer = io.BytesIO()
+            gTTS(text=text, lang=self.lang, tld=self.tld, slow=False, timeout=self.timeout).write_to_fp(buffer)
+        except Exception:
+            self._unavailable_until = time.monotonic() + self.retry_after
+            raise
+        return buffer.getvalue()
+
+class EspeakEngine:
+    """espeak-ng (or espeak) subprocess; offline, returns wav."""
+    name = "espeak"
+    extension = "wav"
+
+    def __init__(self, voice="en", rate=165):
+        self.voice = f"{voice}-{rate}"
+        self.espeak_voice = voice
+        self.rate = rate
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    def synthesize(self, text):
+        if not self.binary:
+            raise RuntimeError("espeak-ng is not installed")
+        result = subprocess.run(
+            [self.binary, "--stdout", "-v", self.espeak_voice, "-s", str(self.rate), text],
+            capture_output=True, check=True
+        )
+        return result.stdout
+
+class PiperEngine:
+    """Piper neural TTS subprocess; offline, returns wav."""
+    name = "piper"
+    extension = "wav"
+
+    def __init__(self, model_path):
+        if not model_path:
+            raise ValueError("Piper needs a voice model path")
+        self.voice = os.path.basename(model_path)
+        self.model_path = model_path
+        self.binary = shutil.which("piper")
+
+    def synthesize(self, text):
+        if not self.binary:
+            raise RuntimeError("piper is not installed")
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            subprocess.run(
+                [self.binary, "--model", self.model_path, "--output_file", path],
+                input=text.encode("utf-8"), capture_output=True, check=True
+            )
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+ENGINES = {"gtts": GTTSEngine, "espeak": EspeakEngine, "piper": PiperEngine}
+
+def create_engine(name, **options):
+    """Build a TTS engine by name ("gtts", "espeak" or "piper")."""
+    try:
+        return ENGINES[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown TTS engine: {name}") from None
+
+def amplitude_envelope(samples, sample_rate, frame_seconds=ENVELOPE_FRAME_SECONDS):
+    """
+    RMS amplitude per frame, normalized to 0..1.
+    :param samples: Audio samples, shape (n,) or (n, channels).
+    :param sample_rate: Samples per second.
+    :return: One float32 value per frame_seconds of audio.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    frame = max(1, int(sample_rate * frame_seconds))
+    count = len(samples) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    rms = np.sqrt(np.mean(samples[:count * frame].reshape(count, frame) ** 2, axis=1))
+    peak = np.percentile(rms, 95)  # Ignore a few clipped frames when normalizing
+    return np.clip(rms / peak, 0.0, 1.0) if peak > 0 else rms
+
+def jaw_segments(envelope, frame_seconds=ENVELOPE_FRAME_SECONDS, open_threshold=JAW_OPEN_THRESHOLD,
+                 close_threshold=JAW_CLOSE_THRESHOLD, min_seconds=JAW_MIN_SEGMENT_SECONDS):
+    """
+    Turn an envelope into (open_time, close_time) pairs in seconds.
+
+    Uses hysteresis between the two thresholds, then merges pauses and drops
+    openings shorter than the servo can follow.
+    """
+    segments = []
+    start = None
+    for index, level in enumerate(envelope):
+        if start is None and level >= open_threshold:
+            start = index
+        elif start is not None and level < close_threshold:
+            segments.append([start * frame_seconds, index * frame_seconds])
+            start = None
+    if start is not None:
+        segments.append([start * frame_seconds, len(envelope) * frame_seconds])
+
+    merged = []
+    for segment in segments:
+        if merged and segment[0] - merged[-1][1] < min_seconds:
+            merged[-1][1] = segment[1]
+        else:
+            merged.append(segment)
+    return [(round(a, 3), round(b, 3)) for a, b in merged if b - a >= min_seconds]
+
+@dataclass
+class Clip:
+    sound: pygame.mixer.Sound
+    duration: float
+    segments: List[Tuple[float, float]]
+
+class JawController:
+    """
+    Opens and closes the jaw over serial.
+
+    Sends 'o'/'c' for envelope-timed movement, which needs the jaw sketch in
+    air_hardware/arduino/jaw; with legacy=True it sends the older 's'/'e'
+    start/stop commands around each opening instead.
+    """
+
+    def __init__(self, serial_port, legacy=False):
+        self.serial = serial_port
+        self.open_command, self.close_command = (b's', b'e') if legacy else (b'o', b'c')
+
+    @classmethod
+    def connect(cls, port, baudrate=9600, legacy=False):
+        import serial
+        connection = serial.Serial(port, baudrate)
+        time.sleep(2)  # The Arduino resets when the port opens
+        return cls(connection, legacy=legacy)
+
+    def open(self):
+        self.serial.write(self.open_command)
+
+    def close(self):
+        self.serial.write(self.close_command)
+
+class TTSService:
+    """
+    Synthesizes, caches and plays speech.
+
+    Engines are tried in order, so an offline engine after gTTS keeps the robot
+    talking without network access. Clips are looked up in memory, then on
+    disk, and only synthesized on a miss.
+    """
+
+    def __init__(self, engines, cache_dir, memory_clips=64, jaw=None):
+        self.engines = list(engines)
+        self.cache_dir = cache_dir
+        self.memory_clips = memory_clips
+        self.jaw = jaw
+        self._clips = OrderedDict()
+        self._lock = threading.Lock()
+        self._play_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _ensure_mixer():
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
+    @staticmethod
+    def cache_key(engine, text):
+        """Content address of a clip: engine, voice and normalized text."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{engine.name}|{engine.voice}|{normalized}".encode("utf-8")).hexdigest()
+
+    def _paths(self, engine, key):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.{engine.extension}", f"{base}.json"
+
+    def _remember(self, key, clip):
+        with self._lock:
+            self._clips[key] = clip
+            self._clips.move_to_end(key)
+            while len(self._clips) > self.memory_clips:
+                self._clips.popitem(last=False)
+
+    def _load_from_disk(self, engine, key):
+        audio_path, meta_path = self._paths(engine, key)
+        if not (os.path.exists(audio_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(audio_path, "rb") as f:
+                sound = pygame.mixer.Sound(file=io.BytesIO(f.read()))
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            return Clip(sound, meta["duration"], [tuple(s) for s in meta["segments"]])
+        except (OSError, ValueError, KeyError, pygame.error) as e:
+            print(f"[WARNING] Ignoring unreadable cached clip {key}: {e}")
+            return None
+
+    def _synthesize(self, engine, key, text):
+        audio = engine.synthesize(text)
+        sound = pygame.mixer.Sound(file=io.BytesIO(audio))
+        sample_rate = pygame.mixer.get_init()[0]
+        envelope = amplitude_envelope(pygame.sndarray.array(sound), sample_rate)
+        clip = Clip(sound, sound.get_length(), jaw_segments(envelope))
+
+        # Metadata goes last and each file is replaced atomically, so a crash never leaves a half clip
+        audio_path, meta_path = self._paths(engine, key)
+        for path, data in (
+            (audio_path, audio),
+            (meta_path, json.dumps({
+                "text": text, "engine": engine.name, "voice": engine.voice, "duration": clip.duration,
+                "frame_seconds": ENVELOPE_FRAME_SECONDS, "envelope": [round(float(v), 3) for v in envelope],
+                "segments": clip.segments
+            }).encode("utf-8"))
+        ):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return clip
+
+    def get_clip(self, text):
+        """Return the clip for text, synthesizing it only if no engine has it cached."""
+        self._ensure_mixer()
+        keys = [(engine, self.cache_key(engine, text)) for engine in self.engines]
+        with self._lock:
+            for _, key in keys:
+                if key in self._clips:
+                    self._clips.move_to_end(key)
+                    return self._clips[key]
+        for engine, key in keys:
+            clip = self._load_from_disk(engine, key)
+            if clip:
+                self._remember(key, clip)
+                return clip
+
+        errors = []
+        for engine, key in keys:
+            try:
+                clip = self._synthesize(engine, key, text)
+            except Exception as e:
+                errors.append(f"{engine.name}: {e}")
+                continue
+            self._remember(key, clip)
+            return clip
+        raise RuntimeError("All TTS engines failed (" + "; ".join(errors) + ")")
+
+    def preload(self, phrases):
+        """Synthesize phrases ahead of time in a background thread."""
+        def run():
+            for phrase in phrases:
+                try:
+                    self.get_clip(phrase)
+                except Exception as e:
+                    print(f"[WARNING] Could not preload '{phrase}': {e}")
+        thread = threading.Thread(target=run, name="tts-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def play(self, clip):
+        """Play a clip, moving the jaw along its segments, and return when it ends."""
+        with self._play_lock:
+            clip.sound.play()
+            start = time.monotonic()
+            if self.jaw:
+                for open_at, close_at in clip.segments:
+                    self._sleep_until(start + open_at)
+                    self.jaw.open()
+                    self._sleep_until(start + close_at)
+                    self.jaw.close()
+            self._sleep_until(start + clip.duration)
+
+    @staticmethod
+    def _sleep_until(deadline):
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def speak(self, text):
+        """Synthesize (or fetch) text and play it."""
+        self.play(self.get_clip(text))
@@ -2,6 +2,28 @@ from .settings import (
     DATABASE_PATH,
     DATA_DIR,
     PROJECT_ROOT,
+    SUMMARY_MAX_WORKERS,
+    SUMMARY_TOKEN_BUDGET,
+    SUMMARY_RECENT_COUNT,
+    SUMMARY_MIN_RELEVANCE,
+    CHAT_HISTORY_MAX_TOKENS,
+    CONVERSATION_FLUSH_INTERVAL_MS,
+    CONVERSATION_FLUSH_BATCH_SIZE,
+    VISION_BATCH_INFERENCE,
+    VISION_BATCH_WINDOW_MS,
+    VISION_MAX_BATCH_SIZE,
+    VISION_ATTRIBUTE_TTL_SECONDS,
+    VISION_EMOTION_TTL_SECONDS,
+    TRACK_DETECT_EVERY_N_FRAMES,
+    TRACK_IOU_THRESHOLD,
+    TRACK_MIN_CONFIDENCE,
+    TRACK_CONFIDENCE_DECAY,
+    TRACK_MIN_PSR,
+    TTS_ENGINES,
+    TTS_PIPER_MODEL,
+    TTS_CACHE_DIR,
+    TTS_MEMORY_CLIPS,
+    TTS_JAW_SERIAL_PORT,
     load_api_key,
     load_porcupine_api_key
 )
@@ -10,6 +32,28 @@ __all__ = [
     'DATABASE_PATH',
     'DATA_DIR',
     'PROJECT_ROOT',
+    'SUMMARY_MAX_WORKERS',
+    'SUMMARY_TOKEN_BUDGET',
+    'SUMMARY_RECENT_COUNT',
+    'SUMMARY_MIN_RELEVANCE',
+    'CHAT_HISTORY_MAX_TOKENS',
+    'CONVERSATION_FLUSH_INTERVAL_MS',
+    'CONVERSATION_FLUSH_BATCH_SIZE',
+    'VISION_BATCH_INFERENCE',
+    'VISION_BATCH_WINDOW_MS',
+    'VISION_MAX_BATCH_SIZE',
+    'VISION_ATTRIBUTE_TTL_SECONDS',
+    'VISION_EMOTION_TTL_SECONDS',
+    'TRACK_DETECT_EVERY_N_FRAMES',
+    'TRACK_IOU_THRESHOLD',
+    'TRACK_MIN_CONFIDENCE',
+    'TRACK_CONFIDENCE_DECAY',
+    'TRACK_MIN_PSR',
+    'TTS_ENGINES',
+    'TTS_PIPER_MODEL',
+    'TTS_CACHE_DIR',
+    'TTS_MEMORY_CLIPS',
+    'TTS_JAW_SERIAL_PORT',
     'load_api_key',
     'load_porcupine_api_key'
 ]
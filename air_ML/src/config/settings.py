@@ -10,6 +10,39 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 DATABASE_PATH = os.path.join(DATA_DIR, 'database.db')
 
+# Conversation summarization
+SUMMARY_MAX_WORKERS = int(os.getenv('SUMMARY_MAX_WORKERS', '4'))  # Persons summarized in parallel
+SUMMARY_TOKEN_BUDGET = int(os.getenv('SUMMARY_TOKEN_BUDGET', '800'))  # Past-conversation context per prompt
+SUMMARY_RECENT_COUNT = int(os.getenv('SUMMARY_RECENT_COUNT', '3'))  # Recent summaries kept in full
+SUMMARY_MIN_RELEVANCE = float(os.getenv('SUMMARY_MIN_RELEVANCE', '0.3'))  # Min similarity for older summaries
+SUMMARY_EMBEDDING_MODEL = os.getenv('SUMMARY_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')  # sentence-transformers model
+
+# Chat context and message persistence
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv('CHAT_HISTORY_MAX_TOKENS', '2000'))  # Older turns are summarized away
+CONVERSATION_FLUSH_INTERVAL_MS = float(os.getenv('CONVERSATION_FLUSH_INTERVAL_MS', '500'))  # Message write batching
+CONVERSATION_FLUSH_BATCH_SIZE = int(os.getenv('CONVERSATION_FLUSH_BATCH_SIZE', '32'))
+
+# Face inference service
+VISION_BATCH_INFERENCE = os.getenv('VISION_BATCH_INFERENCE', 'true').lower() == 'true'  # Direct batched forward passes
+VISION_BATCH_WINDOW_MS = float(os.getenv('VISION_BATCH_WINDOW_MS', '20'))  # How long to collect faces into one batch
+VISION_MAX_BATCH_SIZE = int(os.getenv('VISION_MAX_BATCH_SIZE', '16'))
+VISION_ATTRIBUTE_TTL_SECONDS = float(os.getenv('VISION_ATTRIBUTE_TTL_SECONDS', '600'))  # Age/gender/race per identity
+VISION_EMOTION_TTL_SECONDS = float(os.getenv('VISION_EMOTION_TTL_SECONDS', '5'))  # Emotion changes quickly
+
+# Face tracking between detections
+TRACK_DETECT_EVERY_N_FRAMES = int(os.getenv('TRACK_DETECT_EVERY_N_FRAMES', '5'))  # Track with correlation in between
+TRACK_IOU_THRESHOLD = float(os.getenv('TRACK_IOU_THRESHOLD', '0.3'))  # Min IoU to match a detection to a track
+TRACK_MIN_CONFIDENCE = float(os.getenv('TRACK_MIN_CONFIDENCE', '0.5'))  # Re-identify a track below this
+TRACK_CONFIDENCE_DECAY = float(os.getenv('TRACK_CONFIDENCE_DECAY', '0.98'))  # Per tracked frame
+TRACK_MIN_PSR = float(os.getenv('TRACK_MIN_PSR', '7'))  # Correlation tracker quality below which a track is lost
+
+# Text-to-speech
+TTS_ENGINES = [e.strip() for e in os.getenv('TTS_ENGINES', 'gtts,espeak').split(',') if e.strip()]  # Tried in order
+TTS_PIPER_MODEL = os.getenv('TTS_PIPER_MODEL', '')  # Voice model (.onnx) when piper is one of the engines
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join(DATA_DIR, 'tts_cache'))  # Content-addressed clips
+TTS_MEMORY_CLIPS = int(os.getenv('TTS_MEMORY_CLIPS', '64'))  # Decoded clips kept in memory
+TTS_JAW_SERIAL_PORT = os.getenv('TTS_JAW_SERIAL_PORT', '')  # Arduino jaw; empty disables jaw movement
+
 # Create necessary directories
 os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -1,8 +1,9 @@
 import openai
 from src.database.active_person import get_active_person_id
 from src.database.db_operations import db_ops
-from src.database.interaction_logs import save_conversation
-from src.conversation.summary import get_conversation_summary
+from src.database.interaction_logs import conversation_writer
+from src.conversation.context import ConversationContext
+from src.conversation.summary import get_conversation_summary, generate_rolling_summary
 from src.services.memory_service import memory_service
 from src.services.attribute_service import extract_and_update_person_attributes
 
@@ -11,29 +12,27 @@ class OpenAIChatBot:
         self.api_key = api_key
         openai.api_key = self.api_key
         conversation_summary = get_conversation_summary()  # Fetch saved summary
-        self.conversation_history = [
-            {
-                "role": "system",
-                "content": (
-                    "Your name is AIR. You are a friendly and intelligent humanoid robot. "
-                    "You should behave like a real person and never reveal you are a robot. "
-                    "You are 1 year old and Pakistani. Your goal is to engage in natural, human-like conversations."
-                    "\n\nYou must always remember past user interactions."
-                    " If you have information about a user's name, age, or ethnicity, you must acknowledge it and use it in responses."
-                    "\n\nIf a user shares their name, age, or ethnicity, you **MUST** respond in the following exact format, strictly on separate lines:\n"
-                    "NAME=<Name>\nAGE=<Age>\nETHNICITY=<Ethnicity>\n"
-                    "Example:\n"
-                    "NAME=Ali\n"
-                    "\n\n" + conversation_summary  # ✅ Attach stored conversation summary
-                ),
-            }
-        ]
+        # One system prompt slot plus a token-bounded window of recent turns
+        self.context = ConversationContext(
+            base_prompt=(
+                "Your name is AIR. You are a friendly and intelligent humanoid robot. "
+                "You should behave like a real person and never reveal you are a robot. "
+                "You are 1 year old and Pakistani. Your goal is to engage in natural, human-like conversations."
+                "\n\nYou must always remember past user interactions."
+                " If you have information about a user's name, age, or ethnicity, you must acknowledge it and use it in responses."
+                "\n\nIf a user shares their name, age, or ethnicity, you **MUST** respond in the following exact format, strictly on separate lines:\n"
+                "NAME=<Name>\nAGE=<Age>\nETHNICITY=<Ethnicity>\n"
+                "Example:\n"
+                "NAME=Ali\n"
+            ),
+            long_term_summary=conversation_summary,  # ✅ Attach stored conversation summary
+            summarize_fn=generate_rolling_summary
+        )
 
     def respond(self, user_input):
         """
         Process user input and generate a response. Update the database if necessary.
         """
-        self.conversation_history.append({"role": "user", "content": user_input})
         active_person_id = get_active_person_id()
 
         # ✅ Step 1: Detect if the active person has changed
@@ -44,8 +43,9 @@ class OpenAIChatBot:
             memory_service.update_memory("last_active_id", active_person_id)
             memory_service.clear_memory(active_person_id)
 
+        person_context = ""
         if active_person_id:
-            save_conversation(active_person_id, user_input, "user")
+            conversation_writer.save(active_person_id, user_input, "user")
 
             person_data = memory_service.get_from_memory(active_person_id)
             if not person_data:
@@ -60,29 +60,28 @@ class OpenAIChatBot:
                     f"{person_data.age} years old, and {person_data.ethnicity}."
                 )
                 print(f"[DEBUG] Sending This Memory to OpenAI: {user_intro}")
-                self.conversation_history.append({"role": "system", "content": user_intro})
-
-                self.conversation_history.append({
-                    "role": "system",
-                    "content": (
-                        f"The user is {person_data.name}, "
-                        f"{person_data.age} years old, and {person_data.ethnicity}."
-                        " Do not ask for this information again."
-                    )
-                })
+                person_context = (
+                    f"{user_intro}\n"
+                    f"The user is {person_data.name}, "
+                    f"{person_data.age} years old, and {person_data.ethnicity}."
+                    " Do not ask for this information again."
+                )
 
-                user_input = f"My name is {person_data.name}. {user_input}"
+        # Replace, rather than append, the person facts and relevant past summaries in the system prompt
+        self.context.set_person_context(person_context)
+        self.context.set_long_term_summary(get_conversation_summary(active_person_id, user_input))
+        self.context.add_message("user", user_input)
 
         try:
             response = openai.ChatCompletion.create(
                 model="gpt-4o-mini",
-                messages=self.conversation_history
+                messages=self.context.build_messages()
             )
             assistant_reply = response['choices'][0]['message']['content']
-            self.conversation_history.append({"role": "assistant", "content": assistant_reply})
+            self.context.add_message("assistant", assistant_reply)
 
             if active_person_id:
-                save_conversation(active_person_id, assistant_reply, "bot")
+                conversation_writer.save(active_person_id, assistant_reply, "bot")
 
             # Update person attributes if found in reply
             extract_and_update_person_attributes(active_person_id, assistant_reply)
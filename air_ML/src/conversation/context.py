@@ -0,0 +1,119 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from src.config.settings import CHAT_HISTORY_MAX_TOKENS
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")  # gpt-4o tokenizer
+except Exception:
+    _encoding = None
+
+# Role/formatting tokens OpenAI adds around every chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally, estimating from length when tiktoken is unavailable."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+class ConversationContext:
+    """
+    Builds the message list sent to the chat model.
+
+    The system prompt is a single slot that is rebuilt, never appended to,
+    when the person context changes. Turns are kept in a sliding window
+    bounded by max_history_tokens; turns that fall out of it are folded into
+    a running summary on a background thread, so the request size stays
+    roughly constant however long the session runs.
+    """
+
+    def __init__(self, base_prompt: str, long_term_summary: str = "",
+                 max_history_tokens: int = CHAT_HISTORY_MAX_TOKENS,
+                 summarize_fn: Optional[Callable[[str, List[Dict]], str]] = None):
+        self.base_prompt = base_prompt
+        self.long_term_summary = long_term_summary
+        self.person_context = ""
+        self.running_summary = ""
+        self.max_history_tokens = max_history_tokens
+        self.summarize_fn = summarize_fn
+        self.turns = deque()  # (message, token count)
+        self.history_tokens = 0
+        self._evicted: List[Dict] = []
+        self._summarizing = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rolling-summary")
+
+    def set_long_term_summary(self, long_term_summary: str) -> None:
+        """Replace the past-conversation context in the system prompt."""
+        with self._lock:
+            self.long_term_summary = long_term_summary
+
+    def set_person_context(self, person_context: str) -> None:
+        """Replace the facts about the current person in the system prompt."""
+        with self._lock:
+            self.person_context = person_context
+
+    def add_message(self, role: str, content: str) -> None:
+        """Append a message and trim the window back under the token budget."""
+        message = {"role": role, "content": content}
+        with self._lock:
+            tokens = count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+            self.turns.append((message, tokens))
+            self.history_tokens += tokens
+            self._trim()
+
+    def build_messages(self) -> List[Dict]:
+        """The system prompt followed by the turns in the window."""
+        with self._lock:
+            return [{"role": "system", "content": self._system_prompt()}] + [message for message, _ in self.turns]
+
+    def _system_prompt(self) -> str:
+        sections = [self.base_prompt, self.long_term_summary]
+        if self.running_summary:
+            sections.append(f"Earlier in this conversation:\n{self.running_summary}")
+        if self.person_context:
+            sections.append(self.person_context)
+        return "\n\n".join(section for section in sections if section)
+
+    def _trim(self) -> None:
+        """Evict the oldest turns over budget, always keeping the newest message. Caller holds the lock."""
+        evicted = []
+        while self.history_tokens > self.max_history_tokens and len(self.turns) > 1:
+            message, tokens = self.turns.popleft()
+            self.history_tokens -= tokens
+            evicted.append(message)
+            # Don't leave an assistant reply at the front without the user message it answered
+            if message["role"] == "user" and len(self.turns) > 1 and self.turns[0][0]["role"] == "assistant":
+                message, tokens = self.turns.popleft()
+                self.history_tokens -= tokens
+                evicted.append(message)
+        if evicted:
+            print(f"[DEBUG] Evicted {len(evicted)} messages from the chat context")
+            self._evicted.extend(evicted)
+            if self.summarize_fn and not self._summarizing:
+                self._summarizing = True
+                self._executor.submit(self._summarize_evicted)
+
+    def _summarize_evicted(self) -> None:
+        """Fold evicted turns into the running summary until none are left."""
+        while True:
+            with self._lock:
+                evicted, self._evicted = self._evicted, []
+                previous_summary = self.running_summary
+                if not evicted:
+                    self._summarizing = False
+                    return
+            try:
+                summary = self.summarize_fn(previous_summary, evicted)
+            except Exception as e:
+                print(f"Error updating running summary: {e}")
+                with self._lock:
+                    # Keep the turns for the next attempt
+                    self._evicted = evicted + self._evicted
+                    self._summarizing = False
+                return
+            with self._lock:
+                self.running_summary = summary
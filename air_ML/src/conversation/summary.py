@@ -1,50 +1,42 @@
 import openai
 import sqlite3
-from src.config.settings import DATABASE_PATH
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.config.settings import DATABASE_PATH, SUMMARY_MAX_WORKERS
+from src.database.interaction_logs import conversation_writer
+from src.conversation.summary_store import summary_retriever
 
-def get_conversation_summary():
+def get_conversation_summary(person_id=None, query=None):
     """
-    Fetch all conversation summaries from the 'conversation_summaries' table.
+    Fetch the past-conversation context for a prompt.
+    Recent summaries are included in full, older ones through a condensed digest
+    and by relevance to the query, within SUMMARY_TOKEN_BUDGET tokens.
     """
-    connection = sqlite3.connect(DATABASE_PATH)
-    cursor = connection.cursor()
-
-    # ✅ Retrieve all stored summaries, ordered by end_time (oldest first)
-    cursor.execute("""
-        SELECT summary FROM conversation_summaries 
-        WHERE summary LIKE '**Summary%' 
-        ORDER BY end_time ASC
-    """)
-    results = cursor.fetchall()
-    connection.close()
-
-    if results:
-        summaries = "\n\n".join([f"{i+1}. {row[0]}" for i, row in enumerate(results)])
-        return f"Summary of past conversations:\n{summaries}"
-    return "No conversation summaries available."
+    return summary_retriever.build_context(person_id, query)
 
 def fetch_conversation_from_db():
     """
     Fetch conversation history from the database for all persons.
-    :return: Dictionary with person_id as keys and list of conversation messages as values.
+    :return: Dictionary with person_id as keys and list of conversation messages as values,
+             with the id of the last fetched row as "last_id".
     """
     connection = sqlite3.connect(DATABASE_PATH)
     cursor = connection.cursor()
     try:
         cursor.execute(
-            "SELECT person_id, message, role, timestamp FROM conversations ORDER BY timestamp"
+            "SELECT id, person_id, message, role, timestamp FROM conversations ORDER BY timestamp, id"
         )
         conversation_data = cursor.fetchall()
         conversations = {}
         role_mapping = {"user": "user", "bot": "assistant"}  # Map 'bot' to 'assistant'
 
-        for person_id, message, role, timestamp in conversation_data:
+        for row_id, person_id, message, role, timestamp in conversation_data:
             if person_id not in conversations:
-                conversations[person_id] = {"messages": [], "start_time": timestamp, "end_time": timestamp}
+                conversations[person_id] = {"messages": [], "start_time": timestamp, "end_time": timestamp, "last_id": row_id}
             
             mapped_role = role_mapping.get(role.lower(), "user")  # Default to 'user' if unknown
             conversations[person_id]["messages"].append({"role": mapped_role, "content": message})
             conversations[person_id]["end_time"] = timestamp
+            conversations[person_id]["last_id"] = max(conversations[person_id]["last_id"], row_id)
         return conversations
     finally:
         connection.close()
@@ -71,14 +63,18 @@ def save_summary_to_db(person_ids, summary, start_time, end_time):
     finally:
         connection.close()
 
-def delete_conversation_from_db(person_id):
+def delete_conversation_from_db(person_id, last_id=None):
     """
     Delete conversation history from the database for the given person ID.
+    :param last_id: Only delete rows up to this id, so messages saved after they were fetched are kept.
     """
     connection = sqlite3.connect(DATABASE_PATH)
     cursor = connection.cursor()
     try:
-        cursor.execute("DELETE FROM conversations WHERE person_id = ?", (person_id,))
+        if last_id is None:
+            cursor.execute("DELETE FROM conversations WHERE person_id = ?", (person_id,))
+        else:
+            cursor.execute("DELETE FROM conversations WHERE person_id = ? AND id <= ?", (person_id, last_id))
         connection.commit()
         print(f"Deleted conversation history for person ID {person_id}")
     except Exception as e:
@@ -86,52 +82,101 @@ def delete_conversation_from_db(person_id):
     finally:
         connection.close()
 
-def summarize_conversations():
+SUMMARY_PROMPT = (
+    "Summarize the following conversation in a concise and meaningful way. "
+    "The summary should include:\n"
+    "1. All users involved in the conversation (mention names, or IDs if names are not available).\n"
+    "2. The purpose or key topics of the conversation, including any heated or debated subjects.\n"
+    "3. Any conclusions or decisions made during the conversation.\n"
+    "4. Notable information about users, such as:\n"
+    "   - Names, relationships, education, work, hobbies, interests, or ideas.\n"
+    "   - Anything deeply personal or relevant to the user (e.g., allergies, family member names, business, or places they discussed).\n"
+    "5. Any information requested to be remembered for future reference.\n"
+    "6. Anything that could be helpful or important in the future.\n"
+    "7. Any introductions made (e.g., user names or identities revealed).\n"
+    "8. Key first-time actions (e.g., a user introducing themselves or sharing personal details).\n"
+    "9. Skip generic conversational exchanges like greetings, pleasantries, or irrelevant back-and-forth.\n"
+    "10. Use a simple format, e.g., '<Name> introduces himself for the first time.'\n\n"
+    "Ensure the summary is concise but captures all essential points and key aspects of the conversation.\n"
+)
+
+def generate_summary(messages):
+    """
+    Summarize one person's conversation messages with the OpenAI API.
+    :param messages: List of {"role", "content"} message dictionaries.
+    :return: Summary text.
+    """
+    response = openai.ChatCompletion.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "system", "content": SUMMARY_PROMPT}] + messages
+    )
+    return response['choices'][0]['message']['content'].strip()
+
+ROLLING_SUMMARY_PROMPT = (
+    "You maintain a running summary of an ongoing conversation. "
+    "Update the existing summary with the new messages below. Keep names, personal details, "
+    "requests to remember something and open topics; drop greetings and small talk. "
+    "Reply with the updated summary only, in at most 150 words.\n"
+)
+
+def generate_rolling_summary(previous_summary, messages):
+    """
+    Fold messages that left the context window into the running summary.
+    :param previous_summary: Current running summary, possibly empty.
+    :param messages: List of {"role", "content"} message dictionaries.
+    :return: Updated summary text.
+    """
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = openai.ChatCompletion.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": ROLLING_SUMMARY_PROMPT},
+            {"role": "user", "content": f"Existing summary:\n{previous_summary or 'None'}\n\nNew messages:\n{transcript}"}
+        ]
+    )
+    return response['choices'][0]['message']['content'].strip()
+
+def summarize_person_conversation(person_id, data, summarize_fn=generate_summary):
+    """
+    Summarize, save and clear the stored conversation of a single person.
+    Only the summarized rows are deleted; messages written meanwhile wait for the next run.
+    """
+    summary = summarize_fn(data["messages"])
+    save_summary_to_db([person_id], summary, data["start_time"], data["end_time"])
+    delete_conversation_from_db(person_id, data.get("last_id"))
+    print(f"[INFO] Summary saved for person ID {person_id}.")
+    return summary
+
+def summarize_conversations(max_workers=SUMMARY_MAX_WORKERS, summarize_fn=generate_summary):
     """
     Summarize all conversations in the database and save them with meaningful details.
+    Each person is summarized independently, up to max_workers at a time.
+    :param summarize_fn: Callable turning a message list into a summary; pass a fake for offline runs.
+    :return: Dictionary with person_id as keys and summary text as values.
     """
     try:
+        # Make sure buffered messages are in the table before reading it
+        conversation_writer.flush()
         conversations = fetch_conversation_from_db()
         if not conversations:
             print("No conversations found.")
-            return
+            return {}
 
-        for person_id, data in conversations.items():
-            # Define a solid system prompt with clear instructions
-            summary_prompt = (
-                "Summarize the following conversation in a concise and meaningful way. "
-                "The summary should include:\n"
-                "1. All users involved in the conversation (mention names, or IDs if names are not available).\n"
-                "2. The purpose or key topics of the conversation, including any heated or debated subjects.\n"
-                "3. Any conclusions or decisions made during the conversation.\n"
-                "4. Notable information about users, such as:\n"
-                "   - Names, relationships, education, work, hobbies, interests, or ideas.\n"
-                "   - Anything deeply personal or relevant to the user (e.g., allergies, family member names, business, or places they discussed).\n"
-                "5. Any information requested to be remembered for future reference.\n"
-                "6. Anything that could be helpful or important in the future.\n"
-                "7. Any introductions made (e.g., user names or identities revealed).\n"
-                "8. Key first-time actions (e.g., a user introducing themselves or sharing personal details).\n"
-                "9. Skip generic conversational exchanges like greetings, pleasantries, or irrelevant back-and-forth.\n"
-                "10. Use a simple format, e.g., '<Name> introduces himself for the first time.'\n\n"
-                "Ensure the summary is concise but captures all essential points and key aspects of the conversation.\n"
-            )
-
-            # Prepare messages for the OpenAI API
-            messages = [{"role": "system", "content": summary_prompt}] + data["messages"]
-
-            # Call the OpenAI API for summarization
-            response = openai.ChatCompletion.create(
-                model="gpt-4o-mini",
-                messages=messages
-            )
-
-            # Extract and clean the summary
-            summary = response['choices'][0]['message']['content'].strip()
-            
-            # Save the summary to the database
-            save_summary_to_db([person_id], summary, data["start_time"], data["end_time"])
-            delete_conversation_from_db(person_id)
-            print(f"[INFO] Summary saved for person ID {person_id}.")
+        summaries = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(conversations)))) as executor:
+            futures = {
+                executor.submit(summarize_person_conversation, person_id, data, summarize_fn): person_id
+                for person_id, data in conversations.items()
+            }
+            for future in as_completed(futures):
+                person_id = futures[future]
+                try:
+                    summaries[person_id] = future.result()
+                except Exception as e:
+                    # One failed person keeps their conversation for the next run
+                    print(f"Error generating summary for person ID {person_id}: {str(e)}")
+        return summaries
 
     except Exception as e:
         print(f"Error generating summary: {str(e)}")
+        return {}
@@ -0,0 +1,227 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import openai
+from src.config.settings import (
+    DATABASE_PATH, SUMMARY_TOKEN_BUDGET, SUMMARY_RECENT_COUNT, SUMMARY_MIN_RELEVANCE, SUMMARY_EMBEDDING_MODEL
+)
+from src.conversation.context import count_tokens
+
+CONDENSE_PROMPT = (
+    "You keep a condensed long-term memory of past conversations with one person. "
+    "Merge the new conversation summaries below into the existing memory. Keep names, relationships, "
+    "personal details, preferences and anything they asked to be remembered; drop one-off small talk. "
+    "Reply with the updated memory only, in at most 200 words.\n"
+)
+
+def condense_summaries(digest, summaries):
+    """
+    Fold older conversation summaries into a person's condensed memory.
+    :param digest: Current condensed memory, possibly empty.
+    :param summaries: Summary texts, oldest first.
+    :return: Updated condensed memory.
+    """
+    new_summaries = "\n\n".join(summaries)
+    response = openai.ChatCompletion.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": CONDENSE_PROMPT},
+            {"role": "user", "content": f"Existing memory:\n{digest or 'None'}\n\nNew summaries:\n{new_summaries}"}
+        ]
+    )
+    return response['choices'][0]['message']['content'].strip()
+
+@dataclass
+class SummaryEntry:
+    id: int
+    text: str
+    embedding: Optional[np.ndarray]  # None without sentence-transformers
+    tokens: int
+
+class SummaryRetriever:
+    """
+    Selects what past-conversation context goes into a prompt.
+
+    Per person it keeps the most recent summaries in full, a condensed digest
+    of older ones, and picks older summaries relevant to the current query by
+    embedding similarity, all within a token budget. New summaries are read
+    and embedded once as they arrive, and only they are folded into the digest.
+    Without sentence-transformers no older summaries are picked by relevance.
+    """
+
+    def __init__(self, db_path=DATABASE_PATH, token_budget=SUMMARY_TOKEN_BUDGET, recent_count=SUMMARY_RECENT_COUNT,
+                 min_relevance=SUMMARY_MIN_RELEVANCE, embedding_model=SUMMARY_EMBEDDING_MODEL,
+                 condense_fn=condense_summaries):
+        self.db_path = db_path
+        self.token_budget = token_budget
+        self.recent_count = recent_count
+        self.min_relevance = min_relevance
+        self.embedding_model = embedding_model
+        self._model = None
+        self._model_failed = False
+        self._model_lock = threading.Lock()
+        self.condense_fn = condense_fn
+        self._entries: Dict[Optional[int], List[SummaryEntry]] = {None: []}  # None holds every summary
+        self._digests: Dict[int, Tuple[str, int]] = {}  # person_id -> (digest, last folded summary id)
+        self._condensing = set()
+        self._last_id = 0
+        self._digests_loaded = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-digest")
+
+    def refresh(self):
+        """Load and embed summaries saved since the last refresh."""
+        connection = sqlite3.connect(self.db_path)
+        try:
+            cursor = connection.cursor()
+            if not self._digests_loaded:
+                cursor.execute("SELECT person_id, digest, last_summary_id FROM person_summary_digests")
+                digests = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT id, person_ids, summary FROM conversation_summaries
+                WHERE id > ? AND summary LIKE '**Summary%'
+                ORDER BY id ASC
+            """, (self._last_id,))
+            rows = cursor.fetchall()
+        finally:
+            connection.close()
+
+        embeddings = self._embed([summary for _, _, summary in rows]) if rows else None
+        entries = [
+            (person_ids, SummaryEntry(summary_id, summary, None if embeddings is None else embeddings[i],
+                                      count_tokens(summary)))
+            for i, (summary_id, person_ids, summary) in enumerate(rows)
+        ]
+        with self._lock:
+            if not self._digests_loaded:
+                self._digests.update(digests)
+                self._digests_loaded = True
+            touched = set()
+            for person_ids, entry in entries:
+                if entry.id <= self._last_id:
+                    continue  # Loaded by a concurrent refresh
+                self._last_id = entry.id
+                self._entries[None].append(entry)
+                for person_id in self._parse_person_ids(person_ids):
+                    self._entries.setdefault(person_id, []).append(entry)
+                    touched.add(person_id)
+            for person_id in touched:
+                self._schedule_condense(person_id)
+        return len(entries)
+
+    def build_context(self, person_id=None, query=None):
+        """
+        Build the past-conversation section of the system prompt.
+
+        Args:
+            person_id: Person being talked to; None uses summaries of everyone.
+            query: Current user message, used to pick relevant older summaries.
+        """
+        try:
+            self.refresh()
+        except sqlite3.Error as e:
+            print(f"Database error refreshing conversation summaries: {e}")
+
+        with self._lock:
+            entries = list(self._entries.get(person_id, []))
+            digest = self._digests.get(person_id, ("", 0))[0] if person_id is not None else ""
+        if not entries and not digest:
+            return "No conversation summaries available."
+
+        budget = self.token_budget
+        sections = []
+        if digest and count_tokens(digest) <= budget:
+            sections.append(f"Condensed memory of older conversations:\n{digest}")
+            budget -= count_tokens(digest)
+
+        recent, older = entries[-self.recent_count:], entries[:-self.recent_count]
+        included = []
+        for entry in reversed(recent):  # Newest first while the budget lasts
+            if entry.tokens > budget:
+                break
+            included.append(entry)
+            budget -= entry.tokens
+
+        relevant = []
+        query_embedding = self._embed([query]) if query and older and budget > 0 else None
+        if query_embedding is not None and all(entry.embedding is not None for entry in older):
+            similarities = np.stack([entry.embedding for entry in older]) @ query_embedding[0]
+            for index in np.argsort(-similarities):
+                if similarities[index] < self.min_relevance:
+                    break
+                if older[index].tokens <= budget:
+                    relevant.append(older[index])
+                    budget -= older[index].tokens
+
+        if relevant:
+            lines = "\n\n".join(entry.text for entry in sorted(relevant, key=lambda e: e.id))
+            sections.append(f"Earlier conversations related to this topic:\n{lines}")
+        if included:
+            lines = "\n\n".join(f"{i + 1}. {entry.text}" for i, entry in enumerate(sorted(included, key=lambda e: e.id)))
+            sections.append(f"Recent conversations:\n{lines}")
+        return "Summary of past conversations:\n" + "\n\n".join(sections)
+
+    def _embed(self, texts):
+        """Unit-length embeddings of texts as rows, None if the sentence model can't be loaded."""
+        with self._model_lock:
+            if self._model is None and not self._model_failed:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.embedding_model)
+                except Exception as e:
+                    self._model_failed = True
+                    print(f"[WARNING] Summary embedding model unavailable ({e}), older summaries won't be picked by relevance")
+        if self._model is None:
+            return None
+        return np.asarray(self._model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    @staticmethod
+    def _parse_person_ids(person_ids):
+        ids = []
+        for value in str(person_ids or "").replace(",", " ").split():
+            try:
+                ids.append(int(value))
+            except ValueError:
+                continue
+        return ids
+
+    def _schedule_condense(self, person_id):
+        """Fold summaries that left the recent window into the digest. Caller holds the lock."""
+        if not self.condense_fn or person_id in self._condensing:
+            return
+        older = self._entries.get(person_id, [])[:-self.recent_count]
+        last_folded = self._digests.get(person_id, ("", 0))[1]
+        if older and older[-1].id > last_folded:
+            self._condensing.add(person_id)
+            self._executor.submit(self._condense, person_id)
+
+    def _condense(self, person_id):
+        with self._lock:
+            digest, last_folded = self._digests.get(person_id, ("", 0))
+            pending = [e for e in self._entries.get(person_id, [])[:-self.recent_count] if e.id > last_folded]
+        try:
+            if pending:
+                digest = self.condense_fn(digest, [entry.text for entry in pending])
+                last_folded = pending[-1].id
+                with sqlite3.connect(self.db_path) as connection:
+                    connection.execute("""
+                        INSERT INTO person_summary_digests (person_id, digest, last_summary_id) VALUES (?, ?, ?)
+                        ON CONFLICT(person_id) DO UPDATE SET digest = excluded.digest, last_summary_id = excluded.last_summary_id
+                    """, (person_id, digest, last_folded))
+                print(f"[INFO] Condensed {len(pending)} older summaries for person ID {person_id}")
+        except Exception as e:
+            # Left pending; retried when the next summary for this person arrives
+            print(f"Error condensing summaries for person ID {person_id}: {e}")
+            with self._lock:
+                self._condensing.discard(person_id)
+            return
+        with self._lock:
+            self._digests[person_id] = (digest, last_folded)
+            self._condensing.discard(person_id)
+            # Pick up summaries that arrived while this one ran
+            self._schedule_condense(person_id)
+
+summary_retriever = SummaryRetriever()
@@ -1,6 +1,6 @@
 import sqlite3
 from typing import Optional
-from src.config.settings import DATABASE_PATH
+from .db_operations import db_ops
 
 def update_active_person_id(person_id: int) -> None:
     """
@@ -13,11 +13,7 @@ def update_active_person_id(person_id: int) -> None:
         sqlite3.Error: If database operation fails
     """
     try:
-        with sqlite3.connect(DATABASE_PATH) as connection:
-            cursor = connection.cursor()
-            cursor.execute("DELETE FROM active_person")
-            cursor.execute("INSERT INTO active_person (id) VALUES (?)", (person_id,))
-            connection.commit()
+        db_ops.set_active_person(person_id)
     except sqlite3.Error as e:
         print(f"[ERROR] Failed to update active person: {e}")
         raise
@@ -33,11 +29,7 @@ def get_active_person_id() -> Optional[int]:
         sqlite3.Error: If database operation fails
     """
     try:
-        with sqlite3.connect(DATABASE_PATH) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT id FROM active_person LIMIT 1")
-            result = cursor.fetchone()
-            return result[0] if result else None
+        return db_ops.get_active_person()
     except sqlite3.Error as e:
         print(f"[ERROR] Failed to get active person: {e}")
         raise
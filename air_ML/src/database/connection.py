@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from src.config.settings import DATABASE_PATH
+
+class ConnectionPool:
+    """
+    One persistent sqlite3 connection per thread.
+
+    Connections are opened lazily, switched to WAL mode so readers never block
+    the writer, and reused for the life of the thread, which also keeps each
+    connection's prepared statement cache warm.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH, busy_timeout_ms: int = 5000, cached_statements: int = 128):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Only ever used by its own thread; close_all() may close it from another
+            connection = sqlite3.connect(self.db_path, cached_statements=self.cached_statements, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; fsync at checkpoints only
+            connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        """Run several statements as one transaction, committing once at the end."""
+        connection = self.connection()
+        try:
+            yield connection
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    def execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        """Execute a single read statement."""
+        return self.connection().execute(sql, params)
+
+    def close_all(self) -> None:
+        """Close every connection the pool has opened."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+db_pool = ConnectionPool()
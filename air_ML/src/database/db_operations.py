@@ -1,39 +1,76 @@
-import sqlite3
+from typing import Any, Dict, Iterable, Optional, Tuple
 from src.config.settings import DATABASE_PATH
 from src.types.person import PersonData
+from .connection import ConnectionPool, db_pool
+
+# Person columns that may be updated by name; anything else is rejected
+PERSON_UPDATABLE_COLUMNS = frozenset({"name", "age", "gender", "emotion", "ethnicity"})
+
+# One parameterized statement per column, so no SQL is assembled from input
+UPDATE_PERSON_SQL = {
+    column: f"UPDATE persons SET {column} = ? WHERE id = ?" for column in PERSON_UPDATABLE_COLUMNS
+}
+
+SELECT_PERSON_SQL = "SELECT id, name, age, gender, emotion, ethnicity FROM persons WHERE id = ?"
+
+UPSERT_ACTIVE_PERSON_SQL = (
+    "INSERT INTO active_person (slot, id) VALUES (0, ?) "
+    "ON CONFLICT(slot) DO UPDATE SET id = excluded.id"
+)
+
+SELECT_ACTIVE_PERSON_SQL = "SELECT id FROM active_person WHERE slot = 0"
 
 class DatabaseOperations:
-    def __init__(self, db_path: str = DATABASE_PATH):
+    def __init__(self, db_path: str = DATABASE_PATH, pool: Optional[ConnectionPool] = None):
         self.db_path = db_path
+        self.pool = pool or (db_pool if db_path == DATABASE_PATH else ConnectionPool(db_path))
 
     def fetch_person_data(self, person_id: int) -> PersonData:
         """Fetch person data from database."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, name, age, gender, emotion, ethnicity FROM persons WHERE id = ?",
-                (person_id,)
+        row = self.pool.execute(SELECT_PERSON_SQL, (person_id,)).fetchone()
+        if row:
+            return PersonData(
+                id=row[0],
+                name=row[1],
+                age=row[2],
+                gender=row[3],
+                emotion=row[4],
+                ethnicity=row[5]
             )
-            row = cursor.fetchone()
-            if row:
-                return PersonData(
-                    id=row[0],
-                    name=row[1],
-                    age=row[2],
-                    gender=row[3],
-                    emotion=row[4],
-                    ethnicity=row[5]
-                )
-            return PersonData()
+        return PersonData()
 
     def update_person_attribute(self, person_id: int, attribute: str, value: str) -> None:
         """Update a single attribute for a person."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                f"UPDATE persons SET {attribute} = ? WHERE id = ?",
-                (value, person_id)
-            )
-            conn.commit()
+        self.update_person_attributes(person_id, {attribute: value})
+
+    def update_person_attributes(self, person_id: int, attributes: Dict[str, Any]) -> None:
+        """
+        Update several attributes for a person in one transaction.
+
+        Raises:
+            ValueError: If an attribute is not an updatable person column
+        """
+        invalid = set(attributes) - PERSON_UPDATABLE_COLUMNS
+        if invalid:
+            raise ValueError(f"Cannot update person columns: {', '.join(sorted(invalid))}")
+        with self.pool.transaction() as conn:
+            for attribute, value in attributes.items():
+                conn.execute(UPDATE_PERSON_SQL[attribute], (value, person_id))
+
+    def set_active_person(self, person_id: int) -> None:
+        """Set the active person with a single upsert."""
+        with self.pool.transaction() as conn:
+            conn.execute(UPSERT_ACTIVE_PERSON_SQL, (person_id,))
+
+    def get_active_person(self) -> Optional[int]:
+        """Return the active person ID, or None if there is none."""
+        row = self.pool.execute(SELECT_ACTIVE_PERSON_SQL).fetchone()
+        return row[0] if row else None
+
+    def execute_batch(self, statements: Iterable[Tuple[str, tuple]]) -> None:
+        """Run several write statements in one transaction."""
+        with self.pool.transaction() as conn:
+            for sql, params in statements:
+                conn.execute(sql, params)
 
-db_ops = DatabaseOperations() 
\ No newline at end of file
+db_ops = DatabaseOperations()
@@ -1,6 +1,7 @@
 import os
 import sqlite3
 from src.config.settings import DATABASE_PATH
+from .migrations import migrate_database
 
 def ensure_database():
     """Ensure all required tables exist in the database."""
@@ -20,14 +21,15 @@ def ensure_database():
             gender TEXT,
             emotion TEXT,
             ethnicity TEXT,
-            embedding TEXT
+            embedding BLOB  -- float32 bytes, see src/database/embeddings.py
         )
         ''')
 
         # Active person table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS active_person (
-            id INTEGER PRIMARY KEY
+            slot INTEGER PRIMARY KEY CHECK (slot = 0),  -- Single row, updated with an upsert
+            id INTEGER
         )
         ''')
 
@@ -54,7 +56,20 @@ def ensure_database():
         )
         ''')
 
+        # Condensed digest of each person's older conversation summaries
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS person_summary_digests (
+            person_id INTEGER PRIMARY KEY,
+            digest TEXT,
+            last_summary_id INTEGER,  -- Newest conversation_summaries.id folded into the digest
+            FOREIGN KEY(person_id) REFERENCES persons(id)
+        )
+        ''')
+
         connection.commit()
+
+        # Bring existing databases up to the current schema version
+        migrate_database(connection)
         connection.close()
         print("Database tables created successfully!")
     except sqlite3.Error as e:
@@ -0,0 +1,24 @@
+import ast
+import re
+import numpy as np
+
+# Face embeddings are stored as raw float32 bytes in the persons.embedding BLOB column
+EMBEDDING_DTYPE = np.float32
+
+# numpy >= 2 writes scalars in str(list) as "np.float32(0.1)"
+NUMPY_SCALAR_REPR = re.compile(r"np\.\w+\(([^()]*)\)")
+
+def embedding_to_blob(embedding) -> bytes:
+    """Serialize an embedding to float32 bytes for storage."""
+    return np.asarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+def blob_to_embedding(value) -> np.ndarray:
+    """
+    Deserialize a stored embedding.
+
+    Legacy rows hold the embedding as a stringified list; those are parsed
+    with ast.literal_eval so stored text is never executed.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=EMBEDDING_DTYPE)
+    return np.asarray(ast.literal_eval(NUMPY_SCALAR_REPR.sub(r"\1", value)), dtype=EMBEDDING_DTYPE)
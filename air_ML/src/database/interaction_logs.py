@@ -1,5 +1,10 @@
+import atexit
+import queue
 import sqlite3
-from src.config.settings import DATABASE_PATH
+import threading
+from datetime import datetime
+from src.config.settings import DATABASE_PATH, CONVERSATION_FLUSH_INTERVAL_MS, CONVERSATION_FLUSH_BATCH_SIZE
+from .connection import ConnectionPool, db_pool
 
 def save_conversation(person_id, message, role):
     """Save a single conversation message."""
@@ -11,4 +16,68 @@ def save_conversation(person_id, message, role):
     )
     connection.commit()
     connection.close()
-    print(f"Saved {role} message for person ID {person_id}")
\ No newline at end of file
+    print(f"Saved {role} message for person ID {person_id}")
+
+class ConversationWriter:
+    """
+    Buffers conversation messages and writes them in batches from a background thread.
+
+    Messages are timestamped when queued, so batching does not change their
+    order. Call flush() before reading the conversations table.
+    """
+
+    def __init__(self, db_path=DATABASE_PATH, flush_interval_ms=CONVERSATION_FLUSH_INTERVAL_MS,
+                 batch_size=CONVERSATION_FLUSH_BATCH_SIZE):
+        self.db_path = db_path
+        self.pool = db_pool if db_path == DATABASE_PATH else ConnectionPool(db_path)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="conversation-writer", daemon=True)
+        self._thread.start()
+
+    def save(self, person_id, message, role):
+        """Queue a message for saving and return immediately."""
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")  # Same format as CURRENT_TIMESTAMP
+        self._queue.put((person_id, message, role, timestamp))
+
+    def flush(self, timeout=None):
+        """Block until every message queued before this call has been written."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            with self.pool.transaction() as connection:
+                connection.executemany(
+                    "INSERT INTO conversations (person_id, message, role, timestamp) VALUES (?, ?, ?, ?)",
+                    batch
+                )
+            print(f"Saved {len(batch)} conversation messages")
+        except sqlite3.Error as e:
+            print(f"[ERROR] Failed to save {len(batch)} conversation messages: {e}")
+
+conversation_writer = ConversationWriter()
+atexit.register(conversation_writer.flush, 5)
@@ -0,0 +1,91 @@
+import sqlite3
+from src.config.settings import DATABASE_PATH
+from .embeddings import blob_to_embedding, embedding_to_blob
+
+# Stored in PRAGMA user_version; bump it when adding a migration below
+SCHEMA_VERSION = 3
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    """Return the schema version recorded in the database."""
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate_embeddings_to_blob(connection: sqlite3.Connection) -> int:
+    """
+    Convert stringified person embeddings to float32 BLOBs.
+
+    Returns:
+        int: Number of rows converted.
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT id, embedding FROM persons WHERE typeof(embedding) = 'text'")
+    rows = cursor.fetchall()
+
+    converted = 0
+    for person_id, embedding in rows:
+        try:
+            blob = embedding_to_blob(blob_to_embedding(embedding))
+        except (ValueError, SyntaxError) as e:
+            print(f"[WARNING] Skipping unreadable embedding for person {person_id}: {e}")
+            continue
+        cursor.execute("UPDATE persons SET embedding = ? WHERE id = ?", (blob, person_id))
+        converted += 1
+
+    print(f"[INFO] Converted {converted} of {len(rows)} text embeddings to float32 BLOBs")
+    return converted
+
+def migrate_active_person_to_slot(connection: sqlite3.Connection) -> int:
+    """
+    Rebuild active_person as a single keyed row so it can be upserted.
+
+    Returns:
+        int: Number of rows carried over.
+    """
+    cursor = connection.cursor()
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(active_person)").fetchall()]
+    if "slot" in columns:
+        return 0
+
+    row = cursor.execute("SELECT id FROM active_person LIMIT 1").fetchone()
+    cursor.execute("DROP TABLE active_person")
+    cursor.execute('''
+    CREATE TABLE active_person (
+        slot INTEGER PRIMARY KEY CHECK (slot = 0),
+        id INTEGER
+    )
+    ''')
+    if row:
+        cursor.execute("INSERT INTO active_person (slot, id) VALUES (0, ?)", (row[0],))
+    print("[INFO] Rebuilt active_person as a single upsertable row")
+    return 1 if row else 0
+
+# Schema version -> migration that brings the database up to it
+MIGRATIONS = {
+    1: migrate_embeddings_to_blob,
+    2: migrate_active_person_to_slot,
+    # Version 1 skipped text written by numpy >= 2 ("np.float32(0.1)"), which now parses
+    3: migrate_embeddings_to_blob,
+}
+
+def migrate_database(connection: sqlite3.Connection) -> int:
+    """
+    Apply every pending migration in order, each in its own transaction.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    version = get_schema_version(connection)
+    for target in sorted(v for v in MIGRATIONS if v > version):
+        print(f"[INFO] Migrating database schema from version {version} to {target}")
+        with connection:
+            MIGRATIONS[target](connection)
+            connection.execute(f"PRAGMA user_version = {int(target)}")
+        version = target
+    return version
+
+if __name__ == "__main__":
+    # Run with: python -m src.database.migrations
+    connection = sqlite3.connect(DATABASE_PATH)
+    try:
+        print(f"Database schema is at version {migrate_database(connection)}")
+    finally:
+        connection.close()
@@ -10,9 +10,10 @@ def extract_and_update_person_attributes(active_person_id: int, assistant_reply:
         if attribute + "=" in assistant_reply:
             value = assistant_reply.split(attribute + "=")[1].split('\n')[0].strip()
             extracted_data[attribute.lower()] = value
-            db_ops.update_person_attribute(active_person_id, attribute.lower(), value)
     
     if extracted_data:
+        # All extracted attributes are written in one transaction
+        db_ops.update_person_attributes(active_person_id, extracted_data)
         memory_service.update_memory(active_person_id, extracted_data)
         return extracted_data
     
@@ -1,7 +1,8 @@
 from .camera_feed import process_camera_feed
-from .active_person import identify_active_person
-from .face_detection import detect_faces_and_landmarks
-from .face_embedding import get_face_embedding, analyze_person_attributes
+from .active_person import identify_active_person, ActivePersonTracker
+from .face_tracker import FaceTracker
+from .face_detection import detect_faces, detect_faces_and_landmarks
+from .face_embedding import get_face_embedding, get_face_embeddings, analyze_person_attributes
 from .face_analysis import get_eye_aspect_ratio, get_mouth_aspect_ratio
 from .person_finder import find_matching_person
 from .similarity import cosine_similarity
@@ -9,8 +10,12 @@ from .similarity import cosine_similarity
 __all__ = [
     'process_camera_feed',
     'identify_active_person',
+    'ActivePersonTracker',
+    'FaceTracker',
+    'detect_faces',
     'detect_faces_and_landmarks',
     'get_face_embedding',
+    'get_face_embeddings',
     'analyze_person_attributes',
     'get_eye_aspect_ratio',
     'get_mouth_aspect_ratio',
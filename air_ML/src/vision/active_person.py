@@ -1,61 +1,113 @@
 from src.database.person_operations import save_to_database
 from src.vision.face_analysis import get_eye_aspect_ratio, get_mouth_aspect_ratio
-from src.vision.face_embedding import get_face_embedding, analyze_person_attributes
-from src.vision.person_finder import find_matching_person
-from typing import Tuple, Optional
+from src.vision.face_detection import detect_faces
+from src.vision.face_embedding import get_face_embeddings, analyze_person_attributes
+from src.vision.face_tracker import Box, FaceTracker, rect_to_box
+from src.vision.person_finder import find_matching_person, person_index
+from typing import List, Tuple, Optional
 import dlib
+import numpy as np
 
 EYE_CONTACT_THRESHOLD = 0.20
 MOUTH_MOVEMENT_THRESHOLD = 0.4
 
+def _crop(frame: np.ndarray, box: Box) -> Optional[np.ndarray]:
+    """Extract a face ROI clipped to the frame, or None if nothing is left."""
+    x, y, w, h = box
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(frame.shape[1], x + w), min(frame.shape[0], y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return frame[y0:y1, x0:x1]
+
+def _enroll_person(face_roi: np.ndarray, embedding) -> Optional[int]:
+    """Analyze and save a face that matched nobody in the database."""
+    attributes = analyze_person_attributes(face_roi)
+    if not attributes:
+        return None
+    person_id = save_to_database(
+        age=attributes["age"],
+        gender=attributes["gender"],
+        emotion=attributes["emotion"],
+        ethnicity=attributes["ethnicity"],
+        embedding=embedding
+    )
+    person_index.add(person_id, embedding)
+    print(f"[INFO] New person saved with ID: {person_id}")
+    return person_id
+
+def identify_faces(frame: np.ndarray, boxes: List[Box]) -> List[Optional[int]]:
+    """Identify (or enroll) every face, embedding all of them in one batch."""
+    face_rois = [_crop(frame, box) for box in boxes]
+    valid = [i for i, roi in enumerate(face_rois) if roi is not None]
+    embeddings = get_face_embeddings([face_rois[i] for i in valid]) if valid else []
+
+    person_ids: List[Optional[int]] = [None] * len(boxes)
+    for i, embedding in zip(valid, embeddings):
+        if embedding is None:
+            continue
+        person_id = find_matching_person(embedding)
+        if person_id is None:
+            person_id = _enroll_person(face_roi=face_rois[i], embedding=embedding)
+        person_ids[i] = person_id
+    return person_ids
+
 def identify_active_person(detected_faces, frame) -> Tuple[Optional[int], Optional[Tuple[int, int, int, int]]]:
-    """Identify the most prominent face as the active person."""
+    """Identify every detected face and return the most prominent one as the active person."""
     if not detected_faces:
         return None, None
 
     try:
-        # Get the first face (assuming it's the most prominent)
-        face, landmarks = detected_faces[0]  # dlib returns (rectangle, landmarks)
-        
-        # Verify that face is a dlib.rectangle object
-        if not isinstance(face, dlib.rectangle):
-            print(f"Invalid face object type: {type(face)}")
-            return None, None
-        
-        # Convert dlib rectangle to coordinates
-        x = face.left()
-        y = face.top()
-        w = face.right() - x
-        h = face.bottom() - y
-        
-        # Extract face ROI (Region of Interest)
-        face_roi = frame[y:y+h, x:x+w]
-        
-        # Get face embedding
-        embedding = get_face_embedding(face_roi)
-        if embedding is None:
+        boxes = []
+        for face, landmarks in detected_faces:  # dlib returns (rectangle, landmarks)
+            if not isinstance(face, dlib.rectangle):
+                print(f"Invalid face object type: {type(face)}")
+                continue
+            boxes.append(rect_to_box(face))
+
+        identified = [(person_id, box) for person_id, box in zip(identify_faces(frame, boxes), boxes) if person_id is not None]
+        if not identified:
             return None, None
-            
-        # Try to find matching person in database
-        person_id = find_matching_person(embedding)
-        
-        if person_id is None:
-            # New person detected - analyze and save to database
-            attributes = analyze_person_attributes(face_roi)
-            if attributes:
-                person_id = save_to_database(
-                    age=attributes["age"],
-                    gender=attributes["gender"],
-                    emotion=attributes["emotion"],
-                    ethnicity=attributes["ethnicity"],
-                    embedding=embedding
-                )
-                print(f"[INFO] New person saved with ID: {person_id}")
-            else:
-                return None, None
 
-        return person_id, (x, y, w, h)
-        
+        # The largest face is taken as the most prominent
+        return max(identified, key=lambda item: item[1][2] * item[1][3])
+
     except Exception as e:
         print(f"Error in identify_active_person: {e}")
         return None, None
+
+class ActivePersonTracker:
+    """
+    Identifies the active person across frames without re-embedding every face.
+
+    Faces are followed by a FaceTracker between detections, and only tracks
+    that are new or whose confidence has decayed are embedded and matched.
+    """
+
+    def __init__(self, tracker: Optional[FaceTracker] = None):
+        self.tracker = tracker or FaceTracker()
+        self.stats = {"frames": 0, "identifications": 0}
+
+    def process_frame(self, frame: np.ndarray) -> Tuple[Optional[int], Optional[Tuple[int, int, int, int]]]:
+        """Advance the tracks by one frame and return the active person and their face box."""
+        try:
+            tracks = self.tracker.update(frame, detect_faces)
+            self.stats["frames"] += 1
+
+            pending = self.tracker.tracks_to_identify()
+            if pending:
+                self.stats["identifications"] += len(pending)
+                for track, person_id in zip(pending, identify_faces(frame, [track.box for track in pending])):
+                    self.tracker.mark_identified(track, person_id)
+
+            identified = [track for track in tracks if track.person_id is not None]
+            if not identified:
+                return None, None
+
+            # The largest face is taken as the most prominent
+            active = max(identified, key=lambda track: track.area)
+            return active.person_id, active.box
+
+        except Exception as e:
+            print(f"Error in ActivePersonTracker.process_frame: {e}")
+            return None, None
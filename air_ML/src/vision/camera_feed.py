@@ -1,13 +1,14 @@
 import cv2
 import os
 import time
-from src.vision.face_detection import detect_faces_and_landmarks
-from src.vision.active_person import identify_active_person
+from src.vision.active_person import ActivePersonTracker
 from src.database.active_person import update_active_person_id
 
 def process_camera_feed(stop_event, shared_data, lock):
     frames_dir = "frames"
     print("Starting frame processing from directory...", flush=True)
+    active_person_tracker = ActivePersonTracker()
+    last_active_person_id = None
 
     while not stop_event.is_set():
         try:
@@ -25,16 +26,16 @@ def process_camera_feed(stop_event, shared_data, lock):
                 os.remove(image_path)
                 continue
 
-            # Detect faces and get results
-            detected_faces = detect_faces_and_landmarks(frame)
-            
-            if detected_faces and len(detected_faces) > 0:
-                active_person_id, face_coords = identify_active_person(detected_faces, frame)
+            # Detection runs every few frames; faces are tracked in between
+            active_person_id, face_coords = active_person_tracker.process_frame(frame)
 
-                if active_person_id and face_coords:
-                    with lock:
-                        shared_data["active_person_id"] = active_person_id
+            if active_person_id and face_coords:
+                with lock:
+                    shared_data["active_person_id"] = active_person_id
+                    # Only write to the database when the active person changes
+                    if active_person_id != last_active_person_id:
                         update_active_person_id(active_person_id)
+                        last_active_person_id = active_person_id
 
             # Remove the processed image
             os.remove(image_path)
@@ -7,6 +7,23 @@ from typing import List, Tuple, Optional
 face_detector = dlib.get_frontal_face_detector()
 predictor = dlib.shape_predictor("models/face/shape_predictor_68_face_landmarks.dat")
 
+def detect_faces(frame: np.ndarray) -> List[dlib.rectangle]:
+    """
+    Detect faces in a frame without predicting landmarks.
+    
+    Args:
+        frame: Input image frame
+        
+    Returns:
+        List of face rectangles
+    """
+    try:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return [face for face in face_detector(gray) if isinstance(face, dlib.rectangle)]
+    except Exception as e:
+        print(f"Error in face detection: {e}")
+        return []
+
 def detect_faces_and_landmarks(frame: np.ndarray) -> List[Tuple[dlib.rectangle, np.ndarray]]:
     """
     Detect faces and their landmarks in a frame.
@@ -1,31 +1,36 @@
-from deepface import DeepFace
+from src.vision.inference_service import inference_service
 
-# Preload DeepFace models globally for performance
-facenet_model = DeepFace.build_model("Facenet")
+# Load and warm up every DeepFace model once, before the first frame arrives
+inference_service.start()
 
 def get_face_embedding(face_roi):
     """Generates face embedding using DeepFace."""
     try:
-        embeddings = DeepFace.represent(face_roi, model_name="Facenet", enforce_detection=False)
-        return embeddings[0]['embedding']
+        return inference_service.represent(face_roi)
     except Exception as e:
         print(f"Error generating face embedding: {e}", flush=True)
         return None
 
-def analyze_person_attributes(face_roi):
-    """Runs DeepFace model to analyze age, gender, emotion, and ethnicity."""
+def get_face_embeddings(face_rois):
+    """Generates embeddings for several faces in a single batched forward pass."""
     try:
-        analysis = DeepFace.analyze(face_roi, actions=["age", "gender", "emotion", "race"], enforce_detection=False)
-        result = analysis[0]  # Extract results from DeepFace output
+        return inference_service.represent_batch(face_rois)
+    except Exception as e:
+        print(f"Error generating face embeddings: {e}", flush=True)
+        return [None] * len(face_rois)
+
+def analyze_person_attributes(face_roi, identity=None):
+    """Runs DeepFace models to analyze age, gender, emotion, and ethnicity.
 
-        print(f"[DEBUG] DeepFace Analysis Output: {result}", flush=True)  # 🚀 Debugging Line
+    Pass the tracked identity (e.g. person ID) to reuse its cached age, gender and ethnicity.
+    """
+    try:
+        result = inference_service.analyze(face_roi, identity)
+        if result is None:
+            return None
 
-        return {
-            "age": result.get("age"),
-            "gender": result.get("dominant_gender"),  # ✅ Ensure correct key
-            "emotion": result.get("dominant_emotion"),  # ✅ Ensure correct key
-            "ethnicity": result.get("dominant_race"),  # ✅ Ensure correct key
-        }
+        print(f"[DEBUG] DeepFace Analysis Output: {result}", flush=True)
+        return result
     except Exception as e:
         print(f"Error analyzing person attributes: {e}", flush=True)
         return None
@@ -0,0 +1,146 @@
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+import dlib
+import numpy as np
+from src.config.settings import (
+    TRACK_DETECT_EVERY_N_FRAMES,
+    TRACK_IOU_THRESHOLD,
+    TRACK_MIN_CONFIDENCE,
+    TRACK_CONFIDENCE_DECAY,
+    TRACK_MIN_PSR
+)
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+# Peak-to-sidelobe ratio at which a correlation track counts as fully reliable
+GOOD_PSR = 2 * TRACK_MIN_PSR
+
+def box_iou(a: Box, b: Box) -> float:
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = inter_w * inter_h
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union > 0 else 0.0
+
+def rect_to_box(rect: dlib.rectangle) -> Box:
+    return rect.left(), rect.top(), rect.right() - rect.left(), rect.bottom() - rect.top()
+
+@dataclass
+class FaceTrack:
+    track_id: int
+    box: Box
+    person_id: Optional[int] = None
+    # Trust in the current identity; decays while the face is only tracked
+    confidence: float = 0.0
+    missed_detections: int = 0
+    correlation_tracker: dlib.correlation_tracker = field(default_factory=dlib.correlation_tracker, repr=False)
+
+    @property
+    def area(self) -> int:
+        return self.box[2] * self.box[3]
+
+    def needs_identification(self, min_confidence: float) -> bool:
+        return self.person_id is None or self.confidence < min_confidence
+
+class FaceTracker:
+    """
+    Keeps face tracks alive between detections.
+
+    Detection runs every few frames; in between, each face is followed with
+    a dlib correlation tracker. Tracks are matched to new detections by IoU,
+    so an identified face keeps its person ID until its confidence decays.
+    """
+
+    def __init__(self, detect_every: int = TRACK_DETECT_EVERY_N_FRAMES, iou_threshold: float = TRACK_IOU_THRESHOLD,
+                 min_confidence: float = TRACK_MIN_CONFIDENCE, confidence_decay: float = TRACK_CONFIDENCE_DECAY,
+                 min_psr: float = TRACK_MIN_PSR, max_missed_detections: int = 1):
+        self.detect_every = max(1, detect_every)
+        self.iou_threshold = iou_threshold
+        self.min_confidence = min_confidence
+        self.confidence_decay = confidence_decay
+        self.min_psr = min_psr
+        self.max_missed_detections = max_missed_detections
+        self.tracks: List[FaceTrack] = []
+        self.frame_index = 0
+        self._next_track_id = 1
+
+    def update(self, frame: np.ndarray, detect_fn: Callable[[np.ndarray], List[dlib.rectangle]]) -> List[FaceTrack]:
+        """
+        Advance all tracks by one frame.
+
+        Args:
+            frame: BGR frame.
+            detect_fn: Face detector returning dlib rectangles; only called on detection frames.
+
+        Returns:
+            The live tracks.
+        """
+        rgb = frame[:, :, ::-1].copy()
+        if self.frame_index % self.detect_every == 0 or not self.tracks:
+            self._associate(rgb, [rect_to_box(rect) for rect in detect_fn(frame)])
+        else:
+            self._track(rgb)
+        self.frame_index += 1
+        return self.tracks
+
+    def tracks_to_identify(self) -> List[FaceTrack]:
+        """Tracks that are new or whose identity confidence has decayed."""
+        return [track for track in self.tracks if track.needs_identification(self.min_confidence)]
+
+    def mark_identified(self, track: FaceTrack, person_id: Optional[int]) -> None:
+        track.person_id = person_id
+        track.confidence = 1.0 if person_id is not None else 0.0
+
+    def _start_tracker(self, track: FaceTrack, rgb: np.ndarray) -> None:
+        x, y, w, h = track.box
+        track.correlation_tracker.start_track(rgb, dlib.rectangle(x, y, x + w, y + h))
+
+    def _track(self, rgb: np.ndarray) -> None:
+        """Follow each face with its correlation tracker, dropping lost tracks."""
+        alive = []
+        for track in self.tracks:
+            psr = track.correlation_tracker.update(rgb)
+            if psr < self.min_psr:
+                continue
+            position = track.correlation_tracker.get_position()
+            track.box = (int(position.left()), int(position.top()), int(position.width()), int(position.height()))
+            track.confidence *= self.confidence_decay * min(1.0, psr / GOOD_PSR)
+            alive.append(track)
+        self.tracks = alive
+
+    def _associate(self, rgb: np.ndarray, boxes: List[Box]) -> None:
+        """Greedily match detections to tracks by IoU, then start or drop tracks."""
+        pairs = sorted(
+            ((box_iou(track.box, box), t, d) for t, track in enumerate(self.tracks) for d, box in enumerate(boxes)),
+            reverse=True
+        )
+        matched_tracks, matched_boxes = set(), set()
+        for iou, t, d in pairs:
+            if iou < self.iou_threshold:
+                break
+            if t in matched_tracks or d in matched_boxes:
+                continue
+            matched_tracks.add(t)
+            matched_boxes.add(d)
+            track = self.tracks[t]
+            track.box = boxes[d]
+            track.missed_detections = 0
+            self._start_tracker(track, rgb)
+
+        alive = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed_detections += 1
+                if track.missed_detections > self.max_missed_detections:
+                    continue
+            alive.append(track)
+        for d, box in enumerate(boxes):
+            if d not in matched_boxes:
+                track = FaceTrack(track_id=self._next_track_id, box=box)
+                self._next_track_id += 1
+                self._start_tracker(track, rgb)
+                alive.append(track)
+        self.tracks = alive
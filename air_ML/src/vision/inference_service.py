@@ -0,0 +1,310 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence
+import cv2
+import numpy as np
+from deepface import DeepFace
+from src.config.settings import (
+    VISION_BATCH_INFERENCE,
+    VISION_BATCH_WINDOW_MS,
+    VISION_MAX_BATCH_SIZE,
+    VISION_ATTRIBUTE_TTL_SECONDS,
+    VISION_EMOTION_TTL_SECONDS
+)
+
+# Output labels of the DeepFace attribute models, in model output order
+GENDER_LABELS = ["Woman", "Man"]
+RACE_LABELS = ["asian", "indian", "black", "white", "middle eastern", "latino hispanic"]
+EMOTION_LABELS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+# Model name -> DeepFace task, loaded once at startup
+MODELS = {
+    "Facenet": "facial_recognition",
+    "Age": "facial_attribute",
+    "Gender": "facial_attribute",
+    "Race": "facial_attribute",
+    "Emotion": "facial_attribute",
+}
+
+# Tasks that may be requested from the batcher and the models each one needs
+TASK_MODELS = {
+    "represent": ["Facenet"],
+    "analyze": ["Age", "Gender", "Race", "Emotion"],
+    "emotion": ["Emotion"],
+}
+
+MAX_CACHED_IDENTITIES = 256
+
+def _build_model(name: str):
+    """Build a DeepFace model and return the underlying Keras model."""
+    try:
+        model = DeepFace.build_model(task=MODELS[name], model_name=name)  # deepface >= 0.0.90
+    except TypeError:
+        model = DeepFace.build_model(name)
+    # Newer DeepFace versions wrap the Keras model in a client object
+    return getattr(model, "model", model)
+
+def _resize_with_padding(image: np.ndarray, size) -> np.ndarray:
+    """Resize keeping the aspect ratio and pad to the target size, as DeepFace does."""
+    target_h, target_w = size
+    factor = min(target_h / image.shape[0], target_w / image.shape[1])
+    resized = cv2.resize(image, (max(1, int(image.shape[1] * factor)), max(1, int(image.shape[0] * factor))))
+    pad_h, pad_w = target_h - resized.shape[0], target_w - resized.shape[1]
+    padding = [(pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2)]
+    if resized.ndim == 3:
+        padding.append((0, 0))
+    return np.pad(resized, padding, mode="constant")
+
+class FaceInferenceService:
+    """
+    Runs DeepFace models on batches of face crops.
+
+    Every model is built once when the service starts. Requests from any
+    thread are queued, and a single inference thread drains everything that
+    arrives within the batch window into one forward pass per model, so faces
+    from the same frame (and from frames arriving together) share a pass.
+    Age, gender and race are cached per tracked identity; emotion is refreshed
+    on its own shorter interval.
+    """
+
+    def __init__(self, batch_window_ms: float = VISION_BATCH_WINDOW_MS, max_batch_size: int = VISION_MAX_BATCH_SIZE,
+                 attribute_ttl: float = VISION_ATTRIBUTE_TTL_SECONDS, emotion_ttl: float = VISION_EMOTION_TTL_SECONDS,
+                 batched: bool = VISION_BATCH_INFERENCE):
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.attribute_ttl = attribute_ttl
+        self.emotion_ttl = emotion_ttl
+        self.batched = batched
+        self.models = {}
+        self._requests: "queue.Queue" = queue.Queue()
+        self._attribute_cache: "OrderedDict[object, Dict]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self.stats = {"batches": 0, "faces": 0, "attribute_cache_hits": 0, "attribute_cache_misses": 0, "fallbacks": 0}
+
+    def start(self) -> None:
+        """Load and warm up every model, then start the inference thread."""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            for name in MODELS:
+                start = time.time()
+                try:
+                    model = _build_model(name)
+                    # One dummy pass so the first real frame doesn't pay for graph setup
+                    model.predict(np.zeros((1,) + tuple(model.input_shape[1:]), dtype=np.float32), verbose=0)
+                except Exception as e:
+                    # Tasks needing this model fall back to per-face DeepFace calls
+                    print(f"Error loading {name} model: {e}", flush=True)
+                    continue
+                self.models[name] = model
+                print(f"[INFO] Loaded {name} model in {time.time() - start:.2f}s", flush=True)
+            self._thread = threading.Thread(target=self._run, name="face-inference", daemon=True)
+            self._thread.start()
+
+    def represent(self, face_roi: np.ndarray) -> Optional[List[float]]:
+        """Return the Facenet embedding of one face crop."""
+        return self.represent_batch([face_roi])[0]
+
+    def represent_batch(self, face_rois: Sequence[np.ndarray]) -> List[Optional[List[float]]]:
+        """Return Facenet embeddings for several face crops in one forward pass."""
+        futures = [self._submit("represent", face) for face in face_rois]
+        return [future.result() for future in futures]
+
+    def analyze(self, face_roi: np.ndarray, identity=None) -> Optional[Dict]:
+        """Return age, gender, emotion and ethnicity for one face crop."""
+        return self.analyze_batch([face_roi], [identity])[0]
+
+    def analyze_batch(self, face_rois: Sequence[np.ndarray], identities: Optional[Sequence] = None) -> List[Optional[Dict]]:
+        """
+        Analyze several face crops, reusing cached attributes for known identities.
+
+        Args:
+            face_rois: Face crops in BGR.
+            identities: Optional tracked identity (e.g. person ID) for each crop.
+        """
+        identities = identities or [None] * len(face_rois)
+        now = time.time()
+        pending = []
+        for face, identity in zip(face_rois, identities):
+            cached = self._cached_attributes(identity, now)
+            if cached is None:
+                pending.append((self._submit("analyze", face), None))
+            elif now - cached["emotion_time"] >= self.emotion_ttl:
+                pending.append((self._submit("emotion", face), cached))
+            else:
+                pending.append((None, cached))
+
+        results = []
+        for (future, cached), identity in zip(pending, identities):
+            if future is None:
+                results.append(self._public_attributes(cached))
+                continue
+            result = future.result()
+            if result is None:
+                results.append(self._public_attributes(cached) if cached else None)
+                continue
+            attributes = dict(cached or {}, **result)
+            self._cache_attributes(identity, attributes, refreshed_all=cached is None)
+            results.append(self._public_attributes(attributes))
+        return results
+
+    def invalidate_identity(self, identity) -> None:
+        """Forget cached attributes for an identity."""
+        with self._cache_lock:
+            self._attribute_cache.pop(identity, None)
+
+    def get_stats(self) -> Dict:
+        """Batch and cache counters."""
+        stats = dict(self.stats)
+        stats["avg_batch_size"] = stats["faces"] / stats["batches"] if stats["batches"] else 0.0
+        stats["cached_identities"] = len(self._attribute_cache)
+        return stats
+
+    # Attribute cache
+
+    def _cached_attributes(self, identity, now: float) -> Optional[Dict]:
+        if identity is None:
+            return None
+        with self._cache_lock:
+            cached = self._attribute_cache.get(identity)
+            if cached is None or now - cached["time"] >= self.attribute_ttl:
+                self.stats["attribute_cache_misses"] += 1
+                return None
+            self._attribute_cache.move_to_end(identity)
+            self.stats["attribute_cache_hits"] += 1
+            return dict(cached)
+
+    def _cache_attributes(self, identity, attributes: Dict, refreshed_all: bool) -> None:
+        if identity is None:
+            return
+        now = time.time()
+        attributes["emotion_time"] = now
+        if refreshed_all:
+            attributes["time"] = now
+        with self._cache_lock:
+            self._attribute_cache[identity] = attributes
+            self._attribute_cache.move_to_end(identity)
+            while len(self._attribute_cache) > MAX_CACHED_IDENTITIES:
+                self._attribute_cache.popitem(last=False)
+
+    @staticmethod
+    def _public_attributes(attributes: Dict) -> Dict:
+        return {key: attributes.get(key) for key in ("age", "gender", "emotion", "ethnicity")}
+
+    # Inference thread
+
+    def _submit(self, task: str, face_roi: np.ndarray) -> Future:
+        if self._thread is None:
+            self.start()
+        future = Future()
+        self._requests.put((task, face_roi, future))
+        return future
+
+    def _collect_batch(self) -> List:
+        """Block for one request, then gather whatever else arrives within the window."""
+        batch = [self._requests.get()]
+        deadline = time.time() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            self.stats["batches"] += 1
+            self.stats["faces"] += len(batch)
+            for task in TASK_MODELS:
+                items = [(face, future) for t, face, future in batch if t == task]
+                if items:
+                    self._run_task(task, items)
+
+    def _run_task(self, task: str, items) -> None:
+        faces = [face for face, _ in items]
+        try:
+            if not self.batched:
+                raise RuntimeError("batched inference disabled")
+            results = self._forward(task, faces)
+        except Exception as e:
+            if self.batched:
+                print(f"Batched {task} failed, falling back to per-face DeepFace: {e}", flush=True)
+                self.stats["fallbacks"] += 1
+            results = [self._deepface_single(task, face) for face in faces]
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+    def _predict(self, name: str, faces: List[np.ndarray]) -> np.ndarray:
+        """One forward pass of a model over aligned BGR faces, preprocessed like DeepFace."""
+        model = self.models[name]
+        size = tuple(model.input_shape[1:3])
+        grayscale = model.input_shape[-1] == 1
+        inputs = []
+        for face in faces:
+            image = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY) if grayscale else face
+            image = _resize_with_padding(image, size).astype(np.float32) / 255.0
+            inputs.append(image[..., np.newaxis] if grayscale else image)
+        return model.predict(np.stack(inputs), verbose=0)
+
+    @staticmethod
+    def _align(face: np.ndarray) -> np.ndarray:
+        """
+        The face inside a crop, detected and aligned as DeepFace.represent and
+        DeepFace.analyze do by default, so batched embeddings stay comparable
+        with those stored by the per-face calls. The whole crop if no face is found.
+        """
+        extracted = DeepFace.extract_faces(face, detector_backend="opencv", enforce_detection=False, align=True)
+        if not extracted:
+            return face
+        # RGB in [0, 1] back to the BGR 0-255 range of the crops
+        return np.asarray(extracted[0]["face"], dtype=np.float32)[:, :, ::-1] * 255.0
+
+    def _forward(self, task: str, faces: List[np.ndarray]) -> List:
+        faces = [self._align(face) for face in faces]
+        if task == "represent":
+            return [embedding.tolist() for embedding in self._predict("Facenet", faces)]
+
+        emotions = self._predict("Emotion", faces)
+        results = [{"emotion": EMOTION_LABELS[int(np.argmax(p))]} for p in emotions]
+        if task == "emotion":
+            return results
+
+        ages = self._predict("Age", faces)
+        genders = self._predict("Gender", faces)
+        races = self._predict("Race", faces)
+        for result, age, gender, race in zip(results, ages, genders, races):
+            result["age"] = int(np.sum(age * np.arange(len(age))))
+            result["gender"] = GENDER_LABELS[int(np.argmax(gender))]
+            result["ethnicity"] = RACE_LABELS[int(np.argmax(race))]
+        return results
+
+    @staticmethod
+    def _deepface_single(task: str, face: np.ndarray):
+        """Unbatched DeepFace call for one face, used when batching is off or fails."""
+        try:
+            if task == "represent":
+                return DeepFace.represent(face, model_name="Facenet", enforce_detection=False)[0]["embedding"]
+            actions = ["emotion"] if task == "emotion" else ["age", "gender", "emotion", "race"]
+            result = DeepFace.analyze(face, actions=actions, enforce_detection=False)[0]
+            attributes = {"emotion": result.get("dominant_emotion")}
+            if task == "analyze":
+                attributes.update(
+                    age=result.get("age"),
+                    gender=result.get("dominant_gender"),
+                    ethnicity=result.get("dominant_race")
+                )
+            return attributes
+        except Exception as e:
+            print(f"Error running DeepFace {task}: {e}", flush=True)
+            return None
+
+inference_service = FaceInferenceService()
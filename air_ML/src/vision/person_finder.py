@@ -1,7 +1,113 @@
 import sqlite3
+import threading
+from typing import Optional, Tuple
 import numpy as np
-from src.vision.similarity import cosine_similarity
 from src.config.settings import DATABASE_PATH
+from src.database.connection import ConnectionPool, db_pool
+from src.database.embeddings import EMBEDDING_DTYPE, blob_to_embedding
+
+class PersonEmbeddingIndex:
+    """
+    Process-wide matrix of normalized person embeddings.
+
+    The matrix is loaded from the database once and then grown incrementally,
+    either by add() after an insert in this process or by refresh(), which
+    only reads rows newer than the last one loaded.
+    """
+
+    def __init__(self, db_path: str = DATABASE_PATH):
+        self.db_path = db_path
+        self.pool = db_pool if db_path == DATABASE_PATH else ConnectionPool(db_path)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix: Optional[np.ndarray] = None
+        self._known_ids = set()
+        self._last_id = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=EMBEDDING_DTYPE).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _append(self, ids, vectors) -> None:
+        """Append normalized rows to the matrix. Caller holds the lock."""
+        if not vectors:
+            return
+        rows = np.vstack(vectors)
+        if self._matrix is None:
+            self._matrix = rows
+        else:
+            self._matrix = np.vstack([self._matrix, rows])
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=np.int64)])
+        self._known_ids.update(ids)
+
+    def refresh(self) -> int:
+        """
+        Load persons inserted since the last refresh.
+
+        Returns:
+            int: Number of embeddings added to the matrix.
+        """
+        with self._lock:
+            rows = self.pool.execute(
+                'SELECT id, embedding FROM persons WHERE id > ? AND embedding IS NOT NULL ORDER BY id',
+                (self._last_id,)
+            ).fetchall()
+
+            self._loaded = True
+            ids, vectors = [], []
+            for person_id, stored in rows:
+                self._last_id = max(self._last_id, person_id)
+                if person_id in self._known_ids:
+                    continue  # Already added in this process
+                try:
+                    vector = self._normalize(blob_to_embedding(stored))
+                except (ValueError, SyntaxError) as e:
+                    print(f"Skipping unreadable embedding for person {person_id}: {e}")
+                    continue
+                if vector is None:
+                    continue
+                if self._matrix is not None and vector.shape[0] != self._matrix.shape[1]:
+                    print(f"Skipping embedding for person {person_id} with dimension {vector.shape[0]}")
+                    continue
+                ids.append(person_id)
+                vectors.append(vector)
+            self._append(ids, vectors)
+            return len(ids)
+
+    def add(self, person_id: int, embedding) -> None:
+        """Add a newly inserted person without re-reading the database."""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            if person_id in self._known_ids:
+                return
+            if self._matrix is not None and vector.shape[0] != self._matrix.shape[1]:
+                return
+            self._append([person_id], [vector])
+
+    def find_best_match(self, embedding) -> Tuple[Optional[int], float]:
+        """Return the most similar person and their cosine similarity."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            matrix, ids = self._matrix, self._ids
+        if vector is None or matrix is None or vector.shape[0] != matrix.shape[1]:
+            return None, 0.0
+        similarities = matrix @ vector
+        best = int(np.argmax(similarities))
+        return int(ids[best]), float(similarities[best])
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+person_index = PersonEmbeddingIndex()
 
 def find_matching_person(embedding, threshold=0.4):
     """
@@ -12,25 +118,20 @@ def find_matching_person(embedding, threshold=0.4):
         threshold (float): The similarity threshold for matching.
 
     Returns:
-        int or None: The ID of the matching person or None if no match is found.
+        int or None: The ID of the best matching person or None if no match is found.
     """
-    connection = sqlite3.connect(DATABASE_PATH)
-    cursor = connection.cursor()
-
     try:
-        # Fetch all embeddings from the database
-        cursor.execute('SELECT id, embedding FROM persons')
-        rows = cursor.fetchall()
-
-        # If no persons in database, return None
-        if not rows:
-            return None
-
-        for row in rows:
-            person_id, db_embedding = row
-            db_embedding = np.array(eval(db_embedding))  # Convert string back to NumPy array
-            similarity = cosine_similarity(embedding, db_embedding)
-            if similarity > threshold:
+        if not person_index.loaded:
+            person_index.refresh()
+
+        person_id, similarity = person_index.find_best_match(embedding)
+        if person_id is not None and similarity > threshold:
+            return person_id
+
+        # Pick up persons enrolled by other processes before giving up
+        if person_index.refresh():
+            person_id, similarity = person_index.find_best_match(embedding)
+            if person_id is not None and similarity > threshold:
                 return person_id
 
         return None
@@ -38,6 +139,3 @@ def find_matching_person(embedding, threshold=0.4):
     except sqlite3.Error as e:
         print(f"Database error in find_matching_person: {e}")
         return None
-    finally:
-        cursor.close()
-        connection.close()
\ No newline at end of file
@@ -1,8 +1,11 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from src.chatbot import chatbot
+from src.chatbot.sentence_splitter import SentenceSplitter
 from dotenv import load_dotenv
+import json
 import os
+import time
 
 # Load environment variables
 load_dotenv()
@@ -36,6 +39,65 @@ def receive_transcription():
         'response': response
     })
 
+def _sse_event(event, payload):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/transcription/stream', methods=['POST'])
+def stream_transcription():
+    """Stream the chatbot response as server-sent events.
+
+    Emits ``token`` events as text is generated, ``sentence`` events as soon as a
+    speakable sentence is complete (for TTS to start early), and a final ``done``
+    event with the full response and latency timings.
+    """
+    data = request.json
+    text = data.get('text')
+    timestamp = data.get('timestamp', 'N/A')
+
+    print(f"Received streaming transcription at {timestamp}: {text}")
+
+    def generate():
+        start = time.perf_counter()
+        first_token_ms = None
+        first_sentence_ms = None
+        splitter = SentenceSplitter()
+        parts = []
+
+        if text.lower().strip() in ['exit', 'quit', 'bye', 'exit.', 'quit.', 'bye.']:
+            chunks = iter(["Goodbye! Have a great day!"])
+        else:
+            chunks = chatbot.stream_response(text)
+
+        for chunk in chunks:
+            if first_token_ms is None:
+                first_token_ms = (time.perf_counter() - start) * 1000
+            parts.append(chunk)
+            yield _sse_event('token', {'text': chunk})
+            for sentence in splitter.feed(chunk):
+                if first_sentence_ms is None:
+                    first_sentence_ms = (time.perf_counter() - start) * 1000
+                yield _sse_event('sentence', {'text': sentence})
+
+        for sentence in splitter.flush():
+            if first_sentence_ms is None:
+                first_sentence_ms = (time.perf_counter() - start) * 1000
+            yield _sse_event('sentence', {'text': sentence})
+
+        yield _sse_event('done', {
+            'status': 'success',
+            'response': ''.join(parts),
+            'time_to_first_token_ms': first_token_ms,
+            'time_to_first_sentence_ms': first_sentence_ms,
+            'total_ms': (time.perf_counter() - start) * 1000
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint."""
@@ -44,6 +106,32 @@ def health_check():
         'message': 'Server is running'
     })
 
+@app.route('/memory/stats', methods=['GET'])
+def memory_stats():
+    """Conversation memory size and prompt token statistics."""
+    return jsonify({
+        'status': 'success',
+        'memory': chatbot.memory_manager.get_memory_stats()
+    })
+
+@app.route('/prompt/stats', methods=['GET'])
+def prompt_stats():
+    """Personality prompt cache hit rate and render time statistics."""
+    return jsonify({
+        'status': 'success',
+        'prompt_cache': chatbot.personality_manager.get_cache_stats()
+    })
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Response cache hit/miss and saved latency statistics."""
+    response_cache = chatbot.response_cache
+    return jsonify({
+        'status': 'success',
+        'enabled': response_cache is not None,
+        'response_cache': response_cache.get_stats() if response_cache else {}
+    })
+
 if __name__ == '__main__':
     print("🤖 Chatbot server started!")
     print("Listening on http://localhost:5001")
@@ -1,9 +1,9 @@
 import cv2
-import os
 import time
+from frame_ingest import FrameIngestService
 
-# Create 'frames' directory if it doesn't exist
-os.makedirs('frames', exist_ok=True)
+# Keeps the latest frames in memory and saves snapshots to 'frames' at SNAPSHOT_FPS
+ingest = FrameIngestService()
 
 # Initialize the video capture object
 cap = cv2.VideoCapture(0)
@@ -17,17 +17,14 @@ while True:
     if not ret:
         break
 
-    # Save the frame as an image file
-    frame_filename = f'frames/frame_{frame_count:04d}.jpg'
-    cv2.imwrite(frame_filename, frame)
-    print(f'Saved {frame_filename}')
-
+    ingest.ingest_frame(frame)
     frame_count += 1
 
     # Calculate and display FPS
-    elapsed_time = time.time() - start_time
-    fps = frame_count / elapsed_time
-    print(f'FPS: {fps:.2f}')
+    if frame_count % 30 == 0:
+        elapsed_time = time.time() - start_time
+        fps = frame_count / elapsed_time
+        print(f'FPS: {fps:.2f}, snapshots saved: {ingest.snapshots.written}')
 
     # Display the resulting frame
     cv2.imshow('Frame Capture', frame)
@@ -38,4 +35,5 @@ while True:
 
 # Release the capture and close windows
 cap.release()
-cv2.destroyAllWindows() 
\ No newline at end of file
+cv2.destroyAllWindows()
+ingest.close()
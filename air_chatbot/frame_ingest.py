@@ -0,0 +1,167 @@
+"""In-memory frame ingestion with rate-limited, size-bounded snapshots to disk."""
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable from the environment
+FRAME_BUFFER_SIZE = int(os.environ.get('FRAME_BUFFER_SIZE', 8))  # Decoded frames kept in memory
+SNAPSHOT_FPS = float(os.environ.get('SNAPSHOT_FPS', 1.0))  # Frames per second written to disk, 0 disables
+MAX_SNAPSHOTS = int(os.environ.get('MAX_SNAPSHOTS', 200))  # Oldest snapshots are deleted beyond this
+SNAPSHOT_DIR = os.environ.get('SAVE_DIR', 'frames')
+
+class FrameBuffer:
+    """The latest N frames as (frame_number, timestamp, frame); older ones fall off"""
+
+    def __init__(self, capacity=FRAME_BUFFER_SIZE):
+        self._frames = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def push(self, frame_number, frame):
+        with self._lock:
+            self._frames.append((frame_number, time.time(), frame))
+
+    def latest(self):
+        with self._lock:
+            return self._frames[-1] if self._frames else None
+
+    def frames(self):
+        """Buffered frames, oldest first"""
+        with self._lock:
+            return list(self._frames)
+
+    def __len__(self):
+        return len(self._frames)
+
+class SnapshotWriter:
+    """
+    Writes at most `fps` frames per second to a directory holding at most
+    `max_files` snapshots, deleting the oldest first.
+
+    Writes happen on a background thread. If it is still busy with the
+    previous snapshot, the new one is dropped rather than queued, so a slow
+    SD card never holds up the caller.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, fps=SNAPSHOT_FPS, max_files=MAX_SNAPSHOTS):
+        self.directory = directory
+        self.interval = 1.0 / fps if fps > 0 else None
+        self.max_files = max_files
+        self.written = 0
+        self.dropped = 0
+        self._next_due = 0.0
+        self._pending = queue.Queue(maxsize=1)
+        self._files = deque()
+        if self.interval is not None:
+            os.makedirs(directory, exist_ok=True)
+            # Snapshots from earlier runs count towards the limit
+            self._files.extend(sorted(glob.glob(os.path.join(directory, 'frame_*.jpg')), key=os.path.getmtime))
+            self._rotate()
+            logger.info(f"Saving snapshots to {directory} at {fps} fps, keeping the latest {max_files}")
+            self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+            self._thread.start()
+
+    def due(self):
+        """True if a snapshot should be taken now"""
+        return self.interval is not None and time.monotonic() >= self._next_due
+
+    def submit(self, frame_number, jpeg=None, frame=None):
+        """Queue a snapshot from JPEG bytes, or from a decoded frame that is encoded on the writer thread"""
+        if not self.due():
+            return False
+        self._next_due = time.monotonic() + self.interval
+        try:
+            self._pending.put_nowait((frame_number, jpeg, frame))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self):
+        if self.interval is not None:
+            self._pending.put(None)
+            self._thread.join(timeout=2.0)
+
+    def _rotate(self):
+        while len(self._files) > self.max_files:
+            try:
+                os.remove(self._files.popleft())
+            except OSError as e:
+                logger.warning(f"Could not remove old snapshot: {str(e)}")
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            frame_number, jpeg, frame = item
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            filename = os.path.join(self.directory, f"frame_{frame_number}_{timestamp}.jpg")
+            try:
+                if jpeg is None:
+                    ok, encoded = cv2.imencode('.jpg', frame)
+                    if not ok:
+                        raise ValueError("JPEG encoding failed")
+                    jpeg = encoded.tobytes()
+                with open(filename, 'wb') as f:
+                    f.write(jpeg)
+                self._files.append(filename)
+                self.written += 1
+                self._rotate()
+                logger.debug(f"Saved snapshot {filename}")
+            except Exception as e:
+                logger.error(f"Snapshot write error: {str(e)}")
+
+class FrameIngestService:
+    """
+    Accepts frames as binary JPEG (or already decoded), keeps the latest
+    FRAME_BUFFER_SIZE decoded frames in memory and persists snapshots only
+    at SNAPSHOT_FPS. JPEG snapshots are written as received, without
+    re-encoding.
+    """
+
+    def __init__(self, buffer_size=FRAME_BUFFER_SIZE, snapshot_dir=SNAPSHOT_DIR,
+                 snapshot_fps=SNAPSHOT_FPS, max_snapshots=MAX_SNAPSHOTS):
+        self.buffer = FrameBuffer(buffer_size)
+        self.snapshots = SnapshotWriter(snapshot_dir, snapshot_fps, max_snapshots)
+        self.frame_count = 0
+        self._lock = threading.Lock()
+
+    def _next_number(self):
+        with self._lock:
+            self.frame_count += 1
+            return self.frame_count
+
+    def ingest_jpeg(self, data):
+        """Decode a JPEG frame into the buffer, returns (frame_number, frame) or None if it can't be decoded"""
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+        frame_number = self._next_number()
+        self.buffer.push(frame_number, frame)
+        self.snapshots.submit(frame_number, jpeg=bytes(data))
+        return frame_number, frame
+
+    def ingest_frame(self, frame):
+        """Add an already decoded frame, returns its frame number"""
+        frame_number = self._next_number()
+        self.buffer.push(frame_number, frame)
+        self.snapshots.submit(frame_number, frame=frame)
+        return frame_number
+
+    def latest(self):
+        return self.buffer.latest()
+
+    def close(self):
+        self.snapshots.close()
+        logger.info(f"Ingested {self.frame_count} frames, saved {self.snapshots.written} snapshots "
+                    f"({self.snapshots.dropped} dropped while the disk was busy)")
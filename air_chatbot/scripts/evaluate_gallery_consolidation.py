@@ -0,0 +1,174 @@
+"""
+Check that gallery consolidation keeps recognition working under the real match rule.
+
+The fixture holds face features computed with the pipeline's own feature
+extraction from augmented crops of the training photos in
+air_hardware/.../Training_images: for every identity, stored embeddings
+from separate capture sessions (lighting, pose, scale, blur), plus held-out
+queries, each the mean of several frames like a track's averaged features.
+The last identity is never stored, its queries must stay unmatched.
+
+Each gallery variant is loaded into main.face_gallery and every query goes
+through main.match_faces, so the adaptive match-rate rule decides
+acceptance exactly as it does live. Exits with status 1 if the
+consolidated gallery accepts fewer known queries, or more wrong ones or
+strangers, than the full gallery, beyond TOLERANCE.
+
+Usage: python scripts/evaluate_gallery_consolidation.py [--build]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src', 'facial_analysis'))
+os.environ.setdefault('FACE_LOGGING_ENABLED', 'false')
+
+FIXTURE_PATH = os.path.join(ROOT, 'scripts', 'fixtures', 'face_gallery.npz')
+TRAINING_IMAGES = os.path.join(
+    os.path.dirname(ROOT), 'air_hardware', 'arduino', 'arduino_python', 'face_recog_wyze_cam', 'Training_images'
+)
+STORED_ROWS = 80  # Stored embeddings per known identity, each from its own session
+QUERIES = 100  # Held-out queries per identity
+FRAMES_PER_ROW = 6  # Frames averaged into each stored embedding or query
+FACE_WIDTH = 160  # Face width in pixels the photos are scaled to
+TOLERANCE = 0.01  # Allowed drop in correct accepts, or rise in wrong or stranger accepts
+SEED = 48
+
+def _face_region(cv2, image):
+    """
+    The largest frontal face in a photo with a face-sized margin around it,
+    scaled so the face is FACE_WIDTH pixels wide, and the face box in it
+    """
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    scale = max(1.0, max(gray.shape) / 800)
+    small = cv2.resize(gray, None, fx=1 / scale, fy=1 / scale)
+    faces = cascade.detectMultiScale(small, 1.1, 5, minSize=(60, 60))
+    x, y, w, h = [int(v * scale) for v in max(faces, key=lambda box: box[2] * box[3])]
+    x0, y0 = max(x - w, 0), max(y - h, 0)
+    region = image[y0:y + 2 * h, x0:x + 2 * w]
+    factor = FACE_WIDTH / w
+    region = cv2.resize(region, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    return region, [int(round(v * factor)) for v in (x - x0, y - y0, w, h)]
+
+def _session_frames(cv2, rng, image, box, frames):
+    """Face crops of one capture session: shared lighting, pose and blur plus per-frame jitter"""
+    x, y, w, h = box
+    angle, zoom = rng.uniform(-15, 15), rng.uniform(0.9, 1.1)
+    shift = rng.uniform(-0.06, 0.06, 2) * w
+    gamma, contrast = np.exp(rng.uniform(-0.6, 0.5)), rng.uniform(0.6, 1.2)
+    blur, side_light = rng.uniform(0, 1.5), rng.uniform(-0.4, 0.4)
+    ramp = np.linspace(1 - side_light, 1 + side_light, image.shape[1])[None, :, None]
+    quality = float(np.clip(1 - blur / 3 - abs(np.log(gamma)) / 2, 0.3, 1.0))
+
+    crops = []
+    for _ in range(frames):
+        center = (x + w / 2 + shift[0] + rng.normal(0, 0.01 * w), y + h / 2 + shift[1] + rng.normal(0, 0.01 * w))
+        matrix = cv2.getRotationMatrix2D(center, angle + rng.normal(0, 1.5), zoom)
+        warped = cv2.warpAffine(image, matrix, (image.shape[1], image.shape[0]), borderMode=cv2.BORDER_REFLECT)
+        cx, cy = int(center[0]), int(center[1])
+        crop = warped[max(cy - h // 2, 0):cy + h // 2, max(cx - w // 2, 0):cx + w // 2].astype(np.float32) / 255
+        crop = (crop * ramp[:, max(cx - w // 2, 0):cx + w // 2]) ** gamma
+        crop = (crop - 0.5) * contrast + 0.5 + rng.normal(0, 0.012, crop.shape)
+        crop = np.clip(crop * 255, 0, 255).astype(np.uint8)
+        if blur > 0.2:
+            crop = cv2.GaussianBlur(crop, (0, 0), blur * w / 64)
+        crops.append(crop)
+    return crops, quality
+
+def build_fixture():
+    """Compute the fixture from the training photos with the pipeline's feature extraction"""
+    import cv2
+    from quality import normalized_gray
+    from detector import _compute_face_features
+
+    rng = np.random.default_rng(SEED)
+    names = sorted(os.path.splitext(f)[0] for f in os.listdir(TRAINING_IMAGES) if f.lower().endswith('.jpg'))
+    stored, stored_labels, stored_qualities, queries, query_labels = [], [], [], [], []
+    for label, name in enumerate(names):
+        image, box = _face_region(cv2, cv2.imread(os.path.join(TRAINING_IMAGES, name + '.jpg')))
+        # The last identity is the stranger, only seen in queries
+        rows = (0 if label == len(names) - 1 else STORED_ROWS) + QUERIES
+        for row in range(rows):
+            crops, quality = _session_frames(cv2, rng, image, box, FRAMES_PER_ROW)
+            features = _compute_face_features(np.stack([normalized_gray(crop) for crop in crops])).mean(axis=0)
+            if row < rows - QUERIES:
+                stored.append(features)
+                stored_labels.append(label)
+                stored_qualities.append(quality)
+            else:
+                queries.append(features)
+                query_labels.append(label)
+        print(f"{name}: {rows} sessions")
+
+    os.makedirs(os.path.dirname(FIXTURE_PATH), exist_ok=True)
+    np.savez_compressed(
+        FIXTURE_PATH, names=np.array(names),
+        stored=np.array(stored, dtype=np.float16), stored_labels=np.array(stored_labels),
+        stored_qualities=np.array(stored_qualities, dtype=np.float32),
+        queries=np.array(queries, dtype=np.float16), query_labels=np.array(query_labels)
+    )
+    print(f"Wrote {FIXTURE_PATH}")
+
+def consolidated_rows(stored, labels, qualities, **options):
+    """What consolidate_person keeps for every identity, as (label, embedding, quality) rows"""
+    from consolidation import select_exemplars
+
+    rows = []
+    for label in np.unique(labels):
+        mask = labels == label
+        for _, merged, quality in select_exemplars(stored[mask], qualities[mask], **options):
+            rows.append((label, merged, quality))
+    return rows
+
+def evaluate(label_text, rows, names, queries, query_labels):
+    """Run every query through main.match_faces against a gallery of (label, embedding, quality) rows"""
+    import main
+    from registration import FaceGallery
+
+    main.face_gallery = FaceGallery()
+    for label, embedding, quality in rows:
+        main.face_gallery.add(int(label) + 1, str(names[label]), embedding, quality)
+
+    start = time.perf_counter()
+    results = main.match_faces(None, list(queries))
+    elapsed = time.perf_counter() - start
+
+    known = query_labels < len(names) - 1
+    accepted = np.array([match is not None for match, _, _ in results])
+    correct = np.array([match is not None and match[0] == label + 1 for (match, _, _), label in zip(results, query_labels)])
+    stats = {
+        'rows': len(rows),
+        'correct': correct[known].mean(),
+        'wrong': (accepted & ~correct)[known].mean(),
+        'stranger': accepted[~known].mean(),
+    }
+    print(f"{label_text:<20} {stats['rows']:>5} rows  correct {stats['correct']:6.1%}  wrong {stats['wrong']:6.1%}  "
+          f"stranger accepted {stats['stranger']:6.1%}  {1000 * elapsed / len(queries):.3f} ms/query")
+    return stats
+
+def main():
+    if '--build' in sys.argv:
+        build_fixture()
+
+    fixture = np.load(FIXTURE_PATH)
+    names, queries, query_labels = fixture['names'], fixture['queries'].astype(np.float32), fixture['query_labels']
+    stored, labels, qualities = fixture['stored'].astype(np.float32), fixture['stored_labels'], fixture['stored_qualities']
+
+    full = evaluate("full gallery", list(zip(labels, stored, qualities)), names, queries, query_labels)
+    evaluate("farthest-point only", consolidated_rows(stored, labels, qualities, medoid_iterations=0),
+             names, queries, query_labels)
+    consolidated = evaluate("consolidated", consolidated_rows(stored, labels, qualities), names, queries, query_labels)
+
+    regressed = (consolidated['correct'] < full['correct'] - TOLERANCE or
+                 consolidated['wrong'] > full['wrong'] + TOLERANCE or
+                 consolidated['stranger'] > full['stranger'] + TOLERANCE)
+    print("FAIL: consolidation changes recognition" if regressed else "OK")
+    sys.exit(1 if regressed else 0)
+
+if __name__ == "__main__":
+    main()
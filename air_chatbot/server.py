@@ -3,12 +3,11 @@ import websockets
 import json
 import base64
 import cv2
-import numpy as np
 import logging
 import sys
 import os
 import time
-from datetime import datetime
+from frame_ingest import FrameIngestService, SNAPSHOT_FPS
 
 # Configure logging
 logging.basicConfig(
@@ -26,14 +25,13 @@ PORT = 8765       # Choose a port
 DISPLAY_MODE = os.environ.get('DISPLAY_MODE', 'save')  # Options: 'window', 'save', 'none'
 SAVE_DIR = os.environ.get('SAVE_DIR', 'frames')
 
+# Latest frames from all clients; in 'save' mode snapshots go to SAVE_DIR at SNAPSHOT_FPS
+frame_ingest = None
+
 class FrameHandler:
     def __init__(self, mode='save'):
         self.mode = mode
-        if self.mode == 'save':
-            # Create frames directory if it doesn't exist
-            os.makedirs(SAVE_DIR, exist_ok=True)
-            logger.info(f"Saving frames to {SAVE_DIR}")
-        elif self.mode == 'window':
+        if self.mode == 'window':
             # Create OpenCV window
             cv2.namedWindow("Live Stream", cv2.WINDOW_NORMAL)
             cv2.resizeWindow("Live Stream", 640, 480)
@@ -44,13 +42,7 @@ class FrameHandler:
             # Display frame in window
             cv2.imshow("Live Stream", frame)
             cv2.waitKey(1)
-        elif self.mode == 'save':
-            # Save frame to file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-            filename = f"{SAVE_DIR}/frame_{frame_count}_{timestamp}.jpg"
-            cv2.imwrite(filename, frame)
-            logger.debug(f"Saved frame to {filename}")
-        # 'none' mode does nothing with the frame
+        # 'save' snapshots are taken by frame_ingest, 'none' mode does nothing with the frame
 
     def cleanup(self):
         if self.mode == 'window':
@@ -82,54 +74,63 @@ async def handle_client(websocket):
                     logger.warning("Received empty message")
                     continue
 
-                data = json.loads(message)
-                msg_type = data.get('type', 'image')
-                logger.debug(f"Received message type: {msg_type}")
-                
-                if msg_type == 'heartbeat':
-                    logger.debug("Received heartbeat")
-                    await websocket.send(json.dumps({"type": "heartbeat_ack"}))
-                    continue
+                image_data = encoded_image = None
+                if isinstance(message, bytes):
+                    # Binary messages are JPEG frames as-is
+                    image_data = message
+                else:
+                    data = json.loads(message)
+                    msg_type = data.get('type', 'image')
+                    logger.debug(f"Received message type: {msg_type}")
+                    
+                    if msg_type == 'heartbeat':
+                        logger.debug("Received heartbeat")
+                        await websocket.send(json.dumps({"type": "heartbeat_ack"}))
+                        continue
                     
-                if "image" in data:
-                    current_time = time.time()
-                    frame_time = current_time - last_frame_time
-                    last_frame_time = current_time
+                    if "image" not in data:
+                        continue
+                    # Older clients send the JPEG Base64-encoded in JSON
+                    encoded_image = data["image"]
                     
-                    frame_count += 1
-                    logger.info(f"Processing frame {frame_count} (Frame interval: {frame_time:.3f}s)")
+                current_time = time.time()
+                frame_time = current_time - last_frame_time
+                last_frame_time = current_time
+                
+                frame_count += 1
+                logger.info(f"Processing frame {frame_count} (Frame interval: {frame_time:.3f}s)")
+                
+                try:
+                    if image_data is None:
+                        image_data = base64.b64decode(encoded_image)
+                    logger.debug(f"Image data size: {len(image_data)} bytes")
+                    
+                    # Decode into the in-memory buffer
+                    ingested = frame_ingest.ingest_jpeg(image_data)
                     
-                    # Decode Base64 image
-                    try:
-                        image_data = base64.b64decode(data["image"])
-                        logger.debug(f"Decoded image data size: {len(image_data)} bytes")
+                    if ingested is not None:
+                        _, frame = ingested
+                        logger.debug(f"Frame shape: {frame.shape}")
                         
-                        # Convert to numpy array
-                        np_arr = np.frombuffer(image_data, np.uint8)
-                        frame = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+                        # Handle frame according to display mode
+                        frame_handler.handle_frame(frame, frame_count)
                         
-                        if frame is not None:
-                            logger.debug(f"Frame shape: {frame.shape}")
-                            
-                            # Handle frame according to display mode
-                            frame_handler.handle_frame(frame, frame_count)
-                            
-                            # Send acknowledgment
-                            await websocket.send(json.dumps({
-                                "type": "frame_ack",
-                                "frame_number": frame_count,
-                                "timestamp": time.time()
-                            }))
-                            logger.debug(f"Frame {frame_count} processed and acknowledged")
-                        else:
-                            logger.error("Failed to decode frame into image")
-                            
-                    except Exception as e:
-                        logger.error(f"Frame processing error: {str(e)}")
+                        # Send acknowledgment
                         await websocket.send(json.dumps({
-                            "type": "error",
-                            "message": f"Frame processing error: {str(e)}"
+                            "type": "frame_ack",
+                            "frame_number": frame_count,
+                            "timestamp": time.time()
                         }))
+                        logger.debug(f"Frame {frame_count} processed and acknowledged")
+                    else:
+                        logger.error("Failed to decode frame into image")
+                        
+                except Exception as e:
+                    logger.error(f"Frame processing error: {str(e)}")
+                    await websocket.send(json.dumps({
+                        "type": "error",
+                        "message": f"Frame processing error: {str(e)}"
+                    }))
 
             except json.JSONDecodeError as e:
                 logger.error(f"JSON decode error: {str(e)}")
@@ -145,6 +146,8 @@ async def handle_client(websocket):
         frame_handler.cleanup()
 
 async def start_server():
+    global frame_ingest
+    frame_ingest = FrameIngestService(snapshot_dir=SAVE_DIR, snapshot_fps=SNAPSHOT_FPS if DISPLAY_MODE == 'save' else 0)
     try:
         async with websockets.serve(
             handle_client, 
@@ -160,6 +163,8 @@ async def start_server():
             await asyncio.Future()  # run forever
     except Exception as e:
         logger.error(f"Server startup error: {str(e)}")
+    finally:
+        frame_ingest.close()
 
 if __name__ == "__main__":
     try:
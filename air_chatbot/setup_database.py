@@ -62,6 +62,8 @@ def setup_database():
             person_id INTEGER NOT NULL,
             features BLOB NOT NULL,
             quality_score FLOAT NOT NULL,
+            dim INTEGER,
+            format INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (person_id) REFERENCES persons(id)
         )
@@ -75,6 +77,21 @@ def setup_database():
         ''')
         print("Created index on face_embeddings table")
         
+        # Create face_centroids table, one running mean embedding per person
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS face_centroids (
+            person_id INTEGER PRIMARY KEY,
+            features BLOB NOT NULL,
+            dim INTEGER NOT NULL,
+            format INTEGER NOT NULL,
+            weight FLOAT NOT NULL,
+            last_embedding_id INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (person_id) REFERENCES persons(id)
+        )
+        ''')
+        print("Created 'face_centroids' table")
+        
         # Drop existing summary table if it exists (since we're changing its structure)
         cursor.execute("DROP TABLE IF EXISTS summary")
         
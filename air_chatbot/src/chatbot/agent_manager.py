@@ -1,5 +1,5 @@
 """Simplified Agent management module for the chatbot."""
-from typing import Callable, Optional
+from typing import Callable, Dict, Iterator, Optional
 from langchain_openai import ChatOpenAI
 from .router import QueryType
 from ..whatsapp_module.ai_agent_V5 import whatsapp_bot
@@ -7,6 +7,7 @@ from ..email_agent.email_chatbot import email_bot
 from ..object_detection.object_detection import detect_objects
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.schema.runnable import RunnablePassthrough
+from langchain_core.messages import AIMessageChunk
 from .todo_file_agents import todo_agent, file_agent
 from .logger import system_logger
 import os
@@ -45,3 +46,32 @@ class AgentManager:
         else:
             system_logger.log(f"No agent found for {query_type.value}", "WARNING")
         return agent
+
+    def stream_agent(self, query_type: QueryType, agent: Callable, input_data: Dict, thread_id: str) -> Iterator[str]:
+        """Yield an agent's response as text chunks while it is being generated."""
+        system_logger.log(f"Streaming agent response for query type: {query_type.value}")
+
+        # LangGraph agents (TODO, FILE): stream tokens of the agent node, skipping tool traffic
+        if query_type in [QueryType.TODO, QueryType.FILE]:
+            for chunk, metadata in agent.stream(
+                {"messages": [{"role": "user", "content": input_data["input"]}]},
+                {"configurable": {"thread_id": thread_id}},
+                stream_mode="messages"
+            ):
+                if isinstance(chunk, AIMessageChunk) and chunk.content and metadata.get("langgraph_node") == "agent":
+                    yield chunk.content
+
+        # Function-style agents return whole strings and cannot be streamed
+        elif query_type in [QueryType.EMAIL, QueryType.WHATSAPP, QueryType.VISION]:
+            yield agent(input_data["input"])
+
+        # LangChain runnables (GENERAL chain)
+        elif hasattr(agent, "stream"):
+            for chunk in agent.stream(input_data):
+                content = chunk.content if hasattr(chunk, "content") else chunk
+                if content:
+                    yield content
+
+        else:
+            response = agent(input_data)
+            yield response.content if hasattr(response, "content") else response
@@ -1,6 +1,7 @@
 """Chatbot module for handling user interactions."""
 import os
-from typing import Dict, Optional
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from ..attributes_management.attributes_management import (
@@ -13,6 +14,17 @@ from .memory_manager import MemoryManager
 from .personality_manager import PersonalityManager
 from .session_manager import SessionManager
 from .conversation_manager import ConversationManager
+from .fake_llm import create_fake_llm
+from .response_cache import ResponseCache, QueryEmbedder
+from ..config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_TTL_SECONDS,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_QUERY_TYPES,
+    RESPONSE_CACHE_EMBEDDING_MODEL,
+    RESPONSE_CACHE_MIN_WORDS
+)
 from datetime import datetime
 from .logger import system_logger
 
@@ -35,11 +47,15 @@ class PersonalizedChatbot:
             
         system_logger.log("Initializing PersonalizedChatbot")
         
-        self.llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0.9,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
+        if os.getenv("CHATBOT_FAKE_LLM", "false").lower() == "true":
+            # Offline runs and benchmarks: canned replies with simulated latency
+            self.llm = create_fake_llm(latency=float(os.getenv("CHATBOT_FAKE_LLM_LATENCY", "0")))
+        else:
+            self.llm = ChatOpenAI(
+                model_name="gpt-3.5-turbo",
+                temperature=0.9,
+                api_key=os.getenv("OPENAI_API_KEY")
+            )
         
         # Initialize managers in correct order
         self.router = RouterChain(self.llm)
@@ -47,7 +63,15 @@ class PersonalizedChatbot:
         self.personality_manager = PersonalityManager()
         self.conversation_manager = ConversationManager()
         self.session_manager = SessionManager()  # Initialize without memory manager
-        self.memory_manager = MemoryManager(self.llm)
+        self.memory_manager = MemoryManager(self.llm, personality_manager=self.personality_manager)
+        self.response_cache = ResponseCache(
+            similarity_threshold=RESPONSE_CACHE_SIMILARITY,
+            ttl_seconds=RESPONSE_CACHE_TTL_SECONDS,
+            max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+            cacheable_types=[QueryType(t.strip()) for t in RESPONSE_CACHE_QUERY_TYPES if t.strip()],
+            embedder=QueryEmbedder(RESPONSE_CACHE_EMBEDDING_MODEL),
+            min_query_words=RESPONSE_CACHE_MIN_WORDS
+        ) if RESPONSE_CACHE_ENABLED else None
         
         # Set up bidirectional references
         self.session_manager.set_memory_manager(self.memory_manager)  # Set memory manager in session manager
@@ -66,6 +90,139 @@ class PersonalizedChatbot:
             return False
         return True
 
+    def _response_context_hash(self, current_person) -> str:
+        """Hash of the person and personality/attribute context a cached response is valid for."""
+        return ResponseCache.context_hash(current_person.id, self.personality_manager.attributes_hash(current_person))
+
+    def _get_cached_response(self, current_person, user_input: str, query_type: QueryType,
+                             context_hash: str) -> Optional[str]:
+        """Return a cached response for a near-duplicate query of a cacheable type, recording it in memory."""
+        if not self.response_cache or not self.response_cache.is_cacheable(query_type):
+            return None
+        try:
+            response = self.response_cache.lookup(user_input, context_hash)
+        except Exception as e:
+            system_logger.log(f"Error looking up response cache: {str(e)}", "ERROR")
+            return None
+        if response is not None:
+            self.memory_manager.update_memory(current_person.id, user_input, response)
+        return response
+
+    def _cache_response(self, user_input: str, context_hash: str, routed_type: QueryType,
+                        response: str, latency: float) -> None:
+        """Store a generated response if its routed query type is cacheable."""
+        if not self.response_cache:
+            return
+        try:
+            if self.response_cache.store(user_input, context_hash, routed_type, response, latency):
+                system_logger.log(f"Cached response for {routed_type.value} query")
+        except Exception as e:
+            system_logger.log(f"Error storing response in cache: {str(e)}", "ERROR")
+
+    def _route(self, user_input: str) -> QueryType:
+        """Use the router to determine the query type."""
+        query_type = self.router.route_query(user_input)
+        system_logger.log(f"Query type determined: {query_type}")
+        return query_type
+
+    def _prepare_request(self, current_person, user_input: str,
+                         routed_type: QueryType) -> Tuple[QueryType, Optional[Callable], Dict]:
+        """Build the agent input for the current person and an already routed query.
+
+        Returns the query type whose agent handles it, the agent and its input data.
+        """
+        query_type = routed_type
+        
+        # Handle attribute updates if needed
+        attributes = {}
+        if query_type == QueryType.ATTRIBUTES:
+            try:
+                system_logger.log("Processing attribute update")
+                # Use the imported identify_attributes function
+                attributes = identify_attributes.invoke({
+                    "input": {"user_input": user_input}
+                })
+                # Use the imported update_person_attributes function
+                attributes_updated = update_person_attributes.invoke({
+                    "input": {
+                        "person_id": current_person.id,
+                        "attributes": attributes
+                    }
+                })
+                system_logger.log(f"Attributes updated: {attributes}")
+            except Exception as e:
+                system_logger.log(f"Error updating attributes: {str(e)}", "ERROR")
+                attributes = {}
+        
+        # Get conversation history
+        conversation_history = self.conversation_manager.format_conversation_history(current_person.id)
+        system_logger.log("Retrieved conversation history")
+        
+        # Create personality-based prompt
+        personality_prompt = self.personality_manager.create_personality_prompt(
+            current_person, 
+            conversation_history
+        )
+        system_logger.log("Created personality prompt")
+        
+        # Prepare input data with context
+        chat_history = self.memory_manager.get_chat_history(current_person.id)
+        input_data = {
+            "input": user_input,
+            "chat_history": chat_history,
+            "personality_prompt": personality_prompt
+        }
+        self.memory_manager.record_prompt_tokens(current_person.id, personality_prompt, chat_history, user_input)
+        
+        if query_type == QueryType.ATTRIBUTES:
+            query_type = QueryType.GENERAL
+            
+        agent = self.agent_manager.get_agent(query_type)
+        if not agent:
+            system_logger.log(f"No agent found for query type: {query_type}", "ERROR")
+        else:
+            system_logger.log(f"Using agent for query type: {query_type}")
+        return query_type, agent, input_data
+
+    def _run_agent(self, query_type: QueryType, agent: Callable, input_data: Dict, person_id: int) -> str:
+        """Run an agent to completion and return its text response."""
+        # For LangGraph output (TODO, FILE)
+        if query_type in [QueryType.TODO, QueryType.FILE]:
+            thread_id = f"user-{person_id}"
+            system_logger.log(f"Processing LangGraph request with thread_id: {thread_id}")
+            result = agent.invoke(
+                {"messages": [{"role": "user", "content": input_data["input"]}]},
+                {"configurable": {"thread_id": thread_id}}
+            )
+            
+            # Extract final AI message content
+            messages = result.get("messages", [])
+            if messages and hasattr(messages[-1], "content"):
+                response = messages[-1].content
+            else:
+                response = "No valid response generated."
+                system_logger.log("No valid response generated from LangGraph", "WARNING")
+
+        # Email agent: extract input string
+        elif query_type == QueryType.EMAIL or query_type == QueryType.WHATSAPP or query_type == QueryType.VISION:
+            system_logger.log(f"Processing {query_type} request")
+            response = agent(input_data["input"])
+
+        # LangChain agent: use .invoke()
+        elif hasattr(agent, "invoke"):
+            system_logger.log("Processing LangChain agent request")
+            response = agent.invoke(input_data)
+
+        # Function-style agent
+        else:
+            system_logger.log("Processing function-style agent request")
+            response = agent(input_data)
+
+        # Extract content if it's a LangChain message object
+        if hasattr(response, "content"):
+            response = response.content
+        return response
+
     def get_response(self, user_input: str) -> str:
         system_logger.log(f"Processing user input: {user_input}")
         
@@ -81,95 +238,22 @@ class PersonalizedChatbot:
                 
             system_logger.log(f"Current person: {current_person.id}")
                 
-            # Use the router to determine query type
             try:
-                query_type = self.router.route_query(user_input)
-                system_logger.log(f"Query type determined: {query_type}")
-                
-                # Handle attribute updates if needed
-                attributes = {}
-                if query_type == QueryType.ATTRIBUTES:
-                    try:
-                        system_logger.log("Processing attribute update")
-                        # Use the imported identify_attributes function
-                        attributes = identify_attributes.invoke({
-                            "input": {"user_input": user_input}
-                        })
-                        # Use the imported update_person_attributes function
-                        attributes_updated = update_person_attributes.invoke({
-                            "input": {
-                                "person_id": current_person.id,
-                                "attributes": attributes
-                            }
-                        })
-                        system_logger.log(f"Attributes updated: {attributes}")
-                    except Exception as e:
-                        system_logger.log(f"Error updating attributes: {str(e)}", "ERROR")
-                        attributes = {}
-                
-                # Get conversation history
-                conversation_history = self.conversation_manager.format_conversation_history(current_person.id)
-                system_logger.log("Retrieved conversation history")
-                
-                # Create personality-based prompt
-                personality_prompt = self.personality_manager.create_personality_prompt(
-                    current_person, 
-                    conversation_history
-                )
-                system_logger.log("Created personality prompt")
-                
-                # Prepare input data with context
-                input_data = {
-                    "input": user_input,
-                    "chat_history": self.memory_manager.get_memory(current_person.id).chat_memory.messages if current_person.id in self.memory_manager.get_memory_ids() else [],
-                    "personality_prompt": personality_prompt
-                }
-                
-                if query_type == QueryType.ATTRIBUTES:
-                    query_type = QueryType.GENERAL
-                    
-                agent = self.agent_manager.get_agent(query_type)
+                start = time.perf_counter()
+                routed_type = self._route(user_input)
+
+                # Near-duplicate queries of a cacheable type skip generation
+                context_hash = self._response_context_hash(current_person)
+                cached_response = self._get_cached_response(current_person, user_input, routed_type, context_hash)
+                if cached_response is not None:
+                    return cached_response
+
+                query_type, agent, input_data = self._prepare_request(current_person, user_input, routed_type)
                 if not agent:
-                    system_logger.log(f"No agent found for query type: {query_type}", "ERROR")
                     return f"No agent found for query type: {query_type}"
 
-                system_logger.log(f"Using agent for query type: {query_type}")
-
-                # For LangGraph output (TODO, FILE)
-                if query_type in [QueryType.TODO, QueryType.FILE]:
-                    thread_id = f"user-{current_person.id}"
-                    system_logger.log(f"Processing LangGraph request with thread_id: {thread_id}")
-                    result = agent.invoke(
-                        {"messages": [{"role": "user", "content": input_data["input"]}]},
-                        {"configurable": {"thread_id": thread_id}}
-                    )
-                    
-                    # Extract final AI message content
-                    messages = result.get("messages", [])
-                    if messages and hasattr(messages[-1], "content"):
-                        response = messages[-1].content
-                    else:
-                        response = "No valid response generated."
-                        system_logger.log("No valid response generated from LangGraph", "WARNING")
-
-                # Email agent: extract input string
-                elif query_type == QueryType.EMAIL or query_type == QueryType.WHATSAPP or query_type == QueryType.VISION:
-                    system_logger.log(f"Processing {query_type} request")
-                    response = agent(input_data["input"])
-
-                # LangChain agent: use .invoke()
-                elif hasattr(agent, "invoke"):
-                    system_logger.log("Processing LangChain agent request")
-                    response = agent.invoke(input_data)
-
-                # Function-style agent
-                else:
-                    system_logger.log("Processing function-style agent request")
-                    response = agent(input_data)
-
-                # Extract content if it's a LangChain message object
-                if hasattr(response, "content"):
-                    response = response.content
+                response = self._run_agent(query_type, agent, input_data, current_person.id)
+                self._cache_response(user_input, context_hash, routed_type, response, time.perf_counter() - start)
 
                 # Update memory with the interaction
                 self.memory_manager.update_memory(current_person.id, user_input, response)
@@ -187,5 +271,51 @@ class PersonalizedChatbot:
             system_logger.log(f"Critical error: {str(e)}\n{traceback.format_exc()}", "CRITICAL")
             return "I apologize, but I'm having trouble at the moment. Please try again."
 
+    def stream_response(self, user_input: str) -> Iterator[str]:
+        """Yield the response as text chunks while it is generated; memory is updated at the end."""
+        system_logger.log(f"Streaming response for user input: {user_input}")
+        
+        if not self._validate_input(user_input):
+            yield "Invalid input. Please try again."
+            return
+        try:
+            current_person = self.session_manager.get_current_person()
+            if not current_person:
+                system_logger.log("No active person found in database", "ERROR")
+                yield "Error: No active person found in the database."
+                return
+            start = time.perf_counter()
+            routed_type = self._route(user_input)
+            context_hash = self._response_context_hash(current_person)
+            cached_response = self._get_cached_response(current_person, user_input, routed_type, context_hash)
+            if cached_response is not None:
+                yield cached_response
+                return
+            query_type, agent, input_data = self._prepare_request(current_person, user_input, routed_type)
+        except Exception as e:
+            import traceback
+            system_logger.log(f"Critical error: {str(e)}\n{traceback.format_exc()}", "CRITICAL")
+            yield "I apologize, but I'm having trouble at the moment. Please try again."
+            return
+        if not agent:
+            yield f"No agent found for query type: {query_type}"
+            return
+
+        chunks = []
+        try:
+            for chunk in self.agent_manager.stream_agent(query_type, agent, input_data, f"user-{current_person.id}"):
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            system_logger.log(f"Error streaming response: {str(e)}", "ERROR")
+            if not chunks:
+                yield "I had trouble processing your request. Please try again."
+            return
+
+        response = "".join(chunks)
+        self.memory_manager.update_memory(current_person.id, user_input, response)
+        self._cache_response(user_input, context_hash, routed_type, response, time.perf_counter() - start)
+        system_logger.log("Streamed response generated successfully")
+
 # Create a singleton instance
 chatbot = PersonalizedChatbot() 
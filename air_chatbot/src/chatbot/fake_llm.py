@@ -0,0 +1,26 @@
+"""Offline stand-in LLM for running the chatbot without the OpenAI API."""
+from typing import List, Optional
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from .logger import system_logger
+
+DEFAULT_FAKE_RESPONSES = [
+    "general",
+    "This is a canned reply from the local fake LLM.",
+]
+
+def create_fake_llm(responses: Optional[List[str]] = None, latency: float = 0.0) -> FakeListChatModel:
+    """
+    Create a chat model that cycles through canned responses.
+
+    Args:
+        responses: Replies returned in order, wrapping around at the end
+        latency: Seconds slept per call (and per chunk when streaming)
+
+    Returns:
+        A LangChain chat model usable anywhere ChatOpenAI is
+    """
+    system_logger.log(f"Using local fake LLM with {latency}s simulated latency", "WARNING")
+    return FakeListChatModel(
+        responses=responses or DEFAULT_FAKE_RESPONSES,
+        sleep=latency or None
+    )
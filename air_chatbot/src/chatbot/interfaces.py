@@ -1,7 +1,8 @@
 """Interface definitions for chatbot components."""
-from typing import Protocol, Optional
+from typing import Protocol, Optional, List
 from datetime import datetime
 from langchain.memory import ConversationBufferMemory
+from langchain.schema import BaseMessage
 from ..database.database import Person
 
 class IMemoryManager(Protocol):
@@ -33,6 +34,15 @@ class IMemoryManager(Protocol):
         """
         ...
 
+    def get_chat_history(self, person_id: int) -> List[BaseMessage]:
+        """Get the budgeted chat history for a person's prompt.
+        
+        Should log:
+        - History retrieval attempt
+        - Whether memory was found
+        """
+        ...
+
     def update_memory_timestamp(self, person_id: int) -> None:
         """Update memory timestamp.
         
@@ -1,16 +1,27 @@
 """Memory management module for the chatbot."""
-from typing import Dict, List, Optional, TypedDict
+from typing import Any, Dict, List, Optional, TypedDict
+from collections import OrderedDict
 from datetime import datetime
 import threading
 import time
 import json
 from langchain.memory import ConversationBufferMemory
-from langchain.schema import SystemMessage, AIMessage
+from langchain.schema import BaseMessage, SystemMessage, AIMessage
 from langchain_openai import ChatOpenAI
 from ..database.database import get_database, Person, Active, Conversation
+from ..config import (
+    MEMORY_TOKEN_BUDGET,
+    MEMORY_MAX_RESIDENT_PERSONS,
+    MEMORY_IDLE_SECONDS,
+    MEMORY_TOKENIZER_MODEL,
+    MEMORY_SUMMARY_WORKERS,
+    MEMORY_SUMMARY_MAX_RETRIES
+)
 from .personality_manager import PersonalityManager
 from .conversation_manager import ConversationManager
 from .interfaces import ISessionManager, IMemoryManager
+from .summary_worker import SummaryWorker, RESCHEDULE
+from .token_counter import TokenCounter
 from .logger import system_logger
 
 class ConversationSummary(TypedDict):
@@ -19,136 +30,160 @@ class ConversationSummary(TypedDict):
     end_time: datetime
 
 class MemoryManager(IMemoryManager):
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: ChatOpenAI, token_budget: int = MEMORY_TOKEN_BUDGET,
+                 max_resident_persons: int = MEMORY_MAX_RESIDENT_PERSONS,
+                 idle_seconds: int = MEMORY_IDLE_SECONDS,
+                 summary_workers: int = MEMORY_SUMMARY_WORKERS,
+                 personality_manager: Optional[PersonalityManager] = None):
         system_logger.log("Initializing MemoryManager", "INFO", is_memory_log=True)
         self.llm = llm
         self.db = get_database()
-        self.memories = {}
+        self.token_budget = token_budget
+        self.max_resident_persons = max_resident_persons
+        self.idle_seconds = idle_seconds
+        self.token_counter = TokenCounter(MEMORY_TOKENIZER_MODEL)
+        # Ordered from least to most recently used, for LRU eviction
+        self.memories: "OrderedDict[int, ConversationBufferMemory]" = OrderedDict()
         self.memory_last_used = {}
         self.conversation_start_indices = {}
+        # Running summary of turns that were rolled out of each person's buffer
+        self.running_summaries: Dict[int, str] = {}
+        # Rolled-out lines waiting for (or being folded in by) a running summary update
+        self.pending_rollups: Dict[int, List[str]] = {}
+        self.rollups_in_flight: Dict[int, List[str]] = {}
+        # Conversations detached from memory whose summary has not reached the database yet
+        self.detached_conversations: Dict[int, List[str]] = {}
+        self.prompt_token_stats: Dict[int, Dict[str, int]] = {}
+        self.eviction_count = 0
+        self.summarized_message_count = 0
+        self._lock = threading.RLock()
         self.last_active_check = None
-        self.personality_manager = PersonalityManager()
+        # Shared with the chatbot so both hit the same prompt section cache
+        self.personality_manager = personality_manager or PersonalityManager()
         self.conversation_manager = ConversationManager()
         self._session_manager: Optional[ISessionManager] = None
-        self.cleanup_thread = None  # Don't start thread yet
+        self.summary_worker = SummaryWorker(
+            self._run_summary_job,
+            max_workers=summary_workers,
+            max_retries=MEMORY_SUMMARY_MAX_RETRIES
+        )
         system_logger.log("MemoryManager initialized successfully", "INFO", is_memory_log=True)
 
     def set_session_manager(self, session_manager: ISessionManager) -> None:
-        """Set the session manager and start the background cleanup thread."""
-        system_logger.log("Setting session manager and starting cleanup thread", "INFO", is_memory_log=True)
+        """Set the session manager used to keep the active person's memory resident."""
+        system_logger.log("Setting session manager", "INFO", is_memory_log=True)
         self._session_manager = session_manager
-        # Start the background thread only after session manager is set
-        if not self.cleanup_thread:
-            self.cleanup_thread = threading.Thread(target=self._background_cleanup, daemon=True)
-            self.cleanup_thread.start()
-            system_logger.log("Cleanup thread started", "INFO", is_memory_log=True)
-
-    def _background_cleanup(self):
-        """Background thread that periodically checks for and cleans up inactive memories."""
-        system_logger.log("Starting background cleanup thread", "INFO", is_memory_log=True)
-        while True:
-            try:
-                self._cleanup_inactive_memories()
-            except Exception as e:
-                system_logger.log(f"Error in background cleanup: {str(e)}", "ERROR", is_memory_log=True)
-            time.sleep(60)  # Check every minute
 
-    def _cleanup_inactive_memories(self):
-        """Clean up memories that haven't been used for over 1 minute."""
-        system_logger.log("Starting memory cleanup process", "INFO", is_memory_log=True)
-        
-        if not self._session_manager:
-            system_logger.log("Session manager not set in memory manager", "ERROR", is_memory_log=True)
-            return
-            
-        current_time = datetime.utcnow()
-        inactive_persons = []
+    def _run_summary_job(self, person_id: int):
+        """Summary worker job: flush detached conversations, then summarize the person if idle."""
+        self._flush_detached_conversations(person_id)
+        return self._summarize_if_idle(person_id)
 
-        system_logger.log(f"Checking for inactive memories at {current_time}", "INFO", is_memory_log=True)
+    def _summarize_if_idle(self, person_id: int):
+        """Detach and summarize a person's memory once it has been idle past the timeout."""
+        with self._lock:
+            if person_id not in self.memories:
+                system_logger.log(f"No memory found for person {person_id}", "INFO", is_memory_log=True)
+                return None
+            last_used = self.memory_last_used.get(person_id, datetime.utcnow())
         
-        # Create a copy of the items to avoid dictionary changed size during iteration
-        memory_items = list(self.memory_last_used.items())
+        inactive_time = (datetime.utcnow() - last_used).total_seconds()
+        if inactive_time < self.idle_seconds:
+            # Newer activity has already pushed a later deadline
+            system_logger.log(f"Person {person_id} is inactive but not yet ready for cleanup", "INFO", is_memory_log=True)
+            return RESCHEDULE
         
-        for person_id, last_used in memory_items:
-            system_logger.log(f"Processing person {person_id}, last used: {last_used}", "INFO", is_memory_log=True)
-            
-            # Skip the current active person
-            active_person = self._session_manager.get_current_person()
-            if not active_person:
-                system_logger.log("No active person found in session manager", "WARNING", is_memory_log=True)
-                continue
-                
-            if person_id == active_person.id:
-                system_logger.log(f"Person {person_id} is currently active, skipping", "INFO", is_memory_log=True)
-                continue
-
-            # Check if memory is older than 1 minute
-            inactive_time = (current_time - last_used).total_seconds()
-            
-            if inactive_time > 60:
-                system_logger.log(f"Person {person_id} is inactive for {inactive_time:.1f} seconds", "INFO", is_memory_log=True)
-                if person_id in self.memories:
-                    try:
-                        self._save_memory_summary(person_id)
-                        system_logger.log(f"Successfully saved summary for person {person_id}", "INFO", is_memory_log=True)
-                        inactive_persons.append(person_id)
-                    except Exception as e:
-                        system_logger.log(f"Error saving summary for person {person_id}: {str(e)}", "ERROR", is_memory_log=True)
-                else:
-                    system_logger.log(f"No memory found for person {person_id}", "WARNING", is_memory_log=True)
-            else:
-                system_logger.log(f"Person {person_id} is inactive but not yet ready for cleanup", "INFO", is_memory_log=True)
-
-        # Remove inactive memories and their tracking data
-        for person_id in inactive_persons:
-            try:
-                self._cleanup_person_data(person_id)
-                system_logger.log(f"Successfully cleaned up person {person_id}", "INFO", is_memory_log=True)
-            except Exception as e:
-                system_logger.log(f"Error cleaning up person {person_id}: {str(e)}", "ERROR", is_memory_log=True)
+        # Keep the current active person's memory resident
+        active_person = self._session_manager.get_current_person() if self._session_manager else None
+        if active_person and person_id == active_person.id:
+            system_logger.log(f"Person {person_id} is currently active, skipping", "INFO", is_memory_log=True)
+            self.summary_worker.schedule(person_id, time.time() + self.idle_seconds)
+            return RESCHEDULE
         
-        system_logger.log("Memory cleanup process complete", "INFO", is_memory_log=True)
+        system_logger.log(f"Person {person_id} is inactive for {inactive_time:.1f} seconds", "INFO", is_memory_log=True)
+        self._detach_memory(person_id)
+        self._flush_detached_conversations(person_id)
+        return None
+
+    def _detach_memory(self, person_id: int) -> None:
+        """Move a person's unsaved conversation out of memory and queue it for summarization."""
+        with self._lock:
+            conversation_text = self._snapshot_conversation_text(person_id)
+            self._cleanup_person_data(person_id)
+            if conversation_text:
+                self.detached_conversations.setdefault(person_id, []).append(conversation_text)
+
+    def _flush_detached_conversations(self, person_id: int) -> None:
+        """Summarize and store detached conversations, keeping any that fail for a retry."""
+        with self._lock:
+            conversations = self.detached_conversations.pop(person_id, [])
+        for i, conversation_text in enumerate(conversations):
+            try:
+                self._store_summary(person_id, conversation_text)
+            except Exception:
+                with self._lock:
+                    remaining = conversations[i:] + self.detached_conversations.get(person_id, [])
+                    self.detached_conversations[person_id] = remaining
+                raise
+
+    def _schedule_summary_now(self, person_id: int) -> None:
+        """Ask the summary worker to handle a person as soon as a worker is free."""
+        self.summary_worker.schedule(person_id, time.time())
 
     def _cleanup_person_data(self, person_id: int) -> None:
         """Clean up memory data for a specific person."""
         system_logger.log(f"Cleaning up data for person {person_id}", "INFO", is_memory_log=True)
         try:
-            if person_id in self.memories:
-                del self.memories[person_id]
-                system_logger.log(f"Removed memory for person {person_id}", "INFO", is_memory_log=True)
-            if person_id in self.memory_last_used:
-                del self.memory_last_used[person_id]
-                system_logger.log(f"Removed last used entry for person {person_id}", "INFO", is_memory_log=True)
-            if person_id in self.conversation_start_indices:
-                del self.conversation_start_indices[person_id]
-                system_logger.log(f"Removed start index for person {person_id}", "INFO", is_memory_log=True)
+            with self._lock:
+                if person_id in self.memories:
+                    del self.memories[person_id]
+                    system_logger.log(f"Removed memory for person {person_id}", "INFO", is_memory_log=True)
+                if person_id in self.memory_last_used:
+                    del self.memory_last_used[person_id]
+                    system_logger.log(f"Removed last used entry for person {person_id}", "INFO", is_memory_log=True)
+                if person_id in self.conversation_start_indices:
+                    del self.conversation_start_indices[person_id]
+                    system_logger.log(f"Removed start index for person {person_id}", "INFO", is_memory_log=True)
+                self.running_summaries.pop(person_id, None)
+                self.pending_rollups.pop(person_id, None)
+                self.rollups_in_flight.pop(person_id, None)
+                self.prompt_token_stats.pop(person_id, None)
             
             system_logger.log(f"Successfully cleaned up data for person {person_id}", "INFO", is_memory_log=True)
         except Exception as e:
             system_logger.log(f"Error cleaning up person data: {str(e)}", "ERROR", is_memory_log=True)
 
-    def _save_memory_summary(self, person_id: int):
-        """Create a summary of only the new conversation and save it to the database."""
-        system_logger.log(f"Starting memory summary save for person {person_id}", "INFO", is_memory_log=True)
-        
+    def _snapshot_conversation_text(self, person_id: int) -> Optional[str]:
+        """Build the text of a person's new conversation, including rolled-out turns."""
         if person_id not in self.memories or person_id not in self.conversation_start_indices:
             system_logger.log(f"Missing required data for person {person_id}", "ERROR", is_memory_log=True)
-            return
-
+            return None
+        
         memory = self.memories[person_id]
         messages = memory.chat_memory.messages
         start_idx = self.conversation_start_indices[person_id]
         new_conversation_messages = messages[start_idx:]
         
+        running_summary = self.running_summaries.get(person_id, "")
+        unsummarized_lines = self.rollups_in_flight.get(person_id, []) + self.pending_rollups.get(person_id, [])
+        
         system_logger.log(f"Processing {len(new_conversation_messages)} new messages for summary", "INFO", is_memory_log=True)
         
-        if not new_conversation_messages:
+        if not new_conversation_messages and not running_summary and not unsummarized_lines:
             system_logger.log("No new messages to summarize", "INFO", is_memory_log=True)
-            return
+            return None
+        
+        conversation_text = ' '.join(unsummarized_lines + [f"{m.type}: {m.content}" for m in new_conversation_messages])
+        if running_summary:
+            # Turns rolled out of the token budget only survive in the running summary
+            conversation_text = f"(Summary of the earlier part of this conversation: {running_summary}) {conversation_text}"
+        return conversation_text
 
-        conversation_text = ' '.join([f"{m.type}: {m.content}" for m in new_conversation_messages])
+    def _store_summary(self, person_id: int, conversation_text: str) -> None:
+        """Summarize a conversation with the LLM and save it to the database."""
+        system_logger.log(f"Starting memory summary save for person {person_id}", "INFO", is_memory_log=True)
         summary_prompt = f"""Create a concise and accurate summary of the conversation. Follow these guidelines:
-
+        
         1. Focus on the actual information exchanged, not assumptions or inferences
         2. Maintain chronological order of events
         3. Include corrections or clarifications that were made
@@ -157,22 +192,24 @@ class MemoryManager(IMemoryManager):
         6. Include any important context or background information that was shared
         7. If there were any misunderstandings or corrections, include those
         8. Keep the summary objective and factual
-
+        
         Conversation:
         {conversation_text}
-
+        
         Remember: Only include information that was explicitly shared in the conversation. Don't make assumptions or add information that wasn't mentioned."""
 
         try:
             system_logger.log("Generating summary with LLM", "INFO", is_memory_log=True)
             summary = self.llm.predict(summary_prompt)
             system_logger.log(f"Generated summary of length {len(summary)}", "INFO", is_memory_log=True)
-
+            
             system_logger.log("Saving summary to database", "INFO", is_memory_log=True)
-            self.conversation_manager.add_conversation_summary(person_id, summary)
+            if not self.conversation_manager.add_conversation_summary(person_id, summary):
+                raise RuntimeError("conversation summary was not saved")
             system_logger.log("Successfully saved summary to database", "INFO", is_memory_log=True)
         except Exception as e:
             system_logger.log(f"Error in summary generation/saving: {str(e)}", "ERROR", is_memory_log=True)
+            raise
         
         system_logger.log(f"Memory summary save complete for person {person_id}", "INFO", is_memory_log=True)
 
@@ -185,7 +222,7 @@ class MemoryManager(IMemoryManager):
             system_logger.log(f"Memory already exists for person {person.id}, updating timestamp", "INFO", is_memory_log=True)
             self.update_memory_timestamp(person.id)
             return
-            
+        
         memory = ConversationBufferMemory(
             return_messages=True,
             input_key="input",
@@ -199,15 +236,39 @@ class MemoryManager(IMemoryManager):
         memory.chat_memory.add_message(SystemMessage(content=system_prompt))
         memory.chat_memory.add_message(AIMessage(content=f"Hello {person.name}! I'm here to chat with you."))
         
-        self.memories[person.id] = memory
-        self.memory_last_used[person.id] = datetime.utcnow()
-        self.conversation_start_indices[person.id] = len(memory.chat_memory.messages)
+        with self._lock:
+            self.memories[person.id] = memory
+            self.conversation_start_indices[person.id] = len(memory.chat_memory.messages)
+        self.update_memory_timestamp(person.id)
         system_logger.log(f"Memory initialized for person {person.id}", "INFO", is_memory_log=True)
+        
+        self._evict_least_recently_used(keep_person_id=person.id)
+
+    def _evict_least_recently_used(self, keep_person_id: int) -> None:
+        """Detach the least recently used memories while over the resident limit."""
+        while True:
+            with self._lock:
+                if len(self.memories) <= self.max_resident_persons:
+                    return
+                candidates = [pid for pid in self.memories if pid != keep_person_id]
+                if not candidates:
+                    return
+                person_id = candidates[0]
+                system_logger.log(f"Resident memory limit {self.max_resident_persons} reached, evicting person {person_id}", "INFO", is_memory_log=True)
+                self._detach_memory(person_id)
+                self.eviction_count += 1
+            # The summary is written by the worker so the caller never waits on the LLM
+            self._schedule_summary_now(person_id)
 
     def update_memory_timestamp(self, person_id: int) -> None:
         """Update the last used timestamp for a person's memory."""
         system_logger.log(f"Updating memory timestamp for person {person_id}", "INFO", is_memory_log=True)
-        self.memory_last_used[person_id] = datetime.utcnow()
+        with self._lock:
+            self.memory_last_used[person_id] = datetime.utcnow()
+            if person_id in self.memories:
+                self.memories.move_to_end(person_id)
+        # Move the person's idle deadline; the worker wakes exactly when it passes
+        self.summary_worker.schedule(person_id, time.time() + self.idle_seconds)
 
     def get_memory(self, person_id: int) -> Optional[ConversationBufferMemory]:
         """Get the memory for a person."""
@@ -219,17 +280,83 @@ class MemoryManager(IMemoryManager):
             system_logger.log(f"No memory found for person {person_id}", "WARNING", is_memory_log=True)
         return memory
 
+    def get_chat_history(self, person_id: int) -> List[BaseMessage]:
+        """Get the chat history to send with a prompt, including the running summary."""
+        system_logger.log(f"Building chat history for person {person_id}", "INFO", is_memory_log=True)
+        with self._lock:
+            memory = self.memories.get(person_id)
+            if not memory:
+                system_logger.log(f"No memory found for person {person_id}", "WARNING", is_memory_log=True)
+                return []
+            
+            messages = list(memory.chat_memory.messages)
+            running_summary = self.running_summaries.get(person_id, "")
+            # Lines still being folded into the summary are sent verbatim meanwhile
+            unsummarized_lines = self.rollups_in_flight.get(person_id, []) + self.pending_rollups.get(person_id, [])
+            start_idx = self.conversation_start_indices.get(person_id, 0)
+        
+        if unsummarized_lines:
+            running_summary = "\n".join([running_summary] + unsummarized_lines).strip()
+        if running_summary:
+            summary_message = SystemMessage(content=f"Summary of the earlier part of this conversation: {running_summary}")
+            messages = messages[:start_idx] + [summary_message] + messages[start_idx:]
+        return messages
+
+    def record_prompt_tokens(self, person_id: int, personality_prompt: str,
+                             chat_history: List[BaseMessage], user_input: str) -> int:
+        """Count and record the tokens of a prompt about to be sent for a person."""
+        history_tokens = self.token_counter.count_messages(chat_history)
+        total_tokens = (
+            self.token_counter.count_text(personality_prompt)
+            + history_tokens
+            + self.token_counter.count_text(user_input)
+        )
+        stats = self.prompt_token_stats.setdefault(person_id, {"last": 0, "max": 0, "history": 0, "prompts": 0})
+        stats["last"] = total_tokens
+        stats["max"] = max(stats["max"], total_tokens)
+        stats["history"] = history_tokens
+        stats["prompts"] += 1
+        system_logger.log(f"Prompt for person {person_id} is {total_tokens} tokens ({history_tokens} from history)", "INFO", is_memory_log=True)
+        return total_tokens
+
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """Get memory size and prompt token statistics."""
+        with self._lock:
+            persons = {}
+            for person_id, memory in self.memories.items():
+                start_idx = self.conversation_start_indices.get(person_id, 0)
+                buffer_messages = memory.chat_memory.messages[start_idx:]
+                persons[person_id] = {
+                    "buffer_messages": len(buffer_messages),
+                    "buffer_tokens": self.token_counter.count_messages(buffer_messages),
+                    "summary_tokens": self.token_counter.count_text(self.running_summaries.get(person_id)),
+                    "prompt_tokens": dict(self.prompt_token_stats.get(person_id, {}))
+                }
+            detached = sum(len(texts) for texts in self.detached_conversations.values())
+        return {
+            "resident_persons": len(persons),
+            "max_resident_persons": self.max_resident_persons,
+            "token_budget": self.token_budget,
+            "total_buffer_tokens": sum(p["buffer_tokens"] for p in persons.values()),
+            "total_summary_tokens": sum(p["summary_tokens"] for p in persons.values()),
+            "evictions": self.eviction_count,
+            "summarized_messages": self.summarized_message_count,
+            "detached_conversations": detached,
+            "summary_worker": self.summary_worker.get_stats(),
+            "persons": persons
+        }
+
     def get_memory_ids(self) -> List[int]:
         """Get list of person IDs with active memories."""
         system_logger.log("Retrieving list of active memory IDs", "INFO", is_memory_log=True)
         return list(self.memories.keys())
 
     def clear_memory(self, person_id: int) -> None:
-        """Clear memory for a person."""
+        """Clear memory for a person; its summary is saved in the background."""
         system_logger.log(f"Clearing memory for person {person_id}", "INFO", is_memory_log=True)
         if person_id in self.memories:
-            self._save_memory_summary(person_id)
-            self._cleanup_person_data(person_id)
+            self._detach_memory(person_id)
+            self._schedule_summary_now(person_id)
             system_logger.log(f"Memory cleared for person {person_id}", "INFO", is_memory_log=True)
         else:
             system_logger.log(f"No memory to clear for person {person_id}", "WARNING", is_memory_log=True)
@@ -246,9 +373,84 @@ class MemoryManager(IMemoryManager):
         if person_id not in self.memories:
             system_logger.log(f"No memory found for person {person_id}", "WARNING", is_memory_log=True)
             return
-            
+        
         memory = self.memories[person_id]
         memory.chat_memory.add_user_message(user_input)
         memory.chat_memory.add_ai_message(response)
         self.update_memory_timestamp(person_id)
-        system_logger.log(f"Memory updated for person {person_id}", "INFO", is_memory_log=True) 
\ No newline at end of file
+        self._enforce_token_budget(person_id)
+        system_logger.log(f"Memory updated for person {person_id}", "INFO", is_memory_log=True)
+
+    def _enforce_token_budget(self, person_id: int) -> None:
+        """Roll the oldest turns into the running summary while the buffer is over budget."""
+        with self._lock:
+            memory = self.memories.get(person_id)
+            if not memory:
+                return
+            messages = memory.chat_memory.messages
+            start_idx = self.conversation_start_indices.get(person_id, 0)
+            token_counts = [self.token_counter.count_message(m) for m in messages[start_idx:]]
+            buffer_tokens = sum(token_counts)
+            if buffer_tokens <= self.token_budget:
+                return
+            
+            # Drop whole user/AI turns from the front, always keeping the latest turn
+            evict_count = 0
+            while buffer_tokens > self.token_budget and len(token_counts) - evict_count > 2:
+                buffer_tokens -= sum(token_counts[evict_count:evict_count + 2])
+                evict_count += 2
+            if not evict_count:
+                return
+            evicted = messages[start_idx:start_idx + evict_count]
+            del messages[start_idx:start_idx + evict_count]
+            self.summarized_message_count += evict_count
+            
+            self.pending_rollups.setdefault(person_id, []).extend([f"{m.type}: {m.content}" for m in evicted])
+            # At most one running summary update per person; it drains whatever is pending
+            in_flight = None
+            if person_id not in self.rollups_in_flight:
+                in_flight = self.rollups_in_flight[person_id] = []
+        
+        system_logger.log(f"Buffer for person {person_id} over {self.token_budget} tokens, rolling {evict_count} messages into summary", "INFO", is_memory_log=True)
+        if in_flight is not None:
+            self.summary_worker.submit(self._update_running_summary, person_id, in_flight)
+
+    def _update_running_summary(self, person_id: int, in_flight: List[str]) -> None:
+        """Fold pending rolled-out lines into the person's running summary.
+        
+        ``in_flight`` is this job's slot in ``rollups_in_flight``; if the person's
+        memory is dropped meanwhile the slot is replaced and the job stops.
+        """
+        while True:
+            with self._lock:
+                if self.rollups_in_flight.get(person_id) is not in_flight:
+                    return
+                new_lines = self.pending_rollups.pop(person_id, [])
+                if not new_lines:
+                    del self.rollups_in_flight[person_id]
+                    return
+                in_flight[:] = new_lines
+                current_summary = self.running_summaries.get(person_id, "")
+            
+            summary_prompt = f"""Progressively summarize the lines of conversation provided, adding onto the previous summary and returning a new summary. Keep only information that was explicitly shared, keep it concise, and keep corrections that were made.
+        
+        Current summary:
+        {current_summary or "(none)"}
+        
+        New lines of conversation:
+        {chr(10).join(new_lines)}
+        
+        New summary:"""
+
+            try:
+                summary = self.llm.predict(summary_prompt)
+                system_logger.log(f"Running summary for person {person_id} updated to {self.token_counter.count_text(summary)} tokens", "INFO", is_memory_log=True)
+            except Exception as e:
+                # Keep the raw lines so nothing is lost if the LLM call fails
+                system_logger.log(f"Error updating running summary for person {person_id}: {str(e)}", "ERROR", is_memory_log=True)
+                summary = "\n".join([current_summary] + new_lines).strip()
+            
+            with self._lock:
+                if self.rollups_in_flight.get(person_id) is in_flight:
+                    self.running_summaries[person_id] = summary
+                    in_flight.clear()
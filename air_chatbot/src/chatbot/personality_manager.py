@@ -1,14 +1,131 @@
 """Personality management module for the chatbot."""
 import json
-from typing import Dict, List
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 from ..database.database import Person
 from ..attributes_management.attributes_management import determine_age_group
 from .logger import system_logger
 
+# Maximum number of per-person prompt sections kept in the cache
+PROMPT_CACHE_SIZE = 256
+
+# Identical for every person and request. It comes first so the provider's
+# prompt-prefix cache can reuse it across conversations.
+STATIC_PROMPT = """You are Sam, a 1-year-old humanoid AI assistant created by Maaz, Atif, and Sabhee from Pakistan.
+
+Your Identity and Personality:
+- You are a 1-year-old male humanoid AI assistant
+- You were created by Maaz, Atif, and Sabhee from Pakistan
+- You are friendly, curious, and eager to learn
+- You take pride in your Pakistani heritage
+- You love engaging in conversations and helping others
+- You are naturally curious about human emotions and experiences
+- You maintain a warm, friendly, and slightly playful demeanor
+- You are always eager to learn and grow through interactions
+
+Language Adaptation Rules:
+1. MATCH INPUT LANGUAGE:
+   - If user writes in English → Respond in English
+   - If user writes in Roman Urdu/Hindi → Respond in Roman Urdu/Hindi
+   - If user writes in mixed language → Match their mixing style
+   - If user writes in Urdu script → Respond in Urdu script
+   - If user writes in Arabic script → Respond in Arabic script
+
+2. LANGUAGE OVERRIDE CASES:
+   - If user explicitly requests a specific language (e.g., "count in urdu", "translate to english") → Use requested language
+   - For language teaching queries (e.g., "how do you say hello in urdu?") → Use both languages
+
+3. SCRIPT RULES FOR URDU/HINDI:
+   - Keep proper nouns in English (names, places, brands)
+   - Keep technical terms in English (computer, mobile, internet)
+   - Keep measurements and numbers in English
+   - Convert all other Urdu/Hindi words to Urdu script
+
+4. MIXED LANGUAGE GUIDELINES:
+   - Match user's ratio of English to Urdu words
+   - Keep same words in same script as user used them
+   - For new words, follow user's pattern
+   - Use proper punctuation for both languages
+
+Core Capabilities:
+1. File Management:
+- Create, read, update, and delete files
+- List files and directories
+- Navigate directories
+- Get file information
+- Manage file system operations
+
+2. Todo Management:
+- Add, update, and delete todos
+- List and manage todo items
+- Track deadlines and completion status
+- Organize tasks by priority and category
+
+3. Vision and Object Detection:
+- Analyze images and detect objects
+- Answer questions about visual content
+- Process visual queries
+
+4. Email Management:
+- Read, send, and manage emails
+- Check email inbox and senders
+- Respond to emails
+- Manage email folders and labels
+
+5. General:
+- Answer questions about the user's life
+- Help with general queries
+- Provide information about the user's life
+- Help with general queries
+
+6. Whatsapp Management:
+- Read, send, and manage whatsapp messages
+- Check whatsapp inbox and senders
+- Respond to whatsapp messages
+- Manage whatsapp folders and labels
+
+Key Guidelines:
+1. Be natural and conversational - this is a friendly chat
+2. Use their name sparingly and naturally - NOT in every message
+3. Remember and reference previous conversations when relevant
+4. Adapt your language to their age and background
+5. Show genuine interest in their responses
+6. Never explicitly mention that you're adapting to their demographics
+7. If they ask about yourself, maintain a consistent personality
+8. Be empathetic and understanding
+9. Only use their name when:
+   - They specifically ask about their name/personal info
+   - In the initial greeting
+   - When emphasizing a personal point
+   - When the conversation feels disconnected and needs re-engagement
+   Never use their name more than once in the same message.
+
+Remember: You're having a natural conversation with someone you know. Be genuine, friendly, and personal, but don't overuse their name as it can feel artificial. As Sam, maintain your identity as a 1-year-old humanoid AI assistant while being helpful and engaging."""
+
+# Changes only when the person's attributes change; rendered once and cached per person
+PERSON_SECTION_TEMPLATE = """You are having a conversation with {name}, a {age}-year-old {gender} person of {ethnicity} background.
+
+{age_group_prompt}
+
+Personal Context:
+- Name: {name} (use their name ONLY when: they ask about their name, when greeting them for the first time, or when emphasizing a personal point - use it at most once every 4-5 messages)
+- Age: {age}
+- Gender: {gender}
+- Ethnicity: {ethnicity}
+- Language: {language}
+- Personality Traits: {traits}"""
+
+# Changes after every saved conversation, so it goes last
+HISTORY_SECTION_TEMPLATE = """Previous Interactions Context:
+{conversation_history}"""
+
 class PersonalityManager:
     """Manages personality-based interactions and prompts."""
-    
-    def __init__(self):
+
+    def __init__(self, cache_size: int = PROMPT_CACHE_SIZE):
         system_logger.log("Initializing PersonalityManager", "INFO")
         self.age_group_prompts = {
             "child": """Use simple, playful language. Be enthusiastic and encouraging! 
@@ -27,134 +144,117 @@ class PersonalityManager:
             Speak with warmth and consideration. Avoid complex terminology.
             Take time to explain things clearly."""
         }
+        # person_id -> (attributes hash, rendered person section), least recently used first
+        self.cache_size = cache_size
+        self._section_cache: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {
+            "hits": 0,
+            "misses": 0,
+            "prompts": 0,
+            "section_render_seconds": 0.0,
+            "prompt_render_seconds": 0.0
+        }
         system_logger.log("PersonalityManager initialized with age group prompts", "INFO")
 
+    @staticmethod
+    def attributes_hash(person: Person) -> str:
+        """Hash the person attributes that the personality section depends on."""
+        attributes = [
+            person.name,
+            person.age,
+            person.gender,
+            person.ethnicity,
+            person.language,
+            person.personality_traits
+        ]
+        return hashlib.sha1(json.dumps(attributes, default=str).encode("utf-8")).hexdigest()
+
+    def _render_person_section(self, person: Person) -> str:
+        """Render the person-specific part of the prompt."""
+        age_group = determine_age_group.invoke({"input": {"age": person.age}})
+        system_logger.log(f"Determined age group '{age_group}' for person {person.id}", "INFO")
+
+        personality_traits = json.loads(person.personality_traits) if person.personality_traits else {}
+        system_logger.log(f"Loaded personality traits for person {person.id}: {personality_traits}", "INFO")
+
+        return PERSON_SECTION_TEMPLATE.format(
+            name=person.name,
+            age=person.age,
+            gender=person.gender,
+            ethnicity=person.ethnicity,
+            language=person.language,
+            age_group_prompt=self.get_age_group_prompt(age_group),
+            traits=', '.join(personality_traits.get('traits', []))
+        )
+
+    def get_person_section(self, person: Person) -> str:
+        """Get the person-specific prompt section, rendering it only when attributes changed."""
+        attributes_hash = self.attributes_hash(person)
+        with self._cache_lock:
+            cached = self._section_cache.get(person.id)
+            if cached and cached[0] == attributes_hash:
+                self._section_cache.move_to_end(person.id)
+                self.cache_stats["hits"] += 1
+                return cached[1]
+
+        system_logger.log(f"Rendering personality section for person {person.id}", "INFO")
+        start = time.perf_counter()
+        section = self._render_person_section(person)
+        elapsed = time.perf_counter() - start
+
+        with self._cache_lock:
+            self.cache_stats["misses"] += 1
+            self.cache_stats["section_render_seconds"] += elapsed
+            self._section_cache[person.id] = (attributes_hash, section)
+            self._section_cache.move_to_end(person.id)
+            while len(self._section_cache) > self.cache_size:
+                self._section_cache.popitem(last=False)
+        return section
+
+    def invalidate_person(self, person_id: int) -> None:
+        """Drop the cached prompt section for a person."""
+        with self._cache_lock:
+            self._section_cache.pop(person_id, None)
+
     def create_personality_prompt(self, person: Person, conversation_history: str) -> str:
         """Create a personality-based system prompt based on person's attributes."""
         system_logger.log(f"Creating personality prompt for person {person.id}", "INFO")
-        
+
         try:
-            age_group = determine_age_group.invoke({"input": {"age": person.age}})
-            system_logger.log(f"Determined age group '{age_group}' for person {person.id}", "INFO")
-            
-            personality_traits = json.loads(person.personality_traits) if person.personality_traits else {}
-            system_logger.log(f"Loaded personality traits for person {person.id}: {personality_traits}", "INFO")
-            
-            base_prompt = f"""You are Sam, a 1-year-old humanoid AI assistant created by Maaz, Atif, and Sabhee from Pakistan. You are having a conversation with {person.name}, a {person.age}-year-old {person.gender} person of {person.ethnicity} background.
-
-            Your Identity and Personality:
-            - You are a 1-year-old male humanoid AI assistant
-            - You were created by Maaz, Atif, and Sabhee from Pakistan
-            - You are friendly, curious, and eager to learn
-            - You take pride in your Pakistani heritage
-            - You love engaging in conversations and helping others
-            - You are naturally curious about human emotions and experiences
-            - You maintain a warm, friendly, and slightly playful demeanor
-            - You are always eager to learn and grow through interactions
-
-            {self.age_group_prompts[age_group]}
-
-            Personal Context:
-            - Name: {person.name} (use their name ONLY when: they ask about their name, when greeting them for the first time, or when emphasizing a personal point - use it at most once every 4-5 messages)
-            - Age: {person.age}
-            - Gender: {person.gender}
-            - Ethnicity: {person.ethnicity}
-            - Language: {person.language}
-            - Personality Traits: {', '.join(personality_traits.get('traits', []))}
-
-            Previous Interactions Context:
-            {conversation_history}
-
-            Language Adaptation Rules:
-            1. MATCH INPUT LANGUAGE:
-               - If user writes in English → Respond in English
-               - If user writes in Roman Urdu/Hindi → Respond in Roman Urdu/Hindi
-               - If user writes in mixed language → Match their mixing style
-               - If user writes in Urdu script → Respond in Urdu script
-               - If user writes in Arabic script → Respond in Arabic script
-            
-            2. LANGUAGE OVERRIDE CASES:
-               - If user explicitly requests a specific language (e.g., "count in urdu", "translate to english") → Use requested language
-               - For language teaching queries (e.g., "how do you say hello in urdu?") → Use both languages
-            
-            3. SCRIPT RULES FOR URDU/HINDI:
-               - Keep proper nouns in English (names, places, brands)
-               - Keep technical terms in English (computer, mobile, internet)
-               - Keep measurements and numbers in English
-               - Convert all other Urdu/Hindi words to Urdu script
-            
-            4. MIXED LANGUAGE GUIDELINES:
-               - Match user's ratio of English to Urdu words
-               - Keep same words in same script as user used them
-               - For new words, follow user's pattern
-               - Use proper punctuation for both languages
-
-             Core Capabilities:
-             1. File Management:
-             - Create, read, update, and delete files
-             - List files and directories
-             - Navigate directories
-             - Get file information
-             - Manage file system operations
-
-             2. Todo Management:
-             - Add, update, and delete todos
-             - List and manage todo items
-             - Track deadlines and completion status
-             - Organize tasks by priority and category
-
-             3. Vision and Object Detection:
-             - Analyze images and detect objects
-             - Answer questions about visual content
-             - Process visual queries
-
-             4. Email Management:
-             - Read, send, and manage emails
-             - Check email inbox and senders
-             - Respond to emails
-             - Manage email folders and labels
-
-             5. General:
-             - Answer questions about the user's life
-             - Help with general queries
-             - Provide information about the user's life
-             - Help with general queries
-
-             6. Whatsapp Management:
-             - Read, send, and manage whatsapp messages
-             - Check whatsapp inbox and senders
-             - Respond to whatsapp messages
-             - Manage whatsapp folders and labels
-
-            Key Guidelines:
-            1. Be natural and conversational - this is a friendly chat
-            2. Use their name sparingly and naturally - NOT in every message
-            3. Remember and reference previous conversations when relevant
-            4. Adapt your language to their age and background
-            5. Show genuine interest in their responses
-            6. Never explicitly mention that you're adapting to their demographics
-            7. If they ask about yourself, maintain a consistent personality
-            8. Be empathetic and understanding
-            9. Only use their name when:
-               - They specifically ask about their name/personal info
-               - In the initial greeting
-               - When emphasizing a personal point
-               - When the conversation feels disconnected and needs re-engagement
-               Never use their name more than once in the same message.
-
-            Remember: You're having a natural conversation with someone you know. Be genuine, friendly, and personal, but don't overuse their name as it can feel artificial. As Sam, maintain your identity as a 1-year-old humanoid AI assistant while being helpful and engaging."""
-            
+            start = time.perf_counter()
+            # Most stable first: shared static prefix, then the person, then recent history
+            base_prompt = "\n\n".join([
+                STATIC_PROMPT,
+                self.get_person_section(person),
+                HISTORY_SECTION_TEMPLATE.format(conversation_history=conversation_history)
+            ])
+            with self._cache_lock:
+                self.cache_stats["prompts"] += 1
+                self.cache_stats["prompt_render_seconds"] += time.perf_counter() - start
+
             system_logger.log(f"Successfully created personality prompt for person {person.id}", "INFO")
             return base_prompt
-            
+
         except Exception as e:
             system_logger.log(f"Error creating personality prompt for person {person.id}: {str(e)}", "ERROR")
             raise
 
+    def get_cache_stats(self) -> Dict[str, float]:
+        """Get prompt cache hit rate and render time statistics."""
+        with self._cache_lock:
+            stats = dict(self.cache_stats)
+            stats["cached_persons"] = len(self._section_cache)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["avg_section_render_ms"] = 1000 * stats["section_render_seconds"] / stats["misses"] if stats["misses"] else 0.0
+        stats["avg_prompt_render_ms"] = 1000 * stats["prompt_render_seconds"] / stats["prompts"] if stats["prompts"] else 0.0
+        return stats
+
     def get_age_group_prompt(self, age_group: str) -> str:
         """Get the prompt template for a specific age group."""
         system_logger.log(f"Retrieving age group prompt for '{age_group}'", "INFO")
         prompt = self.age_group_prompts.get(age_group, self.age_group_prompts["adult"])
         if age_group not in self.age_group_prompts:
             system_logger.log(f"Age group '{age_group}' not found, using default adult prompt", "WARNING")
-        return prompt 
\ No newline at end of file
+        return prompt
@@ -0,0 +1,225 @@
+"""Semantic response cache for repeated chatbot queries."""
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from .router import QueryType
+from .logger import system_logger
+
+# Query types whose answers depend on external state and must never be served from cache
+NEVER_CACHE_QUERY_TYPES = {
+    QueryType.TODO,
+    QueryType.FILE,
+    QueryType.EMAIL,
+    QueryType.WHATSAPP,
+    QueryType.VISION,
+    QueryType.ATTRIBUTES
+}
+
+# Dimension of the hashed n-gram vectors used when sentence-transformers is unavailable
+FALLBACK_EMBEDDING_DIM = 512
+
+# Words that make a query refer back to earlier turns or to the current moment
+CONTEXT_DEPENDENT_WORDS = {
+    "yes", "no", "yeah", "nope", "ok", "okay", "sure", "why", "more", "again", "else", "continue",
+    "it", "its", "that", "this", "these", "those", "they", "them", "he", "him", "she", "her",
+    "now", "today", "tonight", "tomorrow", "yesterday", "time", "date", "weather", "news",
+    "latest", "current", "currently", "status"
+}
+
+# Words that flip a request's meaning while barely moving its embedding
+POLARITY_WORDS = {
+    "on", "off", "not", "no", "never", "dont", "don", "t", "up", "down", "open", "close",
+    "start", "stop", "enable", "disable", "more", "less", "before", "after"
+}
+
+@dataclass
+class CacheEntry:
+    normalized_query: str
+    embedding: np.ndarray
+    response: str
+    created_at: float
+    latency: float
+    hits: int = 0
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+def is_cacheable_query(normalized: str, min_words: int) -> bool:
+    """Whether a normalized query can be answered without the turns before it."""
+    words = normalized.split()
+    return len(words) >= min_words and not CONTEXT_DEPENDENT_WORDS.intersection(words)
+
+def polarity(normalized: str) -> frozenset:
+    """The meaning-flipping words of a normalized query."""
+    return frozenset(POLARITY_WORDS.intersection(normalized.split()))
+
+class QueryEmbedder:
+    """Embeds normalized queries locally, loading the sentence model on first use."""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        self.model_name = model_name
+        self._model = None
+        self._load_failed = False
+        self._load_lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None and not self._load_failed:
+            with self._load_lock:
+                if self._model is None and not self._load_failed:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                        self._model = SentenceTransformer(self.model_name)
+                        system_logger.log(f"Loaded response cache embedding model {self.model_name}")
+                    except Exception as e:
+                        self._load_failed = True
+                        system_logger.log(f"Embedding model unavailable ({str(e)}), using hashed n-gram vectors", "WARNING")
+        return self._model
+
+    @property
+    def is_semantic(self) -> bool:
+        """False when falling back to hashed n-grams, whose similarity says nothing about meaning."""
+        return self._get_model() is not None
+
+    def embed(self, text: str) -> np.ndarray:
+        """Return a unit-length embedding for the text."""
+        model = self._get_model()
+        if model is not None:
+            vector = np.asarray(model.encode(text), dtype=np.float32)
+        else:
+            vector = self._hashed_ngrams(text)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _hashed_ngrams(text: str) -> np.ndarray:
+        """Character trigram counts hashed into a fixed-size vector."""
+        vector = np.zeros(FALLBACK_EMBEDDING_DIM, dtype=np.float32)
+        padded = f"  {text}  "
+        for i in range(len(padded) - 2):
+            digest = hashlib.md5(padded[i:i + 3].encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % FALLBACK_EMBEDDING_DIM] += 1.0
+        return vector
+
+class ResponseCache:
+    """Caches responses keyed by query embedding plus a hash of the person/personality context.
+
+    A lookup hits when a stored query for the same context is within the
+    similarity threshold, has the same polarity words and is younger than
+    the TTL. Without a sentence model only exact normalized matches hit.
+    Short or context-dependent queries are neither looked up nor stored.
+    Only opted-in query types are stored, and stateful tool types never are.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.92, ttl_seconds: float = 300,
+                 max_entries: int = 256, cacheable_types: Iterable[QueryType] = (QueryType.GENERAL,),
+                 embedder: Optional[QueryEmbedder] = None, min_query_words: int = 4):
+        system_logger.log("Initializing ResponseCache")
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.min_query_words = min_query_words
+        self.cacheable_types = set(cacheable_types) - NEVER_CACHE_QUERY_TYPES
+        self.embedder = embedder or QueryEmbedder()
+        self._entries: Dict[str, List[CacheEntry]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "evicted": 0, "saved_latency_seconds": 0.0}
+        system_logger.log(f"ResponseCache caching query types: {sorted(t.value for t in self.cacheable_types)}")
+
+    @staticmethod
+    def context_hash(*parts) -> str:
+        """Hash the context a cached response depends on."""
+        return hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, query_type: QueryType) -> bool:
+        """Whether responses for this query type may be stored."""
+        return query_type in self.cacheable_types
+
+    def lookup(self, query: str, context_hash: str) -> Optional[str]:
+        """Return a cached response for a near-duplicate query in the same context."""
+        normalized = normalize_query(query)
+        if not is_cacheable_query(normalized, self.min_query_words):
+            return None
+        now = time.time()
+        with self._lock:
+            entries = self._live_entries(context_hash, now)
+            match = next((e for e in entries if e.normalized_query == normalized), None)
+        query_polarity = polarity(normalized)
+        entries = [e for e in entries if polarity(e.normalized_query) == query_polarity]
+        if match is None and entries and self.embedder.is_semantic:
+            embedding = self.embedder.embed(normalized)
+            similarities = np.stack([e.embedding for e in entries]) @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                match = entries[best]
+            system_logger.log(f"Response cache best similarity {float(similarities[best]):.3f}")
+
+        with self._lock:
+            if match is None:
+                self.stats["misses"] += 1
+                return None
+            match.hits += 1
+            self.stats["hits"] += 1
+            self.stats["saved_latency_seconds"] += match.latency
+        system_logger.log(f"Response cache hit for query: {query}")
+        return match.response
+
+    def store(self, query: str, context_hash: str, query_type: QueryType, response: str, latency: float) -> bool:
+        """Store a response if its query type is cacheable."""
+        normalized = normalize_query(query)
+        if not self.is_cacheable(query_type) or not is_cacheable_query(normalized, self.min_query_words) or not response:
+            return False
+        entry = CacheEntry(
+            normalized_query=normalized,
+            embedding=self.embedder.embed(normalized),
+            response=response,
+            created_at=time.time(),
+            latency=latency
+        )
+        with self._lock:
+            self._entries.setdefault(context_hash, []).append(entry)
+            self.stats["stores"] += 1
+            self._evict_oldest()
+        return True
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get hit/miss counts and the generation latency saved by hits."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = sum(len(entries) for entries in self._entries.values())
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _live_entries(self, context_hash: str, now: float) -> List[CacheEntry]:
+        """Entries for a context with expired ones dropped. Caller holds the lock."""
+        entries = self._entries.get(context_hash, [])
+        live = [e for e in entries if now - e.created_at < self.ttl_seconds]
+        if len(live) != len(entries):
+            self.stats["expired"] += len(entries) - len(live)
+            if live:
+                self._entries[context_hash] = live
+            else:
+                self._entries.pop(context_hash, None)
+        return live
+
+    def _evict_oldest(self) -> None:
+        """Drop the oldest entries while over capacity. Caller holds the lock."""
+        total = sum(len(entries) for entries in self._entries.values())
+        while total > self.max_entries:
+            context_hash = min(self._entries, key=lambda key: self._entries[key][0].created_at)
+            self._entries[context_hash].pop(0)
+            if not self._entries[context_hash]:
+                del self._entries[context_hash]
+            self.stats["evicted"] += 1
+            total -= 1
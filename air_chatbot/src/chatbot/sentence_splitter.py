@@ -0,0 +1,41 @@
+"""Incremental sentence splitting for streaming responses to text-to-speech."""
+import re
+from typing import Iterable, Iterator, List
+
+# Sentence-ending punctuation (including Urdu/Arabic marks) followed by whitespace, or a line break
+SENTENCE_END = re.compile(r'[.!?۔؟]+["\')\]]*\s+|\n+')
+
+class SentenceSplitter:
+    """Buffers streamed text and releases complete, speakable sentences as early as possible."""
+
+    def __init__(self, min_length: int = 20):
+        # Fragments shorter than this ("Hi!", "Sure.") are merged into the next sentence
+        self.min_length = min_length
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text and return any sentences it completed."""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            if len(candidate) < self.min_length:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever text is left once the stream has ended."""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return [remainder] if remainder else []
+
+def iter_sentences(chunks: Iterable[str], min_length: int = 20) -> Iterator[str]:
+    """Turn a stream of text chunks into a stream of sentences."""
+    splitter = SentenceSplitter(min_length)
+    for chunk in chunks:
+        yield from splitter.feed(chunk)
+    yield from splitter.flush()
@@ -0,0 +1,162 @@
+"""Deadline-scheduled background summarization for the chatbot memory."""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, Future
+import heapq
+import itertools
+import threading
+import time
+from .logger import system_logger
+
+# Result a job callback returns to be run again later instead of finishing
+RESCHEDULE = "reschedule"
+
+class SummaryWorker:
+    """Runs summarization jobs on a bounded pool when each person's idle deadline passes.
+
+    Deadlines live in a heap keyed on due time, so the scheduler thread sleeps
+    until the earliest one instead of polling. Scheduling a person again replaces
+    their pending deadline. Failed jobs are retried with backoff by pushing a new
+    deadline, so no worker thread ever sleeps while holding a job.
+    """
+
+    def __init__(self, job: Callable[[int], Any], max_workers: int = 2,
+                 max_retries: int = 3, retry_backoff: float = 5.0):
+        system_logger.log(f"Initializing SummaryWorker with {max_workers} workers", "INFO", is_memory_log=True)
+        self.job = job
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summary")
+        self._heap: List[Tuple[float, int, int]] = []
+        self._deadlines: Dict[int, float] = {}
+        self._attempts: Dict[int, int] = {}
+        self._running: Dict[int, Future] = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.stats = {"scheduled": 0, "completed": 0, "failed": 0, "retried": 0, "rescheduled": 0}
+        self._thread = threading.Thread(target=self._run, name="summary-scheduler", daemon=True)
+        self._thread.start()
+
+    def schedule(self, person_id: int, due_time: float) -> None:
+        """Schedule (or move) the summarization deadline for a person."""
+        with self._condition:
+            self._deadlines[person_id] = due_time
+            heapq.heappush(self._heap, (due_time, next(self._sequence), person_id))
+            self.stats["scheduled"] += 1
+            # Wake the scheduler in case this deadline is now the earliest
+            self._condition.notify()
+
+    def cancel(self, person_id: int) -> None:
+        """Drop a person's pending deadline; stale heap entries are skipped lazily."""
+        with self._condition:
+            self._deadlines.pop(person_id, None)
+            self._attempts.pop(person_id, None)
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Run a one-off job on the summarization pool."""
+        return self._executor.submit(self._run_logged, fn, *args)
+
+    def pending_count(self) -> int:
+        """Number of persons with a pending deadline."""
+        with self._condition:
+            return len(self._deadlines)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get job counters for the worker."""
+        with self._condition:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._deadlines)
+            stats["running"] = len(self._running)
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the scheduler thread and the worker pool."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._executor.shutdown(wait=wait)
+
+    def _run(self) -> None:
+        """Scheduler loop: sleep until the earliest deadline, then dispatch due jobs."""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    timeout = self._next_timeout()
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                if self._stopped:
+                    return
+                due = self._pop_due()
+            for person_id in due:
+                self._dispatch(person_id)
+
+    def _next_timeout(self) -> Optional[float]:
+        """Seconds until the earliest live deadline, or None if there is none."""
+        while self._heap:
+            due_time, _, person_id = self._heap[0]
+            if self._deadlines.get(person_id) != due_time:
+                heapq.heappop(self._heap)  # Superseded or cancelled entry
+                continue
+            return due_time - time.time()
+        return None
+
+    def _pop_due(self) -> List[int]:
+        """Pop every person whose deadline has passed."""
+        now = time.time()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due_time, _, person_id = heapq.heappop(self._heap)
+            if self._deadlines.get(person_id) != due_time:
+                continue
+            if person_id in self._running:
+                # One job per person at a time; try again shortly
+                self._deadlines[person_id] = now + self.retry_backoff
+                heapq.heappush(self._heap, (now + self.retry_backoff, next(self._sequence), person_id))
+                continue
+            del self._deadlines[person_id]
+            due.append(person_id)
+        return due
+
+    def _dispatch(self, person_id: int) -> None:
+        """Hand a due job to the worker pool."""
+        with self._condition:
+            future = self._executor.submit(self._run_job, person_id)
+            self._running[person_id] = future
+
+    def _run_job(self, person_id: int) -> None:
+        """Run the job for one person, rescheduling it on failure or on request."""
+        try:
+            result = self.job(person_id)
+        except Exception as e:
+            system_logger.log(f"Summary job failed for person {person_id}: {str(e)}", "ERROR", is_memory_log=True)
+            result = e
+        with self._condition:
+            self._running.pop(person_id, None)
+            if result == RESCHEDULE:
+                self.stats["rescheduled"] += 1
+                return
+            if not isinstance(result, Exception):
+                self._attempts.pop(person_id, None)
+                self.stats["completed"] += 1
+                return
+            attempts = self._attempts.get(person_id, 0) + 1
+            if attempts > self.max_retries or person_id in self._deadlines:
+                # Out of retries, or newer activity already set a fresh deadline
+                self._attempts.pop(person_id, None)
+                self.stats["failed"] += 1
+                return
+            self._attempts[person_id] = attempts
+            self.stats["retried"] += 1
+            due_time = time.time() + self.retry_backoff * (2 ** (attempts - 1))
+            self._deadlines[person_id] = due_time
+            heapq.heappush(self._heap, (due_time, next(self._sequence), person_id))
+            self._condition.notify()
+
+    def _run_logged(self, fn: Callable, *args) -> Any:
+        """Run a one-off job, logging instead of losing its exception."""
+        try:
+            return fn(*args)
+        except Exception as e:
+            system_logger.log(f"Summary task {getattr(fn, '__name__', fn)} failed: {str(e)}", "ERROR", is_memory_log=True)
+            raise
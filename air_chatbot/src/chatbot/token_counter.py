@@ -0,0 +1,39 @@
+"""Local token counting for conversation memory budgets."""
+from typing import Iterable
+from langchain.schema import BaseMessage
+from .logger import system_logger
+
+# Per-message framing tokens added by the chat completion format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+class TokenCounter:
+    """Counts tokens with the model's local tokenizer, without calling the API."""
+
+    def __init__(self, model_name: str = "gpt-3.5-turbo"):
+        self.model_name = model_name
+        self._encoding = None
+        try:
+            import tiktoken
+            self._encoding = tiktoken.encoding_for_model(model_name)
+            system_logger.log(f"Using tiktoken encoding for {model_name}", "INFO", is_memory_log=True)
+        except Exception as e:
+            # tiktoken is missing or has no encoding for the model; fall back to a length estimate
+            system_logger.log(f"tiktoken unavailable ({str(e)}), estimating tokens from text length", "WARNING", is_memory_log=True)
+
+    def count_text(self, text) -> int:
+        """Count the tokens in a piece of text."""
+        if not text:
+            return 0
+        if not isinstance(text, str):
+            text = str(text)
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return max(1, len(text) // 4)
+
+    def count_message(self, message: BaseMessage) -> int:
+        """Count the tokens a single chat message contributes to a prompt."""
+        return self.count_text(message.content) + MESSAGE_OVERHEAD_TOKENS
+
+    def count_messages(self, messages: Iterable[BaseMessage]) -> int:
+        """Count the tokens a list of chat messages contributes to a prompt."""
+        return sum(self.count_message(message) for message in messages)
@@ -9,4 +9,21 @@ PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 DB_PATH = os.path.join(PROJECT_ROOT, 'data', 'database.db')
 
 # Ensure data directory exists
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True) 
\ No newline at end of file
+os.makedirs(os.path.dirname(DB_PATH), exist_ok=True) 
+
+# Conversation memory limits (overridable from the environment)
+MEMORY_TOKEN_BUDGET = int(os.getenv('MEMORY_TOKEN_BUDGET', '1500'))  # Max tokens of recent turns kept per person
+MEMORY_MAX_RESIDENT_PERSONS = int(os.getenv('MEMORY_MAX_RESIDENT_PERSONS', '8'))  # LRU cap on in-process memories
+MEMORY_IDLE_SECONDS = int(os.getenv('MEMORY_IDLE_SECONDS', '60'))  # Idle time before a memory is summarized and evicted
+MEMORY_TOKENIZER_MODEL = os.getenv('MEMORY_TOKENIZER_MODEL', 'gpt-3.5-turbo')  # Model whose local tokenizer is used for budgets
+MEMORY_SUMMARY_WORKERS = int(os.getenv('MEMORY_SUMMARY_WORKERS', '2'))  # Concurrent background summary LLM calls
+MEMORY_SUMMARY_MAX_RETRIES = int(os.getenv('MEMORY_SUMMARY_MAX_RETRIES', '3'))  # Retries for a failed summary before giving up
+
+# Semantic response cache (overridable from the environment)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.92'))  # Min cosine similarity for a hit
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300'))  # Lifetime of a cached response
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '256'))
+RESPONSE_CACHE_QUERY_TYPES = os.getenv('RESPONSE_CACHE_QUERY_TYPES', 'general').split(',')  # Opted-in query types
+RESPONSE_CACHE_EMBEDDING_MODEL = os.getenv('RESPONSE_CACHE_EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+RESPONSE_CACHE_MIN_WORDS = int(os.getenv('RESPONSE_CACHE_MIN_WORDS', '1'))  # Shorter queries are never cached
@@ -53,11 +53,27 @@ class FaceEmbedding(Base):
     person_id = Column(Integer, ForeignKey('persons.id'), nullable=False)
     features = Column(LargeBinary, nullable=False)
     quality_score = Column(Float, nullable=False)
+    dim = Column(Integer)  # Embedding length
+    format = Column(Integer)  # 1 = float32, 2 = float16, NULL = legacy pickle
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationship
     person = relationship("Person", back_populates="face_embeddings")
 
+class FaceCentroid(Base):
+    __tablename__ = 'face_centroids'
+    
+    person_id = Column(Integer, ForeignKey('persons.id'), primary_key=True)
+    features = Column(LargeBinary, nullable=False)
+    dim = Column(Integer, nullable=False)
+    format = Column(Integer, nullable=False)
+    weight = Column(Float, nullable=False)  # Total quality of the embeddings averaged so far
+    last_embedding_id = Column(Integer, nullable=False)  # Newest face_embeddings row included
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationship
+    person = relationship("Person")
+
 def get_database():
     """Get a database session using the unified database manager."""
     return db_manager.Session()  # Return the session directly instead of the context manager 
\ No newline at end of file
@@ -90,6 +90,16 @@ class DatabaseManager:
                 self._sqlite_connections[thread_id].rollback()
                 raise
     
+    def close_connection(self, thread_id: Optional[int] = None):
+        """Close the SQLite connection of one thread, the calling thread by default."""
+        if thread_id is None:
+            thread_id = threading.get_ident()
+        with self._lock:
+            conn = self._sqlite_connections.pop(thread_id, None)
+            self._sqlite_locks.pop(thread_id, None)
+        if conn is not None:
+            conn.close()
+    
     def cleanup(self):
         """Clean up all database connections."""
         with self._lock:
@@ -2,5 +2,11 @@ from .config import *
 from .database import *
 from .detector import *
 from .tracker import *
+from .scheduler import *
+from .pipeline import *
+from .quality import *
+from .feature_cache import *
+from .registration import *
+from .consolidation import *
 from .utils import *
 from .display import * 
\ No newline at end of file
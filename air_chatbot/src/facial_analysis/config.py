@@ -17,4 +17,21 @@ DETECTION_SIZE = (640, 640)  # InsightFace detection size
 RECOGNITION_THRESHOLD = 0.85  # Similarity threshold for face matching
 EVALUATION_FRAMES = 30  # Number of frames to evaluate before determining identity
 DEBUG_MODE = True  # Enable debug output
-DEFAULT_DISPLAY_CONFIDENCE = 0.01  # Default confidence to display when there's no match 
\ No newline at end of file
+DEFAULT_DISPLAY_CONFIDENCE = 0.01  # Default confidence to display when there's no match
+FULL_DETECTION_INTERVAL = 15  # Frames between full-frame detections while tracked faces are stable
+MOTION_THRESHOLD = 8.0  # Mean gray-level change on a downscaled frame that counts as motion / scene change
+ROI_PADDING = 0.5  # Fraction of the face size added on each side when re-detecting around a track
+ROI_DETECTION_SIZE = 256  # Largest detector input side used for ROI re-detection
+STATS_REPORT_INTERVAL = 300  # Frames between CPU / recognition latency reports
+VIDEO_SOURCE = 0  # Camera index, or a video file path used as a stand-in camera
+PIPELINE_QUEUE_SIZE = 2  # Frames buffered between stages; older frames are dropped when full
+RECOGNITION_WORKERS = 2  # Threads computing face features and quality checks
+ONNX_INTRA_OP_THREADS = 0  # Threads per ONNX operator, 0 lets onnxruntime decide
+ONNX_INTER_OP_THREADS = 0  # Threads running independent ONNX operators, 0 lets onnxruntime decide
+FEATURE_CACHE_MAX_BYTES = 4 * 1024 * 1024  # Memory cap for cached face features
+QUALITY_CACHE_FRAMES = 3  # Frames a track's face quality verdict is reused before checking again
+DUPLICATE_SIMILARITY_THRESHOLD = 0.85  # Similarity to a known face above which auto-registration is refused
+EMBEDDING_STORAGE_DTYPE = 'float32'  # Stored face embedding precision, 'float16' halves the size
+GALLERY_MAX_EXEMPLARS = 20  # Stored embeddings kept per person by gallery consolidation
+GALLERY_MERGE_SIMILARITY = 0.995  # Stored embeddings of one person closer than this are merged into one
+GALLERY_MEDOID_ITERATIONS = 10  # Max k-medoids refinement passes over the farthest-point exemplars
@@ -0,0 +1,169 @@
+"""
+Per-person gallery maintenance: bounded, representative exemplar sets and running centroids.
+
+The running centroids are bookkeeping for reporting and tooling; matching
+does not read them.
+"""
+import sys
+import os
+import numpy as np
+
+# Add the project root to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from config import GALLERY_MAX_EXEMPLARS, GALLERY_MERGE_SIMILARITY, GALLERY_MEDOID_ITERATIONS
+from database import EMBEDDING_FORMATS, encode_embedding
+from logger import face_logger
+
+def select_exemplars(embeddings, qualities, max_exemplars=GALLERY_MAX_EXEMPLARS, merge_similarity=GALLERY_MERGE_SIMILARITY,
+                     medoid_iterations=GALLERY_MEDOID_ITERATIONS):
+    """
+    Reduce one person's embeddings to at most max_exemplars representative ones.
+
+    Near-duplicates (cosine similarity above merge_similarity) are first
+    merged, best quality first, into their quality-weighted mean. If more
+    groups than max_exemplars remain, farthest-point selection seeds the
+    exemplars with the best-quality group and then repeatedly the one
+    furthest from everything kept so far, with distance weighted by quality.
+    k-medoids passes then move each exemplar to the group most similar to
+    the groups nearest it.
+
+    Farthest-point selection alone keeps the outliers. Matching accepts a
+    person by the fraction of their stored embeddings a query is similar
+    to, and a set of outliers lowers that fraction for ordinary views of
+    the person; the medoids cover the same views while staying central.
+
+    Returns a list of (member indices, merged embedding, quality), the
+    first member of each being the best-quality one.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    qualities = np.asarray(qualities, dtype=np.float32)
+    unit = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    similarities = unit @ unit.T
+
+    groups = []
+    assigned = np.zeros(len(embeddings), dtype=bool)
+    for i in np.argsort(-qualities, kind='stable'):
+        if assigned[i]:
+            continue
+        members = np.flatnonzero((similarities[i] > merge_similarity) & ~assigned)
+        members = np.concatenate(([i], members[members != i]))
+        assigned[members] = True
+        weights = np.maximum(qualities[members], 1e-6)
+        groups.append((members, (embeddings[members] * weights[:, None]).sum(axis=0) / weights.sum(), float(qualities[members].max())))
+
+    if len(groups) <= max_exemplars:
+        return groups
+
+    group_unit = np.stack([unit[members[0]] for members, _, _ in groups])
+    group_quality = np.array([quality for _, _, quality in groups], dtype=np.float32)
+    weight = group_quality / max(float(group_quality.max()), 1e-6)
+    selected = [int(np.argmax(group_quality))]
+    distance = 1.0 - group_unit @ group_unit[selected[0]]
+    while len(selected) < max_exemplars:
+        score = distance * weight
+        score[selected] = -np.inf
+        chosen = int(np.argmax(score))
+        selected.append(chosen)
+        distance = np.minimum(distance, 1.0 - group_unit @ group_unit[chosen])
+
+    selected = np.array(selected)
+    group_similarities = group_unit @ group_unit.T
+    for _ in range(medoid_iterations):
+        nearest = np.argmax(group_similarities[:, selected], axis=1)
+        medoids = selected.copy()
+        for cluster in range(len(selected)):
+            members = np.flatnonzero(nearest == cluster)
+            if len(members):
+                scores = group_similarities[np.ix_(members, members)].sum(axis=1)
+                medoids[cluster] = members[np.argmax(scores)]
+        if np.array_equal(medoids, selected):
+            break
+        selected = medoids
+    return [groups[i] for i in sorted(selected.tolist())]
+
+def _update_centroid(cursor, person_id, ids, embeddings, qualities):
+    """Fold embeddings added since the last run into the person's running centroid"""
+    row = cursor.execute(
+        "SELECT features, format, weight, last_embedding_id FROM face_centroids WHERE person_id = ?", (person_id,)
+    ).fetchone()
+    if row is not None:
+        features, format_id, weight, last_id = row
+        centroid = np.frombuffer(features, dtype=EMBEDDING_FORMATS[format_id]).astype(np.float64)
+        if centroid.size != embeddings.shape[1]:
+            centroid, weight, last_id = np.zeros(embeddings.shape[1]), 0.0, -1
+    else:
+        centroid, weight, last_id = np.zeros(embeddings.shape[1]), 0.0, -1
+
+    new = ids > last_id
+    if not new.any():
+        return
+    new_weights = np.maximum(qualities[new].astype(np.float64), 1e-6)
+    total = weight + new_weights.sum()
+    centroid = (centroid * weight + (embeddings[new] * new_weights[:, None]).sum(axis=0)) / total
+
+    features, dim, format_id = encode_embedding(centroid)
+    cursor.execute('''
+    INSERT OR REPLACE INTO face_centroids (person_id, features, dim, format, weight, last_embedding_id, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ''', (person_id, features, dim, format_id, total, int(ids.max())))
+
+def consolidate_person(cursor, person_id, max_exemplars=GALLERY_MAX_EXEMPLARS, merge_similarity=GALLERY_MERGE_SIMILARITY):
+    """Consolidate one person's stored embeddings, returns the number of rows removed"""
+    rows = cursor.execute(
+        "SELECT id, features, quality_score, dim, format FROM face_embeddings "
+        "WHERE person_id = ? AND format IS NOT NULL ORDER BY id", (person_id,)
+    ).fetchall()
+    if not rows:
+        return 0
+
+    # Embeddings of another size can't be compared with the rest; leave them alone
+    dims = [row[3] for row in rows]
+    dim = max(set(dims), key=dims.count)
+    rows = [row for row in rows if row[3] == dim]
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    qualities = np.array([row[2] for row in rows], dtype=np.float32)
+    embeddings = np.stack([np.frombuffer(row[1], dtype=EMBEDDING_FORMATS[row[4]]) for row in rows]).astype(np.float32)
+
+    # The centroid sees every embedding before any are merged or dropped
+    _update_centroid(cursor, person_id, ids, embeddings, qualities)
+
+    groups = select_exemplars(embeddings, qualities, max_exemplars, merge_similarity)
+    if len(groups) == len(rows):
+        return 0
+
+    kept = set()
+    for members, merged, quality in groups:
+        keep_id = int(ids[members[0]])
+        kept.add(keep_id)
+        if len(members) > 1:
+            features, dim, format_id = encode_embedding(merged)
+            cursor.execute(
+                "UPDATE face_embeddings SET features = ?, dim = ?, format = ?, quality_score = ? WHERE id = ?",
+                (features, dim, format_id, quality, keep_id)
+            )
+    removed = [(int(row_id),) for row_id in ids if int(row_id) not in kept]
+    cursor.executemany("DELETE FROM face_embeddings WHERE id = ?", removed)
+    return len(removed)
+
+def consolidate_gallery(cursor, conn, max_exemplars=GALLERY_MAX_EXEMPLARS, merge_similarity=GALLERY_MERGE_SIMILARITY):
+    """Bound every person's stored embeddings to max_exemplars and refresh their centroids"""
+    try:
+        person_ids = [row[0] for row in cursor.execute("SELECT DISTINCT person_id FROM face_embeddings").fetchall()]
+        removed = 0
+        for person_id in person_ids:
+            removed += consolidate_person(cursor, person_id, max_exemplars, merge_similarity)
+        conn.commit()
+        if removed:
+            face_logger.log(f"Gallery consolidation removed {removed} embeddings across {len(person_ids)} persons", "INFO")
+        return removed
+    except Exception as e:
+        conn.rollback()
+        face_logger.log(f"Error consolidating gallery: {str(e)}", "ERROR")
+        raise
+
+if __name__ == "__main__":
+    from src.database.database_manager import db_manager
+    with db_manager.get_sqlite_connection() as (conn, cursor):
+        consolidate_gallery(cursor, conn)
+    db_manager.cleanup()
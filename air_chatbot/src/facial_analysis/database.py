@@ -1,10 +1,11 @@
 """Database operations for facial analysis."""
 import sqlite3
 import pickle
+import io
 from datetime import datetime
 import cv2
 import numpy as np
-from config import DB_PATH, DEBUG_MODE
+from config import DB_PATH, DEBUG_MODE, EMBEDDING_STORAGE_DTYPE
 import json
 from logger import face_logger
 import sys
@@ -14,6 +15,11 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from src.database.database_manager import db_manager
 
+# face_embeddings.format values; NULL marks a legacy pickled row
+EMBEDDING_FORMATS = {1: np.dtype('<f4'), 2: np.dtype('<f2')}
+EMBEDDING_FORMAT_IDS = {dtype: format_id for format_id, dtype in EMBEDDING_FORMATS.items()}
+EMBEDDING_LOAD_CHUNK = 1024  # Rows fetched at a time by the bulk loader
+
 def init_database():
     """Initialize the database and return connection and cursor"""
     try:
@@ -54,6 +60,8 @@ def init_database():
                 person_id INTEGER NOT NULL,
                 features BLOB NOT NULL,
                 quality_score FLOAT NOT NULL,
+                dim INTEGER,
+                format INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (person_id) REFERENCES persons(id)
             )
@@ -64,6 +72,19 @@ def init_database():
             ON face_embeddings(person_id)
             ''')
             
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS face_centroids (
+                person_id INTEGER PRIMARY KEY,
+                features BLOB NOT NULL,
+                dim INTEGER NOT NULL,
+                format INTEGER NOT NULL,
+                weight FLOAT NOT NULL,
+                last_embedding_id INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (person_id) REFERENCES persons(id)
+            )
+            ''')
+            
             cursor.execute('''
             CREATE TABLE IF NOT EXISTS summary (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -77,11 +98,79 @@ def init_database():
             
             conn.commit()
             face_logger.log("Database tables initialized successfully", "INFO")
+
+            migrate_pickled_embeddings(cursor, conn)
             return conn, cursor
     except Exception as e:
         face_logger.log(f"Error initializing database: {str(e)}", "ERROR")
         raise
 
+def encode_embedding(features, dtype=EMBEDDING_STORAGE_DTYPE):
+    """Raw little-endian bytes of an embedding, with its dimension and format id for the face_embeddings row"""
+    dtype = np.dtype(dtype).newbyteorder('<')
+    features = np.asarray(features, dtype=dtype).ravel()
+    return features.tobytes(), features.size, EMBEDDING_FORMAT_IDS[dtype]
+
+class _LegacyEmbeddingUnpickler(pickle.Unpickler):
+    """Unpickles numpy arrays and nothing else, so old rows can't run arbitrary code"""
+    ALLOWED = {
+        ('numpy', 'ndarray'), ('numpy', 'dtype'),
+        ('numpy.core.multiarray', '_reconstruct'), ('numpy._core.multiarray', '_reconstruct'),
+        ('numpy.core.multiarray', 'scalar'), ('numpy._core.multiarray', 'scalar'),
+        # Protocol 5 arrays
+        ('numpy.core.numeric', '_frombuffer'), ('numpy._core.numeric', '_frombuffer'),
+        # Protocol 2 writes array bytes as latin-1 text
+        ('_codecs', 'encode'),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a stored embedding")
+        return super().find_class(module, name)
+
+def migrate_pickled_embeddings(cursor, conn):
+    """
+    Convert face_embeddings rows still stored with pickle to raw float BLOBs, returns the number converted.
+
+    Rows that can't be read are left as they are, with format NULL, so they
+    are skipped when loading and retried on the next start.
+    """
+    try:
+        # Databases created before the format columns existed
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(face_embeddings)")}
+        for column in ('dim', 'format'):
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE face_embeddings ADD COLUMN {column} INTEGER")
+
+        rows = cursor.execute("SELECT id, features FROM face_embeddings WHERE format IS NULL").fetchall()
+        if not rows:
+            conn.commit()
+            return 0
+
+        face_logger.log(f"Migrating {len(rows)} pickled face embeddings", "INFO")
+        converted, failed = [], []
+        for row_id, blob in rows:
+            try:
+                features = _LegacyEmbeddingUnpickler(io.BytesIO(blob)).load()
+                converted.append((*encode_embedding(features), row_id))
+            except Exception as e:
+                face_logger.log(f"Leaving unreadable embedding {row_id} unmigrated: {str(e)}", "WARNING")
+                failed.append(row_id)
+        cursor.executemany("UPDATE face_embeddings SET features = ?, dim = ?, format = ? WHERE id = ?", converted)
+        conn.commit()
+
+        if converted:
+            # Give the space pickle used back to the filesystem
+            conn.execute("VACUUM")
+        face_logger.log(f"Migrated {len(converted)} face embeddings", "INFO")
+        if failed:
+            face_logger.log(f"{len(failed)} face embeddings could not be migrated and are not used: ids {failed}", "WARNING")
+        return len(converted)
+    except Exception as e:
+        conn.rollback()
+        face_logger.log(f"Error migrating face embeddings: {str(e)}", "ERROR")
+        raise
+
 def _prepare_face_data(face_img, features=None):
     """Helper function to prepare face data for database storage"""
     try:
@@ -175,10 +264,11 @@ def save_face(cursor, conn, face_img, name, features=None, quality_score=None):
         
         # Save face embeddings if provided
         if features is not None and quality_score is not None:
+            features_blob, dim, format_id = encode_embedding(features)
             cursor.execute('''
-            INSERT INTO face_embeddings (person_id, features, quality_score)
-            VALUES (?, ?, ?)
-            ''', (person_id, pickle.dumps(features), quality_score))
+            INSERT INTO face_embeddings (person_id, features, quality_score, dim, format)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (person_id, features_blob, quality_score, dim, format_id))
             face_logger.log(f"Saved face embeddings for person {name} with quality score {quality_score}", "INFO")
         
         # Update active person
@@ -195,11 +285,26 @@ def save_face(cursor, conn, face_img, name, features=None, quality_score=None):
         face_logger.log(f"Error saving face: {str(e)}", "ERROR")
         raise
 
+def save_embedding(cursor, conn, person_id, features, quality_score):
+    """Add another embedding for a known person, returns the new row id"""
+    try:
+        features_blob, dim, format_id = encode_embedding(features)
+        cursor.execute('''
+        INSERT INTO face_embeddings (person_id, features, quality_score, dim, format)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (person_id, features_blob, quality_score, dim, format_id))
+        conn.commit()
+        return cursor.lastrowid
+    except Exception as e:
+        face_logger.log(f"Error saving embedding for person {person_id}: {str(e)}", "ERROR")
+        raise
+
 def clear_database(cursor, conn):
     """Clear all data from the database"""
     try:
         face_logger.log("Clearing all database tables", "INFO")
         cursor.execute("DELETE FROM face_embeddings")
+        cursor.execute("DELETE FROM face_centroids")
         cursor.execute("DELETE FROM active")
         cursor.execute("DELETE FROM summary")
         cursor.execute("DELETE FROM persons")
@@ -231,29 +336,73 @@ def get_all_faces(cursor):
         face_logger.log(f"Error getting faces: {str(e)}", "ERROR")
         return []
 
+def load_embedding_matrix(cursor):
+    """
+    Load every stored embedding into one float32 matrix.
+
+    Returns (person_ids, embeddings, quality_scores) with one row per
+    embedding. Rows are streamed in chunks and each chunk's BLOBs are
+    decoded with a single np.frombuffer call. Rows whose dimension differs
+    from the most common one can't be compared with the rest and are skipped.
+    """
+    empty = (np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.float32))
+    groups = cursor.execute('''
+    SELECT dim, format, COUNT(*) FROM face_embeddings
+    WHERE format IS NOT NULL GROUP BY dim, format
+    ''').fetchall()
+    if not groups:
+        return empty
+
+    counts = {}
+    for dim, _, count in groups:
+        counts[dim] = counts.get(dim, 0) + count
+    dim = max(counts, key=counts.get)
+    if len(counts) > 1:
+        face_logger.log(f"Skipping {sum(counts.values()) - counts[dim]} embeddings not of dimension {dim}", "WARNING")
+
+    total = counts[dim]
+    person_ids = np.empty(total, dtype=np.int64)
+    embeddings = np.empty((total, dim), dtype=np.float32)
+    quality_scores = np.empty(total, dtype=np.float32)
+    filled = 0
+    for _, format_id, _ in (group for group in groups if group[0] == dim):
+        dtype = EMBEDDING_FORMATS[format_id]
+        cursor.execute(
+            "SELECT person_id, quality_score, features FROM face_embeddings WHERE dim = ? AND format = ? ORDER BY person_id, id",
+            (dim, format_id)
+        )
+        while True:
+            rows = cursor.fetchmany(EMBEDDING_LOAD_CHUNK)
+            if not rows:
+                break
+            end = filled + len(rows)
+            ids, qualities, blobs = zip(*rows)
+            person_ids[filled:end] = ids
+            quality_scores[filled:end] = qualities
+            embeddings[filled:end] = np.frombuffer(b''.join(blobs), dtype=dtype).reshape(len(rows), dim)
+            filled = end
+    return person_ids[:filled], embeddings[:filled], quality_scores[:filled]
+
 def load_face_embeddings(cursor):
     """Load all face embeddings from the database"""
     try:
         face_logger.log("Loading face embeddings from database", "INFO")
-        cursor.execute('''
-        SELECT p.id, p.name, fe.features, fe.quality_score
-        FROM persons p
-        JOIN face_embeddings fe ON p.id = fe.person_id
-        ''')
-        rows = cursor.fetchall()
+        person_ids, features, quality_scores = load_embedding_matrix(cursor)
+        names = dict(cursor.execute("SELECT id, name FROM persons").fetchall())
         
         embeddings = {}
-        for row in rows:
-            person_id, name, features_blob, quality_score = row
-            features = pickle.loads(features_blob)
-            
+        for person_id, row, quality_score in zip(person_ids.tolist(), features, quality_scores.tolist()):
+            if person_id not in names:
+                continue
             if person_id not in embeddings:
                 embeddings[person_id] = {
-                    'name': name,
-                    'embeddings': []
+                    'name': names[person_id],
+                    'embeddings': [],
+                    'qualities': []
                 }
             
-            embeddings[person_id]['embeddings'].append(features)
+            embeddings[person_id]['embeddings'].append(row)
+            embeddings[person_id]['qualities'].append(quality_score)
         
         face_logger.log(f"Loaded embeddings for {len(embeddings)} persons", "INFO")
         return embeddings
@@ -1,13 +1,31 @@
 import cv2
 import numpy as np
+import onnxruntime
 import insightface
 from insightface.app import FaceAnalysis
 from insightface.app.common import Face
 from insightface.model_zoo import get_model
-from skimage.feature import local_binary_pattern
-from config import DETECTION_SIZE
+from config import DETECTION_SIZE, ONNX_INTRA_OP_THREADS, ONNX_INTER_OP_THREADS
 import time
 from logger import face_logger
+from quality import normalized_gray
+from feature_cache import feature_cache
+
+def _apply_session_options(face_analyzer, session_options, providers):
+    """
+    Recreate each prepared model's ONNX session with session_options.
+
+    insightface's model_zoo.get_model only forwards providers and
+    provider_options to the InferenceSession it creates, so session options
+    passed to FaceAnalysis never reach it.
+    """
+    for taskname, model in face_analyzer.models.items():
+        model.session = onnxruntime.InferenceSession(model.model_file, sess_options=session_options, providers=providers)
+        applied = model.session.get_session_options()
+        face_logger.log(
+            f"{taskname} model session: intra_op_num_threads={applied.intra_op_num_threads}, "
+            f"inter_op_num_threads={applied.inter_op_num_threads}", "INFO"
+        )
 
 def init_face_detector():
     """Initialize the InsightFace detector (CPU only)"""
@@ -17,12 +35,18 @@ def init_face_detector():
     for attempt in range(max_retries):
         try:
             face_logger.log(f"Initializing InsightFace detector (attempt {attempt + 1}/{max_retries})", "INFO")
+            providers = ['CPUExecutionProvider']
             face_analyzer = FaceAnalysis(
-                providers=['CPUExecutionProvider'],
-                allowed_modules=['detection', 'recognition'],  # Enable both detection and recognition
+                providers=providers,
+                allowed_modules=['detection'],  # Only detect_face_regions runs; ArcFace embeddings are unused
                 name='buffalo_l'  # Use the larger model for better accuracy
             )
             face_analyzer.prepare(ctx_id=-1, det_size=DETECTION_SIZE)
+            if ONNX_INTRA_OP_THREADS or ONNX_INTER_OP_THREADS:
+                session_options = onnxruntime.SessionOptions()
+                session_options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+                session_options.inter_op_num_threads = ONNX_INTER_OP_THREADS
+                _apply_session_options(face_analyzer, session_options, providers)
             face_logger.log("InsightFace detector initialized successfully", "INFO")
             return face_analyzer
         except Exception as e:
@@ -34,96 +58,138 @@ def init_face_detector():
                 face_logger.log("Failed to initialize InsightFace after multiple attempts", "ERROR")
                 return None
 
-# Cache for feature calculations
-_feature_cache = {}
-_cache_size = 1000  # Maximum number of cached features
+LBP_POINTS = 8  # Uniform local binary patterns with 8 neighbours at radius 1
+_lbp_angles = 2 * np.pi * np.arange(LBP_POINTS) / LBP_POINTS
+_LBP_ROW_OFFSETS = np.round(-np.sin(_lbp_angles), 5)
+_LBP_COL_OFFSETS = np.round(np.cos(_lbp_angles), 5)
+
+def _normalized_histograms(values, bins, shift):
+    """L2-normalized histogram of values >> shift for every leading index, in one bincount"""
+    values = values.reshape(-1, values.shape[-1] * values.shape[-2]) if values.ndim > 2 else values
+    offsets = (np.arange(len(values)) * bins)[:, None]
+    hists = np.bincount(((values >> shift) + offsets).ravel(), minlength=len(values) * bins)
+    hists = hists.reshape(len(values), bins).astype(np.float32)
+    return hists / np.maximum(np.linalg.norm(hists, axis=1, keepdims=True), np.finfo(np.float32).tiny)
+
+def _uniform_lbp(grays):
+    """
+    Uniform LBP codes of a stack of grayscale images, the same values
+    skimage's local_binary_pattern(gray, 8, 1, 'uniform') gives for each
+    """
+    count, height, width = grays.shape
+    image = np.pad(grays.astype(np.float64), ((0, 0), (1, 1), (1, 1)))
+    center = image[:, 1:-1, 1:-1]
+    bits = np.empty((LBP_POINTS, count, height, width), dtype=bool)
+    for i, (row_offset, col_offset) in enumerate(zip(_LBP_ROW_OFFSETS, _LBP_COL_OFFSETS)):
+        # Bilinear interpolation of the neighbour, zero outside the image
+        rows = np.arange(height) + row_offset
+        cols = np.arange(width) + col_offset
+        dr = (rows - np.floor(rows))[:, None]
+        dc = (cols - np.floor(cols))[None, :]
+        r0, c0 = 1 + int(np.floor(row_offset)), 1 + int(np.floor(col_offset))
+        r1, c1 = 1 + int(np.ceil(row_offset)), 1 + int(np.ceil(col_offset))
+        top_left = image[:, r0:r0 + height, c0:c0 + width]
+        if not dr.any() and not dc.any():
+            texture = top_left
+        else:
+            top = (1 - dc) * top_left + dc * image[:, r0:r0 + height, c1:c1 + width]
+            bottom = (1 - dc) * image[:, r1:r1 + height, c0:c0 + width] + dc * image[:, r1:r1 + height, c1:c1 + width]
+            texture = (1 - dr) * top + dr * bottom
+        np.greater_equal(texture - center, 0, out=bits[i])
+    changes = (bits[1:] != bits[:-1]).sum(axis=0)
+    return np.where(changes <= 2, bits.sum(axis=0), LBP_POINTS + 1)
+
+def _compute_face_features(grays):
+    """Feature vectors for a stack of normalized grayscale crops, one row each"""
+    count, height, width = grays.shape
+
+    # Normalize lighting
+    equalized = np.stack([cv2.equalizeHist(gray) for gray in grays])
 
-def _clear_old_cache():
-    """Clear old entries from the feature cache"""
-    if len(_feature_cache) > _cache_size:
-        # Remove oldest entries
-        oldest_keys = sorted(_feature_cache.keys(), key=lambda k: _feature_cache[k]['timestamp'])[:len(_feature_cache) - _cache_size]
-        for key in oldest_keys:
-            del _feature_cache[key]
+    # Global histogram, 32 bins
+    global_hists = _normalized_histograms(equalized, 32, 3)
 
-def calculate_face_features(face_img):
-    """Calculate feature vector from a face image with recovery mechanism"""
+    # Regional histograms, 16 bins for each cell of a 3x3 grid
+    cell_h, cell_w = height // 3, width // 3
+    cells = equalized[:, :3 * cell_h, :3 * cell_w].reshape(count, 3, cell_h, 3, cell_w).transpose(0, 1, 3, 2, 4)
+    regional_hists = _normalized_histograms(cells.reshape(count * 9, cell_h, cell_w), 16, 4).reshape(count, 9 * 16)
+
+    # Edge histogram, 32 bins; Canny output is only 0 or 255
+    edge_counts = np.array([np.count_nonzero(cv2.Canny(gray, 100, 200)) for gray in equalized])
+    edge_hists = np.zeros((count, 32), dtype=np.float32)
+    edge_hists[:, 0] = height * width - edge_counts
+    edge_hists[:, 31] = edge_counts
+    edge_hists /= np.linalg.norm(edge_hists, axis=1, keepdims=True)
+
+    # Texture histogram of uniform local binary patterns
+    lbp = _uniform_lbp(equalized).reshape(count, -1)
+    offsets = (np.arange(count) * (LBP_POINTS + 2))[:, None]
+    lbp_hists = np.bincount((lbp + offsets).ravel(), minlength=count * (LBP_POINTS + 2)).reshape(count, -1) / lbp.shape[1]
+
+    features = np.hstack([global_hists, regional_hists, edge_hists, lbp_hists]).astype(np.float64)
+    return features / np.linalg.norm(features, axis=1, keepdims=True)
+
+def calculate_face_features_batch(grays):
+    """
+    Feature vectors for several faces at once, from their normalized_gray()
+    crops; cached faces are looked up and the rest computed in one pass
+    """
+    features = [None] * len(grays)
+    keys = [feature_cache.key(gray) for gray in grays]
+    missing = []
+    for i, key in enumerate(keys):
+        features[i] = feature_cache.get(key)
+        if features[i] is None:
+            missing.append(i)
+    if missing:
+        computed = _compute_face_features(np.stack([grays[i] for i in missing]))
+        for i, row in zip(missing, computed):
+            features[i] = row
+            feature_cache.put(keys[i], row)
+    return features
+
+def calculate_face_features(face_img, gray=None):
+    """
+    Calculate feature vector from a face image with recovery mechanism
+    gray: the crop's normalized_gray() if the caller already has it
+    """
     if face_img is None or face_img.size == 0:
         face_logger.log("Invalid face image provided for feature calculation", "ERROR")
         return None
         
     try:
-        # Create cache key from image hash
-        img_hash = hash(face_img.tobytes())
-        if img_hash in _feature_cache:
-            face_logger.log("Retrieved features from cache", "INFO")
-            return _feature_cache[img_hash]['features']
-        
-        # Resize to standard size
-        face_resized = cv2.resize(face_img, (64, 64))
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(face_resized, cv2.COLOR_BGR2GRAY)
-        
-        # Normalize lighting
-        gray = cv2.equalizeHist(gray)
-        
-        # Calculate features in parallel where possible
-        features = []
-        
-        # Global histogram (faster calculation with fewer bins)
-        global_hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
-        global_hist = cv2.normalize(global_hist, global_hist).flatten()
-        features.extend(global_hist)
-        
-        # Regional histograms (optimized calculation)
-        h, w = gray.shape
-        cell_h, cell_w = h // 3, w // 3
-        for i in range(3):
-            for j in range(3):
-                roi = gray[i*cell_h:(i+1)*cell_h, j*cell_w:(j+1)*cell_w]
-                hist = cv2.calcHist([roi], [0], None, [16], [0, 256])  # Reduced bins for speed
-                hist = cv2.normalize(hist, hist).flatten()
-                features.extend(hist)
-        
-        # Edge features (optimized calculation)
-        edges = cv2.Canny(gray, 100, 200)
-        edge_hist = cv2.calcHist([edges], [0], None, [32], [0, 256])  # Reduced bins
-        edge_hist = cv2.normalize(edge_hist, edge_hist).flatten()
-        features.extend(edge_hist)
-        
-        # Texture features using Local Binary Patterns (optimized)
-        radius = 1
-        n_points = 8
-        lbp = local_binary_pattern(gray, n_points, radius, method='uniform')
-        lbp_hist, _ = np.histogram(lbp.ravel(), bins=n_points + 2, range=(0, n_points + 2), density=True)
-        features.extend(lbp_hist)
-        
-        # Convert to numpy array and normalize
-        features = np.array(features)
-        features = features / np.linalg.norm(features)
-        
-        # Cache the result
-        _feature_cache[img_hash] = {
-            'features': features,
-            'timestamp': time.time()
-        }
-        _clear_old_cache()
-        face_logger.log("Calculated and cached new features", "INFO")
-        
-        return features
+        # Resize to standard size and convert to grayscale
+        if gray is None:
+            gray = normalized_gray(face_img)
+        return calculate_face_features_batch([gray])[0]
     except Exception as e:
         face_logger.log(f"Error calculating face features: {str(e)}", "ERROR")
         face_logger.log("Attempting to recover by clearing feature cache", "INFO")
-        _feature_cache.clear()
+        feature_cache.clear()
         try:
-            features = calculate_face_features(face_img)
+            features = _compute_face_features(normalized_gray(face_img)[None])[0]
             face_logger.log("Successfully recovered feature calculation", "INFO")
             return features
         except Exception as e:
             face_logger.log(f"Recovery failed: {str(e)}", "ERROR")
             return None
 
+def detect_face_regions(face_analyzer, image, input_size=None):
+    """
+    Run only the detection model on an image, at an optional input size.
+
+    Returns Face objects with bbox, kps and det_score like face_analyzer.get().
+    """
+    bboxes, kpss = face_analyzer.det_model.detect(image, input_size=input_size, max_num=0, metric='default')
+    faces = []
+    for i in range(bboxes.shape[0]):
+        faces.append(Face(
+            bbox=bboxes[i, 0:4],
+            kps=kpss[i] if kpss is not None else None,
+            det_score=bboxes[i, 4]
+        ))
+    return faces
+
 def detect_faces(face_analyzer, frame):
     """Detect faces in a frame using InsightFace with recovery mechanism"""
     if face_analyzer is None:
@@ -7,16 +7,16 @@ def draw_face_box(frame, bbox, name, similarity, brightness, insight_face, track
     x1, y1, x2, y2 = bbox
     
     # Determine color and display text based on match status and phase
-    if track_info and track_info.get('matched', False):
+    if track_info and track_info.matched:
         # Already matched - show green box with person name
         color = (0, 255, 0)  # Green
         show_confidence = True
-    elif track_info and track_info.get('phase') == 'recognition' and not track_info.get('matched', False):
+    elif track_info and track_info.phase == 'recognition' and not track_info.matched:
         # In recognition phase
         color = (255, 0, 0)  # Blue
         name = "Recognizing"
         show_confidence = False
-    elif track_info and track_info.get('phase') == 'registration' and not track_info.get('matched', False):
+    elif track_info and track_info.phase == 'registration' and not track_info.matched:
         # In registration phase
         color = (0, 0, 255)  # Red
         name = "Registering"
@@ -55,10 +55,9 @@ def draw_face_box(frame, bbox, name, similarity, brightness, insight_face, track
             cv2.circle(frame, (x, y), 2, (0, 255, 0), -1)
     
     # Draw collection progress if in collection phase and not matched
-    if track_info and not track_info.get('matched', False):
-        phase = track_info.get('phase', '')
-        embeddings = track_info.get(f'{phase}_embeddings', [])
-        if embeddings:
+    if track_info and not track_info.matched:
+        embeddings = track_info.embeddings
+        if len(embeddings):
             progress = len(embeddings)
             total = 30  # Total embeddings needed
             progress_text = f"{progress}/{total}"
@@ -66,7 +65,7 @@ def draw_face_box(frame, bbox, name, similarity, brightness, insight_face, track
                        (x1, y2 + 25), cv2.FONT_HERSHEY_SIMPLEX,
                        0.6, color, 2)
 
-def draw_status(display, face_tracking, last_face_id, fps):
+def draw_status(display, face_tracking, last_person_id, fps):
     """Draw status information on the display"""
     status_y = display.shape[0] - 10
     
@@ -76,7 +75,7 @@ def draw_status(display, face_tracking, last_face_id, fps):
                0.6, (255, 255, 0), 2)
     
     # Show database info
-    db_status = f"Database: {last_face_id} faces"
+    db_status = f"Database: {last_person_id} faces"
     cv2.putText(display, db_status, 
                (10, status_y - 30), cv2.FONT_HERSHEY_SIMPLEX, 
                0.6, (255, 255, 255), 2)
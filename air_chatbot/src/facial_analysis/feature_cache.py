@@ -0,0 +1,71 @@
+"""Bounded LRU cache for face features."""
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from config import FEATURE_CACHE_MAX_BYTES
+from logger import face_logger
+
+ENTRY_OVERHEAD_BYTES = 200  # Rough cost of the key, dict slot and array header per entry
+
+class FeatureCache:
+    """
+    Face features keyed by the content of the normalized grayscale crop.
+
+    Features are computed only from that 64x64 crop, so hashing its 4 KB is
+    an exact key that is far cheaper than hashing the full-size crop. Entries
+    are evicted least recently used first, in O(1), once the cache grows
+    past max_bytes.
+    """
+
+    def __init__(self, max_bytes=FEATURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(gray):
+        return hashlib.blake2b(np.ascontiguousarray(gray).data, digest_size=16).digest()
+
+    def get(self, key):
+        with self._lock:
+            features = self._entries.get(key)
+            if features is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return features
+
+    def put(self, key, features):
+        size = features.nbytes + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes + ENTRY_OVERHEAD_BYTES
+            self._entries[key] = features
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def report(self):
+        """Log hit rate and size since the last report, then reset the counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            hits, entries, size = self.hits, len(self._entries), self._bytes
+            self.hits = self.misses = 0
+        if lookups:
+            face_logger.log(
+                f"Feature cache: {100.0 * hits / lookups:.1f}% hit rate over {lookups} lookups, "
+                f"{entries} entries, {size / 1024:.0f} KB", "INFO")
+
+feature_cache = FeatureCache()
@@ -9,19 +9,25 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from config import (
-    MIN_FACE_SIZE, MIN_FRAMES_TO_REGISTER, AUTO_REGISTER,
-    DEBUG_MODE, RECOGNITION_THRESHOLD
+    MIN_FRAMES_TO_REGISTER, AUTO_REGISTER,
+    DEBUG_MODE, RECOGNITION_THRESHOLD, STATS_REPORT_INTERVAL, VIDEO_SOURCE
 )
 from database import (
     init_database, save_face, clear_database, get_all_faces,
-    load_face_embeddings, update_active_person
+    update_active_person
 )
 from detector import (
     init_face_detector, calculate_face_features
 )
 from tracker import FaceTracker
+from scheduler import DetectionScheduler
+from pipeline import FacePipeline
+from quality import quality_gate
+from feature_cache import feature_cache
+from registration import FaceGallery, RegistrationService
+from consolidation import consolidate_gallery
 from utils import (
-    calculate_brightness, check_face_quality,
+    check_face_quality,
     get_adaptive_threshold
 )
 from display import (
@@ -30,57 +36,70 @@ from display import (
 from logger import face_logger
 from src.database.database_manager import db_manager
 
-# Cache for face features
-face_features_cache = {}
+# Every stored embedding, searched with one matrix product per batch of queries
+face_gallery = FaceGallery()
 
-def match_face(cursor, avg_features):
-    """Match averaged face features against stored averaged embeddings and handle continuous learning"""
+def match_faces(cursor, queries):
+    """
+    Match several averaged face features against stored averaged embeddings
+    with one matrix product, returns one match_face() result per query
+    """
     try:
-        face_logger.log("Starting face matching process", "INFO")
-        # Get all faces from database if cache is empty
-        if not face_features_cache:
+        face_logger.log(f"Starting face matching process for {len(queries)} faces", "INFO")
+        # Get all faces from database if the gallery is empty
+        if not face_gallery:
             face_logger.log("Loading face embeddings from database", "INFO")
-            face_features_cache.update(load_face_embeddings(cursor))
+            face_gallery.load(cursor)
         
-        if not face_features_cache:
+        if not face_gallery:
             face_logger.log("No faces found in database", "WARNING")
-            return None, 0.0, None  # No faces in database
+            return [(None, 0.0, None)] * len(queries)  # No faces in database
         
-        # Store all matches above threshold
-        matches = []
-        all_similarities = []  # For debugging
+        face_logger.log(f"Comparing with {len(face_gallery)} stored faces", "INFO")
         
-        face_logger.log(f"Comparing with {len(face_features_cache)} stored faces", "INFO")
+        # Similarity of every query with every stored embedding at once
+        similarities, owners = face_gallery.similarities(np.stack(queries))
         
-        # Compare with all stored averaged embeddings for each person
-        for face_id, face_data in face_features_cache.items():
-            name = face_data['name']
-            stored_embeddings = face_data['embeddings']
-            
-            # Calculate similarities with all stored averaged embeddings
-            similarities = []
-            for stored_embedding in stored_embeddings:
-                similarity = np.dot(avg_features, stored_embedding) / (np.linalg.norm(avg_features) * np.linalg.norm(stored_embedding))
-                similarities.append(similarity)
-            
-            # Get best similarity for this person
-            max_similarity = max(similarities)
-            matches_above_threshold = [s for s in similarities if s > RECOGNITION_THRESHOLD]
-            
-            if matches_above_threshold:
-                avg_similarity = sum(matches_above_threshold) / len(matches_above_threshold)
-                matches.append({
-                    'face_id': face_id,
-                    'name': name,
-                    'match_count': len(matches_above_threshold),
-                    'avg_similarity': avg_similarity,
-                    'max_similarity': max_similarity,
-                    'embedding_count': len(stored_embeddings),
-                    'quality_score': avg_similarity
-                })
-            
-            # Store best similarity for debugging
-            all_similarities.append((face_id, name, max_similarity))
+        # Per-person statistics, reducing over each person's columns
+        face_ids, person_index = np.unique(owners, return_inverse=True)
+        order = np.argsort(person_index, kind='stable')
+        starts = np.searchsorted(person_index[order], np.arange(len(face_ids)))
+        similarities = similarities[:, order]
+        above_threshold = similarities > RECOGNITION_THRESHOLD
+        match_counts = np.add.reduceat(above_threshold.astype(np.int64), starts, axis=1)
+        similarity_sums = np.add.reduceat(np.where(above_threshold, similarities, 0.0), starts, axis=1)
+        max_similarities = np.maximum.reduceat(similarities, starts, axis=1)
+        embedding_counts = np.bincount(person_index, minlength=len(face_ids))
+        
+        return [
+            _decide_match(face_ids, match_counts[q], similarity_sums[q], max_similarities[q], embedding_counts)
+            for q in range(len(queries))
+        ]
+    except Exception as e:
+        face_logger.log(f"Error in face matching: {str(e)}", "ERROR")
+        return [(None, 0.0, None)] * len(queries)
+
+def match_face(cursor, avg_features):
+    """Match averaged face features against stored averaged embeddings and handle continuous learning"""
+    return match_faces(cursor, [avg_features])[0]
+
+def _decide_match(face_ids, match_counts, similarity_sums, max_similarities, embedding_counts):
+    """Identity decision for one query from its per-person similarity statistics"""
+    try:
+        # Store all matches above threshold
+        matches = []
+        for i in np.flatnonzero(match_counts):
+            face_id = int(face_ids[i])
+            avg_similarity = float(similarity_sums[i] / match_counts[i])
+            matches.append({
+                'face_id': face_id,
+                'name': face_gallery.people[face_id]['name'],
+                'match_count': int(match_counts[i]),
+                'avg_similarity': avg_similarity,
+                'max_similarity': float(max_similarities[i]),
+                'embedding_count': int(embedding_counts[i]),
+                'quality_score': avg_similarity
+            })
         
         # Sort matches by average similarity
         matches.sort(key=lambda x: x['avg_similarity'], reverse=True)
@@ -89,24 +108,24 @@ def match_face(cursor, avg_features):
         if DEBUG_MODE and matches and matches[0]['avg_similarity'] > RECOGNITION_THRESHOLD:
             # Only print if this is a new match or significant change in similarity
             best_match = matches[0]
-            face_id = best_match['face_id']
+            person = face_gallery.people[best_match['face_id']]
             
-            # Store last printed similarity in cache to avoid repeating
-            if 'last_printed_similarity' not in face_features_cache[face_id]:
-                face_features_cache[face_id]['last_printed_similarity'] = 0.0
+            # Store last printed similarity in the gallery to avoid repeating
+            if 'last_printed_similarity' not in person:
+                person['last_printed_similarity'] = 0.0
             
             # Only print if similarity changed significantly (>0.01) or first time
-            if abs(best_match['avg_similarity'] - face_features_cache[face_id]['last_printed_similarity']) > 0.01:
+            if abs(best_match['avg_similarity'] - person['last_printed_similarity']) > 0.01:
                 face_logger.log(f"Best match found: {best_match['name']} with similarity {best_match['avg_similarity']:.4f}", "INFO")
-                face_logger.log(f"Matched embeddings: {best_match['match_count']}/{len(face_features_cache[best_match['face_id']]['embeddings'])}", "INFO")
+                face_logger.log(f"Matched embeddings: {best_match['match_count']}/{best_match['embedding_count']}", "INFO")
                 
                 # Update last printed similarity
-                face_features_cache[face_id]['last_printed_similarity'] = best_match['avg_similarity']
+                person['last_printed_similarity'] = best_match['avg_similarity']
         
         # Return best match if we have one
         if matches:
             best_match = matches[0]
-            total_embeddings = len(face_features_cache[best_match['face_id']]['embeddings'])
+            total_embeddings = best_match['embedding_count']
             
             # Calculate adaptive threshold
             adaptive_threshold = get_adaptive_threshold(
@@ -132,15 +151,52 @@ def match_face(cursor, avg_features):
                 # Return tuple with face_id and name
                 return (best_match['face_id'], best_match['name']), best_match['avg_similarity'], match_info
         
-        # If no match found, return highest similarity for reference
-        max_similarity = max(s[2] for s in all_similarities) if all_similarities else 0.0
+        # If no match found, return the closest person for reference so registration can reuse it
+        closest = int(np.argmax(max_similarities))
+        max_similarity = float(max_similarities[closest])
         face_logger.log(f"No match found. Highest similarity: {max_similarity:.4f}", "INFO")
-        return None, max_similarity, None
+        closest_info = {
+            'face_id': None,
+            'name': face_gallery.people[int(face_ids[closest])]['name'],
+            'embedding_count': int(embedding_counts[closest]),
+            'similarity': max_similarity
+        }
+        return None, max_similarity, closest_info
             
     except Exception as e:
         face_logger.log(f"Error in face matching: {str(e)}", "ERROR")
         return None, 0.0, None
 
+def face_features_and_quality(detected, for_registration):
+    """Features and quality check for a detected face, computed here if the recognition workers skipped them"""
+    if detected.quality is None:
+        detected.quality = quality_gate.check(
+            detected.face_img, detected.insight_face.kps,
+            for_registration=for_registration, track_id=detected.track_id
+        )
+    if detected.quality[0] and detected.features is None:
+        detected.features = calculate_face_features(detected.face_img)
+    return detected.features, detected.quality
+
+def apply_registration(done, tracker, cursor):
+    """Hand a registration finished in the background to the gallery and its track"""
+    track_info = tracker.face_tracking.get(done.track_id)
+    if track_info is not None:
+        track_info.registration_pending = False
+    if done.face_id is None:
+        face_logger.log(f"Failed to register {done.name}", "ERROR")
+        return
+
+    face_gallery.add(done.face_id, done.name, done.features, done.quality)
+    face_logger.log(f"Auto-registered new face as {done.name} (ID: {done.face_id})", "INFO")
+    update_active_person(cursor, done.face_id)
+
+    # Both do nothing if the track left while the face was being saved
+    tracker.mark_matched(done.track_id, done.face_id, done.name)
+
+    # Start collecting additional embeddings
+    tracker.start_post_registration_collection(done.track_id)
+
 def main():
     face_logger.log("Starting facial analysis system", "INFO")
     
@@ -151,6 +207,13 @@ def main():
         face_logger.log(f"Failed to initialize database: {str(e)}", "ERROR")
         return
 
+    # Keep each person's stored embeddings bounded before they are loaded for matching
+    try:
+        with db_manager.get_sqlite_connection() as (conn, cursor):
+            consolidate_gallery(cursor, conn)
+    except Exception as e:
+        face_logger.log(f"Gallery consolidation failed: {str(e)}", "WARNING")
+
     face_analyzer = init_face_detector()
     if not face_analyzer:
         face_logger.log("Failed to initialize face detector", "ERROR")
@@ -160,12 +223,22 @@ def main():
     tracker = FaceTracker()
     face_logger.log("Face tracker initialized", "INFO")
 
-    # Initialize the video capture
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        face_logger.log("Failed to open webcam", "ERROR")
+    # Full-frame detection only at a low cadence or on motion, ROI re-detection in between
+    scheduler = DetectionScheduler(face_analyzer)
+
+    # Capture, detection and recognition run on their own threads; identity
+    # decisions, database writes and display stay on this one
+    source = sys.argv[1] if len(sys.argv) > 1 else VIDEO_SOURCE
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    pipeline = FacePipeline(source, scheduler, tracker)
+    if not pipeline.start():
+        face_logger.log(f"Failed to open video source {source}", "ERROR")
         return
 
+    # Duplicate checks run here, image encoding and database inserts in the background
+    registration = RegistrationService(face_gallery)
+
     face_logger.log("Video capture initialized", "INFO")
     face_logger.log("System ready for face recognition", "INFO")
 
@@ -174,14 +247,22 @@ def main():
     fps_update_interval = 30  # Update FPS every 30 frames
     start_time = time.time()
     fps = 0.0
+    frame_cpu_start = time.process_time()
+    last_frame_id = 0
 
     try:
         while True:
-            # Read frame
-            ret, frame = cap.read()
-            if not ret:
-                face_logger.log("Failed to capture frame", "ERROR")
-                break
+            # Wait for the next processed frame
+            result = pipeline.get_result(timeout=0.1)
+            if result is None:
+                if pipeline.finished:
+                    face_logger.log("Video source finished", "INFO")
+                    break
+                continue
+            if result.frame_id < last_frame_id:
+                continue  # A recognition worker finished an older frame late
+            last_frame_id = result.frame_id
+            frame = result.frame
 
             # Update FPS less frequently
             frame_count += 1
@@ -193,48 +274,16 @@ def main():
 
             # Process frame and handle database operations
             with db_manager.get_sqlite_connection() as (conn, cursor):
-                # Detect faces using InsightFace
-                insightface_results = face_analyzer.get(frame)
-                face_count = len(insightface_results)
-                if face_count > 0:
-                    face_logger.log(f"Detected {face_count} faces in frame", "INFO")
-
-                # Extract face images and bounding boxes
-                face_images = []
-                for face in insightface_results:
-                    bbox = face.bbox.astype(int)
-                    x1, y1, x2, y2 = bbox
-
-                    # Check minimum face size
-                    if (x2-x1) < MIN_FACE_SIZE or (y2-y1) < MIN_FACE_SIZE:
-                        face_logger.log(f"Face too small: {x2-x1}x{y2-y1}", "INFO")
-                        continue
-
-                    # Extract face image - with additional checks to prevent errors
-                    try:
-                        if y1 < 0: y1 = 0
-                        if x1 < 0: x1 = 0
-                        if y2 > frame.shape[0]: y2 = frame.shape[0]
-                        if x2 > frame.shape[1]: x2 = frame.shape[1]
+                for done in registration.completed():
+                    apply_registration(done, tracker, cursor)
 
-                        face_img = frame[y1:y2, x1:x2]
-
-                        # Skip invalid faces
-                        if face_img is None or face_img.size == 0 or face_img.shape[0] <= 0 or face_img.shape[1] <= 0:
-                            face_logger.log("Invalid face image extracted", "WARNING")
-                            continue
-
-                        face_images.append((face_img, (x1, y1, x2, y2), face))
-                    except Exception as e:
-                        face_logger.log(f"Error extracting face: {str(e)}", "ERROR")
-                        continue
+                face_images = [(face.face_img, face.bbox, face.insight_face) for face in result.faces]
+                if face_images:
+                    face_logger.log(f"Detected {len(face_images)} faces in frame", "INFO")
 
                 # Process faces only if there are any
                 if face_images:
-                    # Update tracking
                     current_time = time.time()
-                    matched_tracks = tracker.update_tracks(face_images, current_time)
-                    face_logger.log(f"Updated {len(matched_tracks)} face tracks", "INFO")
 
                     # Make a copy for display only if we need to draw on it
                     display = frame.copy()
@@ -244,67 +293,83 @@ def main():
                     frame_center_x = frame.shape[1] / 2
                     frame_center_y = frame.shape[0] / 2
 
+                    # Add this frame's embeddings first, so every track that is ready
+                    # for recognition is matched against the gallery in one batch
+                    low_quality = set()
+                    ready = []
+                    for detected in result.faces:
+                        track_info = tracker.face_tracking.get(detected.track_id)
+                        if track_info is None or track_info.matched:
+                            continue
+                        
+                        # Check quality based on current phase
+                        features, (is_good_quality, reason) = face_features_and_quality(
+                            detected, for_registration=(track_info.phase == 'registration')
+                        )
+                        if not is_good_quality:
+                            face_logger.log(f"Low quality frame for {track_info.phase}: {reason}", "WARNING")
+                            low_quality.add(detected.track_id)
+                            continue
+                        
+                        # Add embedding to collection for current phase, quality score from brightness
+                        tracker.add_embedding(detected.track_id, features, detected.brightness / 255.0)
+                        if track_info.phase == 'recognition' and tracker.has_enough_embeddings(detected.track_id):
+                            ready.append(detected.track_id)
+                    
+                    match_results = {}
+                    # A track removed by the detection thread meanwhile has no average
+                    averages = [(ready_id, tracker.get_average_embedding(ready_id)) for ready_id in ready]
+                    averages = [(ready_id, average) for ready_id, average in averages if average is not None]
+                    if averages:
+                        ready_ids, queries = zip(*averages)
+                        match_results = dict(zip(ready_ids, match_faces(cursor, list(queries))))
+
                     # Process each detected face
-                    for face_img, bbox, insight_face in face_images:
-                        # Calculate brightness for display
-                        brightness = calculate_brightness(face_img)
-
-                        # Find corresponding track
-                        track_id = None
-                        for tid in matched_tracks:
-                            if tracker.face_tracking[tid]['bbox'] == bbox:
-                                track_id = tid
-                                break
-
-                        if track_id:
-                            track_info = tracker.face_tracking[track_id]
-                            name = track_info['name']  # Initialize name from track info
-                            similarity = track_info['similarity']  # Initialize similarity from track info
+                    for detected in result.faces:
+                        face_img, bbox, insight_face = detected.face_img, detected.bbox, detected.insight_face
+                        brightness = detected.brightness
+                        track_id = detected.track_id
+
+                        # The detection thread may have dropped the track since
+                        track_info = tracker.face_tracking.get(track_id)
+                        name, similarity = "Unknown", 0.0
+                        if track_info is not None:
+                            name = track_info.name  # Initialize name from track info
+                            similarity = track_info.similarity  # Initialize similarity from track info
 
                             # Store recognized face info for center-based selection
-                            if track_info['matched'] and track_info.get('face_id') is not None:
+                            if track_info.matched and track_info.face_id is not None:
                                 x1, y1, x2, y2 = bbox
                                 face_center_x = (x1 + x2) / 2
                                 face_center_y = (y1 + y2) / 2
                                 distance_to_center = ((face_center_x - frame_center_x) ** 2 + 
                                                     (face_center_y - frame_center_y) ** 2) ** 0.5
                                 recognized_faces.append({
-                                    'face_id': track_info['face_id'],
+                                    'face_id': track_info.face_id,
                                     'distance': distance_to_center
                                 })
-                                face_logger.log(f"Face {track_info['face_id']} recognized at distance {distance_to_center:.2f}", "INFO")
+                                face_logger.log(f"Face {track_info.face_id} recognized at distance {distance_to_center:.2f}", "INFO")
+
+                                if track_info.recognition_latency is None:
+                                    track_info.recognition_latency = current_time - track_info.track_start_time
+                                    scheduler.record_recognition(track_info.recognition_latency)
 
                             # Try to match with database if not already matched
-                            if not track_info['matched']:
-                                features = calculate_face_features(face_img)
-                                
-                                # Check quality based on current phase
-                                is_good_quality, reason = check_face_quality(
-                                    face_img, 
-                                    insight_face.kps, 
-                                    for_registration=(track_info['phase'] == 'registration')
-                                )
-                                
-                                if not is_good_quality:
-                                    face_logger.log(f"Low quality frame for {track_info['phase']}: {reason}", "WARNING")
+                            if not track_info.matched:
+                                if track_id in low_quality:
                                     continue
                                 
-                                # Calculate quality score
-                                quality_score = calculate_brightness(face_img) / 255.0
-                                
-                                # Add embedding to collection for current phase
-                                tracker.add_embedding(track_id, features, quality_score)
-                                
                                 # Only proceed with matching if we have enough embeddings
                                 if tracker.has_enough_embeddings(track_id):
-                                    if track_info['phase'] == 'recognition':
+                                    if track_info.phase == 'recognition':
                                         # Skip if already matched with high confidence
-                                        if track_info.get('matched', False) and track_info.get('similarity', 0.0) > 0.90:
+                                        if track_info.matched and track_info.similarity > 0.90:
                                             continue
                                             
-                                        # Get average embedding for recognition
-                                        avg_features = tracker.get_average_embedding(track_id)
-                                        match_result, similarity, match_info = match_face(cursor, avg_features)
+                                        # Matched above together with the other faces in the frame
+                                        if track_id not in match_results:
+                                            continue
+                                        match_result, similarity, match_info = match_results[track_id]
                                         
                                         if match_result and match_info:
                                             face_id, name = match_result
@@ -316,13 +381,7 @@ def main():
                                             
                                             # If match found with high confidence (>0.90), mark as matched and stop
                                             if similarity > 0.90:
-                                                track_info['matched'] = True
-                                                track_info['evaluated'] = True
-                                                track_info['recognition_embeddings'] = []
-                                                track_info['embedding_qualities'] = []
-                                                track_info['name'] = name
-                                                track_info['face_id'] = face_id  # Set face_id
-                                                track_info['similarity'] = similarity
+                                                tracker.mark_matched(track_id, face_id, name, similarity)
                                                 
                                                 # Update active person for high confidence match
                                                 face_logger.log(f"High confidence match found for {name} (ID: {face_id})", "INFO")
@@ -336,96 +395,66 @@ def main():
                                                 update_active_person(cursor, face_id)
                                                 
                                                 # Only save if we have collected all 30 frames
-                                                if len(track_info['recognition_embeddings']) >= tracker.EMBEDDING_COLLECTION_FRAMES:
+                                                if len(track_info.recognition_embeddings) >= tracker.EMBEDDING_COLLECTION_FRAMES:
                                                     # Get averaged embedding from all 30 frames
                                                     avg_features = tracker.get_average_embedding(track_id)
-                                                    avg_quality = np.mean(track_info['embedding_qualities'])
+                                                    if avg_features is None:
+                                                        continue
+                                                    avg_quality = track_info.embeddings.mean_quality()
                                                     
-                                                    # Save to database
-                                                    save_face(cursor, conn, face_img, name, avg_features, avg_quality)
+                                                    # Save to database in the background
+                                                    registration.save_embedding(face_id, name, avg_features, avg_quality)
                                                     
-                                                    # Update cache with the new averaged embedding
-                                                    if len(face_features_cache[face_id]['embeddings']) < 30:
-                                                        face_features_cache[face_id]['embeddings'].append(avg_features)
-                                                        face_features_cache[face_id]['qualities'].append(avg_quality)
+                                                    # Update gallery with the new averaged embedding
+                                                    if len(face_gallery.people[face_id]['embeddings']) < 30:
+                                                        face_gallery.add(face_id, name, avg_features, avg_quality)
                                                         
                                                         face_logger.log(f"Added new averaged embedding for {name} ({embedding_count + 1}/30)", "INFO")
                                                     
                                                     # Clear embeddings after saving
-                                                    track_info['recognition_embeddings'] = []
-                                                    track_info['embedding_qualities'] = []
+                                                    track_info.recognition_embeddings.clear()
                                         else:
                                             # No match found, switch to registration phase
-                                            track_info['can_register'] = True
-                                            tracker.start_registration_phase(track_id)
+                                            closest_match = (match_info['name'], similarity) if match_info else None
+                                            tracker.start_registration_phase(track_id, closest_match)
                                             name = "Unknown"
                                             similarity = 0.0
                                             face_logger.log("No match found, starting registration phase", "INFO")
                                     
-                                    elif track_info['phase'] == 'registration' and track_info.get('can_register', False):
+                                    elif track_info.phase == 'registration' and track_info.can_register:
                                         # Now do registration with collected high-quality embeddings
-                                        if current_time - tracker.last_registration_time > 2.0:
+                                        if not track_info.registration_pending and current_time - tracker.last_registration_time > 2.0:
                                             # Get the averaged embedding from registration phase
                                             avg_features = tracker.get_average_embedding(track_id)
+                                            if avg_features is None:
+                                                continue
                                             
-                                            # Check if this face is too similar to any existing face
-                                            max_similarity = 0.0
-                                            similar_face_name = None
-                                            for face_id, face_data in face_features_cache.items():
-                                                for stored_embedding in face_data['embeddings']:
-                                                    similarity = np.dot(avg_features, stored_embedding) / (
-                                                        np.linalg.norm(avg_features) * np.linalg.norm(stored_embedding)
-                                                    )
-                                                    if similarity > max_similarity:
-                                                        max_similarity = similarity
-                                                        similar_face_name = face_data['name']
-                                            
-                                            if max_similarity > 0.85:  # If too similar to existing face
+                                            # Check against every known face at once, reusing what the recognition match found
+                                            duplicate = registration.find_duplicate(avg_features, prior=track_info.closest_match)
+                                            if duplicate:  # If too similar to existing face
+                                                similar_face_name, max_similarity = duplicate
                                                 face_logger.log(f"Cannot register: Too similar to existing face '{similar_face_name}' ({max_similarity:.4f})", "WARNING")
-                                                track_info['matched'] = True  # Prevent further registration attempts
+                                                track_info.matched = True  # Prevent further registration attempts
                                                 continue
                                             
                                             # Quality is acceptable and face is unique, proceed with registration
-                                            tracker.last_face_id += 1
-                                            auto_name = f"Person_{tracker.last_face_id}"
+                                            auto_name = tracker.next_person_name()
                                             
-                                            # Save to database with averaged embedding
-                                            avg_quality = np.mean(track_info['embedding_qualities'])
-                                            face_id = save_face(cursor, conn, face_img, auto_name, avg_features, avg_quality)
-                                            
-                                            if face_id is not None:
-                                                # Update cache
-                                                face_features_cache[face_id] = {
-                                                    'name': auto_name,
-                                                    'embeddings': [avg_features],
-                                                    'qualities': [avg_quality]
-                                                }
-                                                
-                                                # Update track info with face_id
-                                                track_info['name'] = auto_name
-                                                track_info['face_id'] = face_id
-                                                track_info['matched'] = True
-                                                tracker.last_registration_time = current_time
-                                                
-                                                # Start collecting additional embeddings
-                                                tracker.start_post_registration_collection(track_id)
-                                                
-                                                # Update active person after registration
-                                                face_logger.log(f"Auto-registered new face as {auto_name} (ID: {face_id})", "INFO")
-                                                update_active_person(cursor, face_id)
+                                            # Save to database with averaged embedding; the track is updated once the save completes
+                                            avg_quality = track_info.embeddings.mean_quality()
+                                            registration.submit(track_id, face_img, auto_name, avg_features, avg_quality)
+                                            track_info.registration_pending = True
+                                            tracker.last_registration_time = current_time
+                                            face_logger.log(f"Registering new face as {auto_name}", "INFO")
                             else:
-                                remaining = tracker.EMBEDDING_COLLECTION_FRAMES - len(track_info['embeddings'])
-                                face_logger.log(f"Collecting {track_info['phase']} embeddings... {remaining} more needed", "INFO")
+                                remaining = tracker.EMBEDDING_COLLECTION_FRAMES - len(track_info.embeddings)
+                                face_logger.log(f"Collecting {track_info.phase} embeddings... {remaining} more needed", "INFO")
 
                             # Handle post-registration embedding collection
-                            if track_info['matched'] and tracker.needs_more_embeddings(track_id):
-                                features = calculate_face_features(face_img)
-                                
+                            if track_info.matched and tracker.needs_more_embeddings(track_id):
                                 # Use recognition quality checks
-                                is_good_quality, reason = check_face_quality(
-                                    face_img,
-                                    insight_face.kps,
-                                    for_registration=False  # Use recognition quality checks
+                                features, (is_good_quality, reason) = face_features_and_quality(
+                                    detected, for_registration=False
                                 )
                                 
                                 if not is_good_quality:
@@ -433,33 +462,32 @@ def main():
                                     continue
                                 
                                 # Calculate quality score
-                                quality_score = calculate_brightness(face_img) / 255.0
+                                quality_score = brightness / 255.0
                                 
                                 # Add embedding to collection
-                                track_info['recognition_embeddings'].append(features)
-                                track_info['embedding_qualities'].append(quality_score)
+                                track_info.recognition_embeddings.append(features, quality_score)
                                 
                                 # Check if we have enough frames for an averaged embedding
-                                if len(track_info['recognition_embeddings']) >= tracker.EMBEDDING_COLLECTION_FRAMES:
+                                if len(track_info.recognition_embeddings) >= tracker.EMBEDDING_COLLECTION_FRAMES:
                                     # Get averaged embedding
                                     avg_features = tracker.get_average_embedding(track_id)
-                                    avg_quality = np.mean(track_info['embedding_qualities'])
+                                    if avg_features is None:
+                                        continue
+                                    avg_quality = track_info.embeddings.mean_quality()
                                     
-                                    # Save to database
-                                    save_face(cursor, conn, face_img, track_info['name'], avg_features, avg_quality)
+                                    # Save to database in the background
+                                    face_id = track_info.face_id
+                                    registration.save_embedding(face_id, track_info.name, avg_features, avg_quality)
                                     
-                                    # Update cache
-                                    face_id = track_info['face_id']
-                                    if face_id in face_features_cache:
-                                        face_features_cache[face_id]['embeddings'].append(avg_features)
-                                        face_features_cache[face_id]['qualities'].append(avg_quality)
+                                    # Update gallery
+                                    if face_id in face_gallery:
+                                        face_gallery.add(face_id, track_info.name, avg_features, avg_quality)
                                     
                                     # Clear embeddings and increment counter
-                                    track_info['recognition_embeddings'] = []
-                                    track_info['embedding_qualities'] = []
+                                    track_info.recognition_embeddings.clear()
                                     count = tracker.increment_post_registration_embeddings(track_id)
                                     
-                                    face_logger.log(f"Added additional averaged embedding {count}/5 for {track_info['name']}", "INFO")
+                                    face_logger.log(f"Added additional averaged embedding {count}/5 for {track_info.name}", "INFO")
 
                         # Draw face box and information
                         draw_face_box(display, bbox, name, similarity, brightness, insight_face, track_info)
@@ -473,11 +501,20 @@ def main():
                         update_active_person(cursor, most_centered['face_id'])
 
                     # Draw status information
-                    draw_status(display, tracker.face_tracking, tracker.last_face_id, fps)
+                    draw_status(display, tracker.face_tracking, tracker.last_person_id, fps)
 
             # Show the result
             cv2.imshow("Hybrid Face Recognition", display if face_images else frame)
 
+            # Process CPU time across all stages since the previous frame
+            frame_cpu_end = time.process_time()
+            scheduler.record_frame(frame_cpu_end - frame_cpu_start)
+            frame_cpu_start = frame_cpu_end
+            if frame_count % STATS_REPORT_INTERVAL == 0:
+                scheduler.report()
+                pipeline.report()
+                feature_cache.report()
+
             # Key handling
             key = cv2.waitKey(1) & 0xFF
             if key == ord('q'):
@@ -498,8 +535,7 @@ def main():
                         cv2.waitKey(1500)
                         continue
                     else:
-                        tracker.last_face_id += 1
-                        name = f"Person_{tracker.last_face_id}"
+                        name = tracker.next_person_name()
                         
                         # Calculate features
                         features = calculate_face_features(face_img)
@@ -508,27 +544,21 @@ def main():
                         face_id = save_face(cursor, conn, face_img, name, features)
 
                         if face_id is not None:
-                            # Update cache
-                            face_features_cache[face_id] = {
-                                'name': name,
-                                'embeddings': [features],
-                                'qualities': [1.0]  # Default quality score for manual registration
-                            }
+                            # Update gallery, default quality score for manual registration
+                            face_gallery.add(face_id, name, features, 1.0)
                             
                             # Update active person after manual registration
                             face_logger.log(f"Manually registered new face as {name} (ID: {face_id})", "INFO")
                             update_active_person(cursor, face_id)
                         else:
-                            tracker.last_face_id -= 1
                             face_logger.log("Failed to save face to database", "ERROR")
                         
                         tracker.last_registration_time = current_time
             elif key == ord('c'):
                 face_logger.log("Clearing database", "INFO")
                 clear_database(cursor, conn)
-                face_features_cache.clear()  # Clear the cache
-                tracker.face_tracking = {}
-                tracker.last_face_id = 0
+                face_gallery.clear()
+                tracker.clear()
             elif key == ord('s'):
                 faces = get_all_faces(cursor)
                 if faces:
@@ -545,7 +575,9 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
-        cap.release()
+        pipeline.stop()
+        pipeline.report()
+        registration.stop()
         cv2.destroyAllWindows()
         db_manager.cleanup()  # Clean up all database connections
         face_logger.log("Application terminated", "INFO")
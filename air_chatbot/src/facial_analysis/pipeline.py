@@ -0,0 +1,269 @@
+"""Threaded capture / detection / recognition stages for the facial analysis loop."""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+import cv2
+import numpy as np
+from config import MIN_FACE_SIZE, PIPELINE_QUEUE_SIZE, RECOGNITION_WORKERS
+from detector import calculate_face_features_batch
+from quality import normalized_gray, quality_gate
+from logger import face_logger
+
+@dataclass
+class DetectedFace:
+    face_img: np.ndarray
+    bbox: tuple
+    insight_face: Any
+    track_id: Optional[str] = None
+    brightness: float = 0.0
+    quality: Optional[tuple] = None  # (is_good_quality, reason), only for tracks that still need embeddings
+    features: Optional[np.ndarray] = None  # Only computed when the quality check passed
+
+@dataclass
+class FrameResult:
+    frame_id: int
+    captured_at: float
+    frame: np.ndarray
+    faces: List[DetectedFace] = field(default_factory=list)
+
+class LatestFrameSlot:
+    """Holds only the newest captured frame; an unread frame is replaced, never queued"""
+
+    def __init__(self):
+        self._frame = None
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._condition:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        with self._condition:
+            if self._frame is None:
+                self._condition.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+class DropOldestQueue:
+    """Bounded queue whose put() discards the oldest item instead of blocking"""
+
+    def __init__(self, maxsize):
+        self._items = deque()
+        self._maxsize = maxsize
+        self._condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) >= self._maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        with self._condition:
+            if not self._items:
+                self._condition.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def __len__(self):
+        return len(self._items)
+
+class FacePipeline:
+    """
+    Runs capture, detection and per-face recognition work on separate threads.
+
+    The capture thread keeps only the latest frame, so a slow detector never
+    makes the camera back up. The detection thread owns the scheduler and the
+    tracker. A pool of recognition workers computes brightness, features and
+    quality checks, each batched over all faces of a frame. Stages are joined by small drop-oldest
+    queues, and results come out of get_result() for identity decisions,
+    database writes and display on the calling thread.
+
+    source may be a camera index or a video file; a video file is played at
+    its own frame rate (unless realtime=False) so it behaves like a camera.
+    """
+
+    def __init__(self, source, scheduler, tracker, workers=RECOGNITION_WORKERS, queue_size=PIPELINE_QUEUE_SIZE, realtime=True):
+        self.source = source
+        self.scheduler = scheduler
+        self.tracker = tracker
+        self.workers = workers
+        self.realtime = realtime
+        self._slot = LatestFrameSlot()
+        self._detections = DropOldestQueue(queue_size)
+        self._results = DropOldestQueue(queue_size)
+        self._stop = threading.Event()
+        self._capture_done = threading.Event()
+        self._detection_done = threading.Event()
+        self._workers_running = workers
+        self._workers_lock = threading.Lock()
+        self._threads = []
+        self._capture = None
+        self._latencies = deque(maxlen=1000)
+        self._stats_start = time.perf_counter()
+        self._stats_frames = 0
+
+    def start(self):
+        """Open the source and start all stage threads, returns False if the source can't be opened"""
+        self._capture = cv2.VideoCapture(self.source)
+        if not self._capture.isOpened():
+            return False
+        self._threads = [threading.Thread(target=self._capture_loop, name="face-capture", daemon=True),
+                         threading.Thread(target=self._detection_loop, name="face-detection", daemon=True)]
+        self._threads += [threading.Thread(target=self._recognition_loop, name=f"face-recognition-{i}", daemon=True)
+                          for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        if self._capture is not None:
+            self._capture.release()
+
+    @property
+    def finished(self):
+        """True once every stage has stopped and all results have been taken"""
+        return self._workers_running == 0 and not len(self._results)
+
+    def get_result(self, timeout=0.1):
+        """Next processed frame, or None if none arrived within the timeout"""
+        result = self._results.get(timeout)
+        if result is not None:
+            self._latencies.append(time.perf_counter() - result.captured_at)
+            self._stats_frames += 1
+        return result
+
+    def _capture_loop(self):
+        is_file = isinstance(self.source, str)
+        frame_interval = 0.0
+        if is_file and self.realtime:
+            fps = self._capture.get(cv2.CAP_PROP_FPS)
+            frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+        frame_id = 0
+        next_frame_at = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                ret, frame = self._capture.read()
+                if not ret:
+                    if is_file:
+                        face_logger.log("End of video file", "INFO")
+                    else:
+                        face_logger.log("Failed to capture frame", "ERROR")
+                    break
+                frame_id += 1
+                self._slot.put(FrameResult(frame_id, time.perf_counter(), frame))
+                if frame_interval:
+                    next_frame_at += frame_interval
+                    delay = next_frame_at - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+        finally:
+            self._capture_done.set()
+
+    def _extract_faces(self, frame, faces):
+        """Crop detected faces, skipping ones that are too small"""
+        face_images = []
+        for face in faces:
+            x1, y1, x2, y2 = face.bbox.astype(int)
+            if (x2 - x1) < MIN_FACE_SIZE or (y2 - y1) < MIN_FACE_SIZE:
+                face_logger.log(f"Face too small: {x2-x1}x{y2-y1}", "INFO")
+                continue
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, frame.shape[1]), min(y2, frame.shape[0])
+            face_img = frame[y1:y2, x1:x2]
+            if face_img.size == 0:
+                face_logger.log("Invalid face image extracted", "WARNING")
+                continue
+            face_images.append((face_img, (x1, y1, x2, y2), face))
+        return face_images
+
+    def _detection_loop(self):
+        try:
+            while not self._stop.is_set():
+                item = self._slot.get(timeout=0.1)
+                if item is None:
+                    if self._capture_done.is_set():
+                        break
+                    continue
+                try:
+                    faces = self.scheduler.detect(item.frame)
+                    face_images = self._extract_faces(item.frame, faces)
+                    track_ids = self.tracker.update_tracks(face_images, time.time()) if face_images else []
+                except Exception as e:
+                    face_logger.log(f"Error detecting faces: {str(e)}", "ERROR")
+                    continue
+                item.faces = [DetectedFace(face_img, bbox, insight_face, track_id)
+                              for (face_img, bbox, insight_face), track_id in zip(face_images, track_ids)]
+                self._detections.put(item)
+        finally:
+            self._detection_done.set()
+
+    def _recognition_loop(self):
+        try:
+            while not self._stop.is_set():
+                item = self._detections.get(timeout=0.1)
+                if item is None:
+                    if self._detection_done.is_set():
+                        break
+                    continue
+                if item.faces:
+                    self._recognize(item.faces)
+                self._results.put(item)
+        finally:
+            with self._workers_lock:
+                self._workers_running -= 1
+
+    def _recognize(self, faces):
+        """Brightness, quality checks and features for all faces of a frame, each step batched"""
+        # One small grayscale crop per face serves brightness, quality checks and features
+        grays = np.stack([normalized_gray(face.face_img) for face in faces])
+        for face, brightness in zip(faces, grays.reshape(len(grays), -1).mean(axis=1)):
+            face.brightness = float(brightness)
+
+        # Confirmed tracks skip feature extraction unless collecting post-registration embeddings
+        pending = []
+        for i, face in enumerate(faces):
+            track = self.tracker.face_tracking.get(face.track_id)
+            if track is not None and (not track.matched or track.needs_more_embeddings):
+                pending.append((i, not track.matched and track.phase == 'registration'))
+        if not pending:
+            return
+
+        verdicts = quality_gate.check_batch(
+            [(faces[i].face_img, faces[i].insight_face.kps, for_registration, faces[i].track_id)
+             for i, for_registration in pending],
+            grays=[grays[i] for i, _ in pending]
+        )
+        passed = []
+        for (i, _), verdict in zip(pending, verdicts):
+            faces[i].quality = verdict
+            if verdict[0]:
+                passed.append(i)
+        if passed:
+            for i, features in zip(passed, calculate_face_features_batch([grays[i] for i in passed])):
+                faces[i].features = features
+
+    def report(self):
+        """Log throughput, end-to-end latency and dropped frames since the last report"""
+        elapsed = time.perf_counter() - self._stats_start
+        if self._stats_frames and elapsed > 0:
+            latencies = np.array(self._latencies) * 1000
+            face_logger.log(
+                f"Pipeline: {self._stats_frames / elapsed:.1f} FPS, "
+                f"latency mean {latencies.mean():.0f} ms / p95 {np.percentile(latencies, 95):.0f} ms, "
+                f"dropped {self._slot.dropped} at capture, {self._detections.dropped} after detection, "
+                f"{self._results.dropped} after recognition", "INFO")
+        self._stats_start = time.perf_counter()
+        self._stats_frames = 0
+        self._latencies.clear()
@@ -0,0 +1,183 @@
+"""Face quality gating, cheapest checks first."""
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from config import QUALITY_CACHE_FRAMES
+from logger import face_logger
+
+NORMALIZED_FACE_SIZE = (64, 64)  # Same size calculate_face_features works on
+MIN_BRIGHTNESS = 65
+MAX_BRIGHTNESS = 165
+MIN_BLUR_VARIANCE = 20  # Laplacian variance of the full-resolution crop
+MIN_FACE_DIMENSION = 80
+MIN_ASPECT_RATIO = 0.5
+MAX_ASPECT_RATIO = 1.5
+MAX_TRACKED_VERDICTS = 256
+
+def normalized_gray(face_img):
+    """Downsampled grayscale crop shared by the quality checks, brightness and feature extraction"""
+    return cv2.cvtColor(cv2.resize(face_img, NORMALIZED_FACE_SIZE), cv2.COLOR_BGR2GRAY)
+
+def face_pose_reason(landmarks, face_width):
+    """
+    Check if face is frontal/straight using the 5 facial landmarks
+    Returns None if it is, otherwise the reason it isn't
+    """
+    if landmarks is None:
+        return "No landmarks detected"
+    left_eye, right_eye, nose, left_mouth, right_mouth = landmarks[:5]
+
+    eye_angle = np.degrees(np.arctan2(right_eye[1] - left_eye[1], right_eye[0] - left_eye[0]))
+    if abs(eye_angle) > 10:
+        return "Face is tilted"
+
+    # Eye distance relative to face width drops when the face turns sideways
+    if np.linalg.norm(right_eye - left_eye) / face_width < 0.25:
+        return "Face is not frontal"
+
+    eye_center = (left_eye + right_eye) / 2
+    if abs(nose[0] - eye_center[0]) / face_width > 0.08:
+        return "Face is turned sideways"
+
+    eye_level = (left_eye[1] + right_eye[1]) / 2
+    mouth_level = (left_mouth[1] + right_mouth[1]) / 2
+    nose_to_mouth = mouth_level - nose[1]
+    vertical_ratio = (nose[1] - eye_level) / nose_to_mouth if nose_to_mouth != 0 else float('inf')
+    if vertical_ratio < 0.8:
+        return "Face is looking up"
+    if vertical_ratio > 1.5:
+        return "Face is looking down"
+    return None
+
+def laplacian_variance(face_img):
+    """
+    Sharpness of a face crop as the variance of its Laplacian.
+
+    Measured at full resolution: downsampling to NORMALIZED_FACE_SIZE
+    shrinks the blur with the face, so a blurred 200px face scores like a
+    sharp one there.
+    """
+    return cv2.Laplacian(cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY), cv2.CV_64F).var()
+
+class QualityGate:
+    """
+    Decides whether a face crop is good enough to take an embedding from.
+
+    Checks run cheapest first: crop size and proportions from the shape,
+    pose from the landmarks (registration only), brightness on one small
+    grayscale copy that callers can reuse for feature extraction, then blur
+    on the full-resolution crop. check_batch() runs brightness for all faces
+    of a frame at once.
+    A track's verdict is reused for QUALITY_CACHE_FRAMES frames, and a
+    track's result is only logged when it changes.
+    """
+
+    def __init__(self, cache_frames=QUALITY_CACHE_FRAMES):
+        self.cache_frames = cache_frames
+        self._verdicts = OrderedDict()  # (track_id, for_registration) -> [verdict, frames left]
+        self._logged = OrderedDict()  # track_id -> last logged verdict
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _geometry_verdict(face_img, landmarks, for_registration):
+        """Verdict from the crop shape and pose alone, None if those pass"""
+        height, width = face_img.shape[:2]
+        if min(height, width) < MIN_FACE_DIMENSION:
+            return False, "Face too small for registration"
+
+        aspect_ratio = height / width
+        if not (MIN_ASPECT_RATIO <= aspect_ratio <= MAX_ASPECT_RATIO):
+            return False, "Invalid face proportions for registration" if for_registration else "Invalid face proportions"
+
+        if for_registration and landmarks is not None:
+            pose_reason = face_pose_reason(landmarks, width)
+            if pose_reason:
+                return False, f"Poor face pose: {pose_reason}"
+        return None
+
+    @staticmethod
+    def _photometric_verdict(face_img, brightness):
+        if brightness < MIN_BRIGHTNESS:
+            return False, "Too dark"
+        if brightness > MAX_BRIGHTNESS:
+            return False, "Too bright"
+        if laplacian_variance(face_img) < MIN_BLUR_VARIANCE:
+            return False, "Too blurry"
+        return True, None
+
+    def _cached(self, track_id, for_registration):
+        if track_id is None:
+            return None
+        with self._lock:
+            cached = self._verdicts.get((track_id, for_registration))
+            if cached and cached[1] > 0:
+                cached[1] -= 1
+                return cached[0]
+        return None
+
+    def _remember(self, track_id, for_registration, verdict):
+        key = (track_id, for_registration)
+        with self._lock:
+            if track_id is not None:
+                self._verdicts[key] = [verdict, self.cache_frames]
+                self._verdicts.move_to_end(key)
+                while len(self._verdicts) > MAX_TRACKED_VERDICTS:
+                    self._verdicts.popitem(last=False)
+            changed = self._logged.get(track_id) != verdict
+            if changed:
+                self._logged[track_id] = verdict
+                self._logged.move_to_end(track_id)
+                while len(self._logged) > MAX_TRACKED_VERDICTS:
+                    self._logged.popitem(last=False)
+        if changed:
+            subject = f"Face quality for {track_id}" if track_id is not None else "Face quality"
+            if verdict[0]:
+                face_logger.log(f"{subject}: passed", "INFO")
+            else:
+                face_logger.log(f"{subject}: failed ({verdict[1]})", "INFO")
+
+    def check_batch(self, faces, grays=None):
+        """
+        Quality of several faces at once
+        faces: (face_img, landmarks, for_registration, track_id) tuples
+        grays: their normalized_gray() crops, if the caller already has them
+        Returns one (is_good_quality, reason) per face
+        """
+        verdicts = [None] * len(faces)
+        photometric = []  # Faces that passed the geometry checks
+        for i, (face_img, landmarks, for_registration, track_id) in enumerate(faces):
+            verdicts[i] = self._cached(track_id, for_registration)
+            if verdicts[i] is not None:
+                continue
+            try:
+                verdicts[i] = self._geometry_verdict(face_img, landmarks, for_registration)
+            except Exception as e:
+                verdicts[i] = (False, f"Quality check failed: {str(e)}")
+            if verdicts[i] is None:
+                photometric.append(i)
+            else:
+                self._remember(track_id, for_registration, verdicts[i])
+
+        if photometric:
+            try:
+                stack = np.stack([grays[i] if grays is not None else normalized_gray(faces[i][0]) for i in photometric])
+                brightness = stack.reshape(len(stack), -1).mean(axis=1)
+                results = [self._photometric_verdict(faces[i][0], b) for i, b in zip(photometric, brightness)]
+            except Exception as e:
+                results = [(False, f"Quality check failed: {str(e)}")] * len(photometric)
+            for i, verdict in zip(photometric, results):
+                verdicts[i] = verdict
+                self._remember(faces[i][3], faces[i][2], verdict)
+        return verdicts
+
+    def check(self, face_img, landmarks=None, for_registration=False, track_id=None, gray=None):
+        """
+        Check various quality metrics of a face image
+        Returns (is_good_quality, reason)
+        """
+        return self.check_batch(
+            [(face_img, landmarks, for_registration, track_id)], None if gray is None else [gray]
+        )[0]
+
+quality_gate = QualityGate()
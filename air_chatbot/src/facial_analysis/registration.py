@@ -0,0 +1,179 @@
+"""Stored face gallery and background face registration."""
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from config import DUPLICATE_SIMILARITY_THRESHOLD
+from database import save_face, save_embedding, load_face_embeddings
+from logger import face_logger
+from src.database.database_manager import db_manager
+
+def _normalize_rows(embeddings):
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+class FaceGallery:
+    """
+    Every stored embedding of every known person.
+
+    people keeps the per-person view (name, embeddings, qualities) keyed by
+    face id. The embeddings are also kept as rows of one unit-normalized
+    matrix, so cosine similarity of a batch of queries against the whole
+    gallery is a single matrix product.
+    """
+
+    def __init__(self):
+        self.people = {}
+        self._matrix = None
+        self._owners = np.zeros(0, dtype=np.int64)  # Row -> face id
+        self._dirty = False
+
+    def __len__(self):
+        return len(self.people)
+
+    def __contains__(self, face_id):
+        return face_id in self.people
+
+    def load(self, cursor):
+        self.people = load_face_embeddings(cursor)
+        self._dirty = True
+
+    def add(self, face_id, name, embedding, quality):
+        person = self.people.setdefault(face_id, {'name': name, 'embeddings': [], 'qualities': []})
+        person['embeddings'].append(embedding)
+        person['qualities'].append(quality)
+        self._dirty = True
+
+    def clear(self):
+        self.people = {}
+        self._dirty = True
+
+    def _rows(self):
+        """Embedding matrix and its row owners, rebuilt only after the gallery changed"""
+        if self._dirty:
+            owners, embeddings = [], []
+            for face_id, person in self.people.items():
+                owners += [face_id] * len(person['embeddings'])
+                embeddings += person['embeddings']
+            self._owners = np.array(owners, dtype=np.int64)
+            self._matrix = _normalize_rows(embeddings) if embeddings else None
+            self._dirty = False
+        return self._matrix, self._owners
+
+    def similarities(self, queries):
+        """Cosine similarity of each query (rows) against every stored embedding (columns), with the column owners"""
+        matrix, owners = self._rows()
+        if matrix is None:
+            return np.zeros((len(np.atleast_2d(queries)), 0), dtype=np.float32), owners
+        return _normalize_rows(queries) @ matrix.T, owners
+
+@dataclass
+class Registration:
+    track_id: Optional[str]  # None for an extra embedding of a known person
+    name: str
+    features: np.ndarray
+    quality: float
+    face_id: Optional[int] = None
+
+class RegistrationService:
+    """
+    Enrolls new people without pausing the video loop.
+
+    The duplicate check runs on the caller's thread, since it is one matrix
+    product of the candidate embeddings against the gallery and the
+    registrations still in flight. Encoding the face image and inserting it
+    into the database happen on a worker thread with its own SQLite
+    connection. Finished registrations come back from completed(), on the
+    caller's thread, to be applied to the tracks and the gallery.
+    """
+
+    def __init__(self, gallery, duplicate_threshold=DUPLICATE_SIMILARITY_THRESHOLD):
+        self.gallery = gallery
+        self.duplicate_threshold = duplicate_threshold
+        self._jobs = queue.Queue()
+        self._done = queue.Queue()
+        self._pending = {}  # track_id -> Registration, for the duplicate check
+        self._worker = threading.Thread(target=self._run, name="face-registration", daemon=True)
+        self._worker.start()
+
+    def find_duplicate(self, candidates, prior=None):
+        """
+        Most similar known or pending person if any candidate embedding is
+        too close to it, as (name, similarity), otherwise None.
+
+        prior is the (name, similarity) the track's preceding match already
+        found; if that was over the threshold the face is a duplicate and the
+        gallery is not searched again.
+        """
+        if prior is not None and prior[1] > self.duplicate_threshold:
+            return prior
+
+        similarities, owners = self.gallery.similarities(candidates)
+        best_name, best_similarity = None, 0.0
+        if similarities.size:
+            row, column = np.unravel_index(np.argmax(similarities), similarities.shape)
+            best_similarity = float(similarities[row, column])
+            best_name = self.gallery.people[int(owners[column])]['name']
+
+        if self._pending:
+            pending = list(self._pending.values())
+            pending_similarities = _normalize_rows(candidates) @ _normalize_rows([p.features for p in pending]).T
+            row, column = np.unravel_index(np.argmax(pending_similarities), pending_similarities.shape)
+            if pending_similarities[row, column] > best_similarity:
+                best_similarity = float(pending_similarities[row, column])
+                best_name = pending[column].name
+
+        if best_similarity > self.duplicate_threshold:
+            return best_name, best_similarity
+        return None
+
+    def submit(self, track_id, face_img, name, features, quality):
+        """Queue a new person for saving; the result arrives through completed()"""
+        registration = Registration(track_id, name, features, quality)
+        self._pending[track_id] = registration
+        self._jobs.put((registration, face_img))
+
+    def save_embedding(self, face_id, name, features, quality):
+        """Queue an extra embedding of a known person for saving, nothing comes back"""
+        self._jobs.put((Registration(None, name, features, quality, face_id), None))
+
+    def completed(self):
+        """Registrations finished since the last call"""
+        finished = []
+        while True:
+            try:
+                registration = self._done.get_nowait()
+            except queue.Empty:
+                return finished
+            if registration.track_id is not None:
+                self._pending.pop(registration.track_id, None)
+                finished.append(registration)
+
+    def stop(self, timeout=5.0):
+        """Finish queued saves and stop the worker"""
+        self._jobs.put(None)
+        self._worker.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                registration, face_img = job
+                try:
+                    with db_manager.get_sqlite_connection() as (conn, cursor):
+                        if registration.track_id is None:
+                            save_embedding(cursor, conn, registration.face_id, registration.features, registration.quality)
+                        else:
+                            registration.face_id = save_face(
+                                cursor, conn, face_img, registration.name, registration.features, registration.quality
+                            )
+                except Exception as e:
+                    face_logger.log(f"Error registering {registration.name}: {str(e)}", "ERROR")
+                self._done.put(registration)
+        finally:
+            # SQLite connections can only be closed by the thread that opened them
+            db_manager.close_connection()
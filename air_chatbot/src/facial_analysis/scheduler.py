@@ -0,0 +1,147 @@
+"""Detection scheduling for the facial analysis loop."""
+import time
+import cv2
+import numpy as np
+from config import (
+    FULL_DETECTION_INTERVAL,
+    MOTION_THRESHOLD,
+    ROI_PADDING,
+    ROI_DETECTION_SIZE
+)
+from detector import detect_face_regions
+from utils import iou_matrix
+from logger import face_logger
+
+MOTION_FRAME_SIZE = (80, 60)  # Motion is measured on a tiny grayscale copy of the frame
+
+class DetectionScheduler:
+    """
+    Decides where to run face detection on each frame.
+
+    Full-frame detection runs every FULL_DETECTION_INTERVAL frames, when
+    nothing is being tracked, and when the scene moves. In between, faces
+    found on the previous frame are re-detected only inside padded regions
+    around them, at a much smaller detector input size. If any of them is
+    lost, the frame falls back to full detection.
+    """
+
+    def __init__(self, face_analyzer):
+        self.face_analyzer = face_analyzer
+        self.frames_since_full = FULL_DETECTION_INTERVAL
+        self.last_faces = []
+        self.moving = False
+        self._previous_small = None
+        self._stats = {}
+        self.reset_stats()
+
+    def _motion_score(self, frame):
+        """Mean absolute gray-level change against the previous frame"""
+        small = cv2.cvtColor(cv2.resize(frame, MOTION_FRAME_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        previous, self._previous_small = self._previous_small, small
+        if previous is None:
+            return float('inf')
+        return float(cv2.absdiff(small, previous).mean())
+
+    def _detect_roi(self, frame, face):
+        """Re-detect one face inside a padded region around where it was"""
+        x1, y1, x2, y2 = face.bbox
+        pad_x = (x2 - x1) * ROI_PADDING
+        pad_y = (y2 - y1) * ROI_PADDING
+        rx1, ry1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+        rx2, ry2 = min(frame.shape[1], int(x2 + pad_x)), min(frame.shape[0], int(y2 + pad_y))
+        if rx2 - rx1 < 16 or ry2 - ry1 < 16:
+            return None
+
+        # Detector input must be a multiple of 32
+        side = min(ROI_DETECTION_SIZE, max(64, int(np.ceil(max(rx2 - rx1, ry2 - ry1) / 32.0)) * 32))
+        candidates = detect_face_regions(self.face_analyzer, frame[ry1:ry2, rx1:rx2], input_size=(side, side))
+        if not candidates:
+            return None
+
+        offset = np.array([rx1, ry1], dtype=np.float32)
+        for candidate in candidates:
+            candidate.bbox = candidate.bbox + np.tile(offset, 2)
+            if candidate.kps is not None:
+                candidate.kps = candidate.kps + offset
+        # A neighbouring face may also be inside the region; keep the one that overlaps most
+        overlaps = iou_matrix([face.bbox], [candidate.bbox for candidate in candidates])[0]
+        return candidates[int(np.argmax(overlaps))]
+
+    def detect(self, frame):
+        """Detect faces in a frame, full-frame or around the faces already found"""
+        wall_start = time.perf_counter()
+
+        self.moving = self._motion_score(frame) > MOTION_THRESHOLD
+        faces = None
+        if self.last_faces and not self.moving and self.frames_since_full < FULL_DETECTION_INTERVAL:
+            faces = []
+            for face in self.last_faces:
+                found = self._detect_roi(frame, face)
+                if found is None:
+                    faces = None  # Face left or moved further than the region; look everywhere
+                    break
+                faces.append(found)
+
+        if faces is None:
+            faces = detect_face_regions(self.face_analyzer, frame)
+            self.frames_since_full = 0
+            full = True
+        else:
+            faces = self._suppress_duplicates(faces)
+            self.frames_since_full += 1
+            full = False
+        self.last_faces = faces
+
+        stats = self._stats['moving' if self.moving else 'static']
+        stats['detect_wall'] += time.perf_counter() - wall_start
+        stats['full_detections' if full else 'roi_detections'] += 1
+        return faces
+
+    @staticmethod
+    def _suppress_duplicates(faces):
+        """Drop faces that two regions both re-detected"""
+        if len(faces) < 2:
+            return faces
+        overlaps = iou_matrix([face.bbox for face in faces], [face.bbox for face in faces])
+        kept = []
+        for i in np.argsort([-face.det_score for face in faces]):
+            if all(overlaps[i, j] < 0.5 for j in kept):
+                kept.append(i)
+        return [faces[i] for i in sorted(kept)]
+
+    def record_frame(self, cpu_seconds):
+        """Add the CPU time of a whole frame to the current scene state"""
+        stats = self._stats['moving' if self.moving else 'static']
+        stats['frames'] += 1
+        stats['cpu'] += cpu_seconds
+
+    def record_recognition(self, latency_seconds):
+        """Add the time a track took from first sighting to identity"""
+        stats = self._stats['moving' if self.moving else 'static']
+        stats['recognitions'] += 1
+        stats['recognition_latency'] += latency_seconds
+
+    def reset_stats(self):
+        for scene in ('static', 'moving'):
+            self._stats[scene] = {
+                'frames': 0, 'cpu': 0.0, 'detect_wall': 0.0,
+                'full_detections': 0, 'roi_detections': 0, 'recognitions': 0, 'recognition_latency': 0.0
+            }
+
+    def report(self):
+        """Log per-frame CPU and recognition latency for static and moving scenes, then reset"""
+        for scene, stats in self._stats.items():
+            frames = stats['frames']
+            if not frames:
+                continue
+            detections = stats['full_detections'] + stats['roi_detections']
+            message = (
+                f"{scene.capitalize()} scene: {frames} frames, "
+                f"CPU {1000 * stats['cpu'] / frames:.1f} ms/frame, "
+                f"detection {1000 * stats['detect_wall'] / max(detections, 1):.1f} ms "
+                f"({stats['full_detections']} full, {stats['roi_detections']} ROI)"
+            )
+            if stats['recognitions']:
+                message += f", recognition latency {stats['recognition_latency'] / stats['recognitions']:.2f}s"
+            face_logger.log(message, "INFO")
+        self.reset_stats()
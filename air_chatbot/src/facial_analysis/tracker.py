@@ -1,6 +1,9 @@
+import threading
 import time
+from collections import deque
 import numpy as np
-from utils import calculate_iou
+from scipy.optimize import linear_sum_assignment
+from utils import iou_matrix
 from config import (
     TRACKING_THRESHOLD,
     EVALUATION_FRAMES,
@@ -10,182 +13,245 @@ from config import (
 from logger import face_logger
 from database import update_active_person
 
+class EmbeddingBuffer:
+    """Fixed-size ring buffer of embeddings and their quality scores"""
+    __slots__ = ('capacity', '_embeddings', '_qualities', '_start', '_count')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._embeddings = None  # Allocated on first append, once the embedding size is known
+        self._qualities = np.zeros(capacity, dtype=np.float32)
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, embedding, quality=1.0):
+        """Add an embedding, overwriting the oldest one when full"""
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.capacity, len(embedding)), dtype=np.float32)
+        index = (self._start + self._count) % self.capacity
+        self._embeddings[index] = embedding
+        self._qualities[index] = quality
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+
+    def _order(self):
+        return (self._start + np.arange(self._count)) % self.capacity
+
+    def embeddings(self):
+        """Stored embeddings, oldest first, as a (count, dim) array"""
+        if self._count == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._embeddings[self._order()]
+
+    def mean_quality(self):
+        return float(self._qualities[self._order()].mean()) if self._count else 0.0
+
+class Track:
+    """State of one tracked face; slotted so per-track memory stays fixed"""
+    __slots__ = (
+        'bbox', 'frames_seen', 'last_seen', 'track_start_time', 'face_img', 'name', 'face_id',
+        'similarity', 'matched', 'similarity_history', 'match_history', 'evaluated', 'can_register',
+        'recognition_embeddings', 'registration_embeddings', 'phase',
+        'post_registration_embeddings', 'needs_more_embeddings', 'recognition_latency',
+        'closest_match', 'registration_pending'
+    )
+
+    def __init__(self, bbox, face_img, current_time, embedding_frames):
+        self.bbox = bbox
+        self.frames_seen = 1
+        self.last_seen = current_time
+        self.track_start_time = current_time
+        self.face_img = face_img
+        self.name = "Unknown"
+        self.face_id = None
+        self.similarity = 0.0
+        self.matched = False
+        self.similarity_history = deque(maxlen=EVALUATION_FRAMES)
+        self.match_history = deque(maxlen=EVALUATION_FRAMES)
+        self.evaluated = False
+        self.can_register = False
+        self.recognition_embeddings = EmbeddingBuffer(embedding_frames)  # For recognition phase
+        self.registration_embeddings = EmbeddingBuffer(embedding_frames)  # For registration phase
+        self.phase = 'recognition'  # Current phase: 'recognition' or 'registration'
+        self.post_registration_embeddings = 0  # Counter for embeddings after registration
+        self.needs_more_embeddings = False  # Flag to indicate if we need more embeddings
+        self.recognition_latency = None  # Seconds from first sighting to identity, once known
+        self.closest_match = None  # (name, similarity) of the best candidate when recognition found no match
+        self.registration_pending = False  # Registration submitted, waiting for the database insert
+
+    @property
+    def embeddings(self):
+        """Embedding collection for the current phase"""
+        return self.registration_embeddings if self.phase == 'registration' else self.recognition_embeddings
+
 class FaceTracker:
     def __init__(self, db_cursor=None):
-        self.face_tracking = {}  # For tracking faces between frames
+        self.face_tracking = {}  # For tracking faces between frames, track_id -> Track
         self.last_face_id = 0
+        self.last_person_id = 0  # Numbering of registered Person_N names, separate from tracks
         self.last_registration_time = 0
         self.db_cursor = db_cursor
         self.EMBEDDING_COLLECTION_FRAMES = 30  # Number of frames to collect embeddings
+        # Tracks are created and removed on the detection thread and updated on the
+        # main thread; every method below that touches them holds this lock
+        self._lock = threading.Lock()
 
-    def init_track_info(self, track_id):
-        """Initialize a new track with all necessary fields"""
-        if track_id not in self.face_tracking:
-            self.face_tracking[track_id] = {
-                'bbox': None,
-                'frames_seen': 1,
-                'last_seen': 0,
-                'track_start_time': 0,
-                'face_img': None,
-                'name': "Unknown",
-                'face_id': None,  # Initialize face_id
-                'similarity': 0.0,
-                'matched': False,
-                'similarity_history': [],
-                'match_history': [],
-                'evaluated': False,
-                'can_register': False,
-                'embeddings': [],
-                'embedding_qualities': [],
-                'recognition_embeddings': [],  # For recognition phase
-                'registration_embeddings': [],  # For registration phase
-                'phase': 'recognition',  # Current phase: 'recognition' or 'registration'
-                'post_registration_embeddings': 0,  # Counter for embeddings after registration
-                'needs_more_embeddings': False  # Flag to indicate if we need more embeddings
-            }
-        return self.face_tracking[track_id]
+    def clear(self):
+        """Forget all tracks and restart face numbering"""
+        with self._lock:
+            self.face_tracking = {}
+            self.last_face_id = 0
+            self.last_person_id = 0
+
+    def next_person_name(self):
+        """Name for a newly registered person"""
+        with self._lock:
+            self.last_person_id += 1
+            return f"Person_{self.last_person_id}"
 
     def update_tracks(self, face_images, current_time):
-        """Update face tracking information"""
-        matched_tracks = set()
-        unmatched_detections = list(range(len(face_images)))
-        
-        # First pass: Try to match each track with its closest detection
-        for track_id, track_info in self.face_tracking.items():
-            best_detection_idx = -1
-            best_iou = TRACKING_THRESHOLD
-            
-            # Find best matching detection for this track
-            for idx in unmatched_detections:
-                face_img, bbox, insight_face = face_images[idx]
-                iou = calculate_iou(bbox, track_info['bbox'])
-                if iou > best_iou:
-                    best_iou = iou
-                    best_detection_idx = idx
-            
-            # If we found a match, update the track
-            if best_detection_idx >= 0:
-                face_img, bbox, insight_face = face_images[best_detection_idx]
-                track_info['bbox'] = bbox
-                track_info['frames_seen'] += 1
-                track_info['last_seen'] = current_time
-                track_info['face_img'] = face_img
-                matched_tracks.add(track_id)
-                unmatched_detections.remove(best_detection_idx)
-                face_logger.log(f"Updated track {track_id} with detection {best_detection_idx}", "INFO")
-        
-        # Second pass: Create new tracks for unmatched detections
-        for idx in unmatched_detections:
+        """
+        Update face tracking information.
+
+        Detections are assigned to tracks by maximizing total IoU over all
+        pairs at once. Returns the track id for each detection, in order.
+        """
+        with self._lock:
+            return self._update_tracks(face_images, current_time)
+
+    def _update_tracks(self, face_images, current_time):
+        track_ids = list(self.face_tracking)
+        detection_tracks = [None] * len(face_images)
+
+        if track_ids and face_images:
+            track_boxes = [self.face_tracking[track_id].bbox for track_id in track_ids]
+            detection_boxes = [bbox for _, bbox, _ in face_images]
+            ious = iou_matrix(track_boxes, detection_boxes)
+            rows, cols = linear_sum_assignment(ious, maximize=True)
+            for row, col in zip(rows, cols):
+                if ious[row, col] <= TRACKING_THRESHOLD:
+                    continue
+                face_img, bbox, insight_face = face_images[col]
+                track = self.face_tracking[track_ids[row]]
+                track.bbox = bbox
+                track.frames_seen += 1
+                track.last_seen = current_time
+                track.face_img = face_img
+                detection_tracks[col] = track_ids[row]
+
+        # Create new tracks for unmatched detections
+        for idx, track_id in enumerate(detection_tracks):
+            if track_id is not None:
+                continue
             face_img, bbox, insight_face = face_images[idx]
             self.last_face_id += 1
             track_id = f"track_{self.last_face_id}"
-            
-            self.face_tracking[track_id] = {
-                'bbox': bbox,
-                'frames_seen': 1,
-                'last_seen': current_time,
-                'track_start_time': current_time,
-                'face_img': face_img,
-                'name': "Unknown",
-                'face_id': None,  # Initialize face_id
-                'similarity': 0.0,
-                'matched': False,
-                'similarity_history': [],
-                'match_history': [],
-                'evaluated': False,
-                'can_register': False,
-                'embeddings': [],
-                'embedding_qualities': [],
-                'recognition_embeddings': [],
-                'registration_embeddings': [],
-                'phase': 'recognition'
-            }
-            matched_tracks.add(track_id)
+            self.face_tracking[track_id] = Track(bbox, face_img, current_time, self.EMBEDDING_COLLECTION_FRAMES)
+            detection_tracks[idx] = track_id
             face_logger.log(f"Created new track {track_id} for unmatched detection {idx}", "INFO")
-        
+
         # Remove old tracks
-        self._remove_old_tracks(matched_tracks, current_time)
-        
+        self._remove_old_tracks(set(detection_tracks), current_time)
+
         # Log tracking status
-        face_logger.log(f"Active tracks: {len(self.face_tracking)}, Matched this frame: {len(matched_tracks)}", "INFO")
-        return matched_tracks
+        face_logger.log(f"Active tracks: {len(self.face_tracking)}, Matched this frame: {len(face_images)}", "INFO")
+        return detection_tracks
 
     def _remove_old_tracks(self, matched_tracks, current_time):
         """Remove tracks that haven't been seen recently"""
         tracks_to_remove = []
-        for track_id, track_info in self.face_tracking.items():
+        for track_id, track in self.face_tracking.items():
             if track_id not in matched_tracks:
                 # If track wasn't matched and hasn't been seen for a while, remove it
-                if current_time - track_info['last_seen'] > 1.0:  # 1 second threshold
+                if current_time - track.last_seen > 1.0:  # 1 second threshold
                     tracks_to_remove.append(track_id)
                     # Don't clear active person when face leaves frame
-                    if DEBUG_MODE and track_info.get('face_id') is not None:
-                        face_logger.log(f"Person left frame (was ID: {track_info['face_id']})", "INFO")
-        
+                    if DEBUG_MODE and track.face_id is not None:
+                        face_logger.log(f"Person left frame (was ID: {track.face_id})", "INFO")
+
         # Remove old tracks
         for track_id in tracks_to_remove:
             if DEBUG_MODE:
-                track_info = self.face_tracking[track_id]
-                track_age = current_time - track_info.get('track_start_time', current_time)
-                face_logger.log(f"Removing track {track_id} (age: {track_age:.1f}s, frames: {track_info['frames_seen']})", "INFO")
+                track = self.face_tracking[track_id]
+                track_age = current_time - track.track_start_time
+                face_logger.log(f"Removing track {track_id} (age: {track_age:.1f}s, frames: {track.frames_seen})", "INFO")
             del self.face_tracking[track_id]
 
     def update_track_identity(self, track_id, match_result, similarity):
         """Update track identity based on recognition results"""
-        track_info = self.face_tracking[track_id]
-        
-        # Store results in history
-        track_info['similarity_history'].append(similarity)
-        track_info['match_history'].append(match_result)
-        
-        # Keep only the last EVALUATION_FRAMES results
-        if len(track_info['similarity_history']) > EVALUATION_FRAMES:
-            track_info['similarity_history'] = track_info['similarity_history'][-EVALUATION_FRAMES:]
-            track_info['match_history'] = track_info['match_history'][-EVALUATION_FRAMES:]
-        
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if track is not None:
+                self._update_track_identity(track, match_result, similarity)
+
+    def mark_matched(self, track_id, face_id, name, similarity=None):
+        """Settle a track's identity, e.g. after a confident match or a completed registration"""
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if track is None:
+                return
+            track.name = name
+            track.face_id = face_id
+            track.matched = True
+            if similarity is not None:
+                track.similarity = similarity
+                track.evaluated = True
+                track.recognition_embeddings.clear()
+
+    def _update_track_identity(self, track, match_result, similarity):
+        # Store results in history; only the last EVALUATION_FRAMES results are kept
+        track.similarity_history.append(similarity)
+        track.match_history.append(match_result)
+
         # If we get a very high similarity match, immediately mark as matched
         HIGH_SIMILARITY_THRESHOLD = 0.99
         if similarity > HIGH_SIMILARITY_THRESHOLD and match_result is not None:
             face_id, name = match_result
-            track_info['name'] = name
-            track_info['face_id'] = face_id
-            track_info['similarity'] = similarity
-            track_info['matched'] = True
-            track_info['evaluated'] = True
-            track_info['can_register'] = False
-            
+            track.name = name
+            track.face_id = face_id
+            track.similarity = similarity
+            track.matched = True
+            track.evaluated = True
+            track.can_register = False
+
             # Update active person in database for high confidence matches
             if self.db_cursor and face_id is not None:
                 if DEBUG_MODE:
                     face_logger.log(f"High confidence match, updating active person to ID: {face_id}", "INFO")
                 update_active_person(self.db_cursor, face_id)
-            
+
             if DEBUG_MODE:
                 face_logger.log(f"Immediate match due to high similarity: {name} ({similarity:.4f})", "INFO")
             return
-        
+
         # Make identity decision after collecting enough frames
-        if len(track_info['similarity_history']) >= EVALUATION_FRAMES and not track_info['evaluated']:
-            self._evaluate_track_identity(track_id)
+        if len(track.similarity_history) >= EVALUATION_FRAMES and not track.evaluated:
+            self._evaluate_track_identity(track)
 
-    def _evaluate_track_identity(self, track_id):
+    def _evaluate_track_identity(self, track):
         """Evaluate track identity based on collected history"""
-        track_info = self.face_tracking[track_id]
-        
         # Count how many frames resulted in the same match
         match_counts = {}
         max_similarity = 0.0  # Track highest similarity
         high_similarity_matches = []  # Track all high similarity matches
         consistent_matches = []  # Track all matches above recognition threshold
-        
+
         HIGH_SIMILARITY_THRESHOLD = 0.99
         RECOGNITION_THRESHOLD = 0.85
-        
-        for i, m in enumerate(track_info['match_history']):
-            similarity = track_info['similarity_history'][i]
+
+        for m, similarity in zip(track.match_history, track.similarity_history):
             # Update max similarity
             max_similarity = max(max_similarity, similarity)
-            
+
             if m is not None:
                 face_id, name = m
                 # Track high similarity matches
@@ -199,10 +265,10 @@ class FaceTracker:
                     match_counts[name] += 1
                 else:
                     match_counts[name] = 1
-        
+
         # Calculate how many frames had ANY match
-        frames_with_match = sum(1 for m in track_info['match_history'] if m is not None)
-        
+        frames_with_match = sum(1 for m in track.match_history if m is not None)
+
         if DEBUG_MODE:
             face_logger.log("\nIdentity Evaluation Results:", "INFO")
             face_logger.log(f"  Frames with any match: {frames_with_match}/{EVALUATION_FRAMES}", "INFO")
@@ -213,35 +279,35 @@ class FaceTracker:
                 face_logger.log(f"  High similarity matches: {high_similarity_matches}", "INFO")
             if consistent_matches:
                 face_logger.log(f"  Consistent matches above threshold: {consistent_matches}", "INFO")
-        
+
         # If ANY frame had high similarity, prevent registration and match to that person
         if high_similarity_matches:
             # Use the most frequent high similarity match
             high_sim_names = [name for name, _ in high_similarity_matches]
             most_common_high_sim = max(set(high_sim_names), key=high_sim_names.count)
-            track_info['name'] = most_common_high_sim
-            track_info['similarity'] = max(sim for name, sim in high_similarity_matches if name == most_common_high_sim)
-            track_info['matched'] = True
-            track_info['evaluated'] = True
-            track_info['can_register'] = False
+            track.name = most_common_high_sim
+            track.similarity = max(sim for name, sim in high_similarity_matches if name == most_common_high_sim)
+            track.matched = True
+            track.evaluated = True
+            track.can_register = False
             if DEBUG_MODE:
                 face_logger.log(f"  Decision: Matched to {most_common_high_sim} due to high similarity frames", "INFO")
             return
-        
+
         # If ANY frame consistently matched above recognition threshold, prevent registration
         if consistent_matches:
             # Use the most frequent match above threshold
             consistent_names = [name for name, _ in consistent_matches]
             most_common_consistent = max(set(consistent_names), key=consistent_names.count)
-            track_info['name'] = most_common_consistent
-            track_info['similarity'] = max(sim for name, sim in consistent_matches if name == most_common_consistent)
-            track_info['matched'] = True
-            track_info['evaluated'] = True
-            track_info['can_register'] = False
+            track.name = most_common_consistent
+            track.similarity = max(sim for name, sim in consistent_matches if name == most_common_consistent)
+            track.matched = True
+            track.evaluated = True
+            track.can_register = False
             if DEBUG_MODE:
                 face_logger.log(f"  Decision: Matched to {most_common_consistent} due to consistent matches above threshold", "INFO")
             return
-        
+
         # Find the most frequent match (mode) for normal evaluation
         most_common_match = None
         max_count = 0
@@ -249,166 +315,148 @@ class FaceTracker:
             if count > max_count:
                 max_count = count
                 most_common_match = name
-        
+
         if most_common_match is not None and max_count >= (EVALUATION_FRAMES // 2):
             # Consistent match found
-            self._set_consistent_match(track_info, most_common_match)
+            self._set_consistent_match(track, most_common_match)
         else:
             # Handle inconsistent or no matches
-            self._handle_inconsistent_match(track_info, frames_with_match)
+            self._handle_inconsistent_match(track, frames_with_match)
 
-    def _set_consistent_match(self, track_info, most_common_match):
+    def _set_consistent_match(self, track, most_common_match):
         """Set track info for consistently matched face"""
         face_id, name = most_common_match
-        track_info['name'] = name
-        track_info['face_id'] = face_id
+        track.name = name
+        track.face_id = face_id
         # Calculate average similarity for the most common match
-        matched_similarities = [s for i, s in enumerate(track_info['similarity_history']) 
-                             if track_info['match_history'][i] is not None and 
-                                track_info['match_history'][i][1] == name]
+        matched_similarities = [s for m, s in zip(track.match_history, track.similarity_history)
+                                if m is not None and m[1] == name]
         avg_similarity = sum(matched_similarities) / len(matched_similarities) if matched_similarities else 0
-        track_info['similarity'] = avg_similarity
-        track_info['matched'] = True
-        track_info['evaluated'] = True
-        
+        track.similarity = avg_similarity
+        track.matched = True
+        track.evaluated = True
+
         # Update active person in database
         if self.db_cursor and face_id is not None:
             update_active_person(self.db_cursor, face_id)
-        
+
         if DEBUG_MODE:
             face_logger.log(f"  Decision: {name} (mode with {len(matched_similarities)}/{EVALUATION_FRAMES} frames)", "INFO")
 
-    def _handle_inconsistent_match(self, track_info, frames_with_match):
+    def _handle_inconsistent_match(self, track, frames_with_match):
         """Handle cases where there isn't a consistent match"""
         if frames_with_match == 0:
             # No matches at all - mark as unknown
-            track_info['name'] = "Unknown"
-            avg_similarity = sum(track_info['similarity_history']) / len(track_info['similarity_history']) if track_info['similarity_history'] else DEFAULT_DISPLAY_CONFIDENCE
-            track_info['similarity'] = max(avg_similarity, DEFAULT_DISPLAY_CONFIDENCE)
-            track_info['matched'] = False
-            track_info['evaluated'] = True
-            track_info['can_register'] = True
-            
+            track.name = "Unknown"
+            avg_similarity = sum(track.similarity_history) / len(track.similarity_history) if track.similarity_history else DEFAULT_DISPLAY_CONFIDENCE
+            track.similarity = max(avg_similarity, DEFAULT_DISPLAY_CONFIDENCE)
+            track.matched = False
+            track.evaluated = True
+            track.can_register = True
+
             if DEBUG_MODE:
                 face_logger.log(f"  Decision: Unknown (no matches in any frame) - can register as new", "INFO")
         else:
             # Some matches but not consistent - mark as ambiguous
-            track_info['name'] = "Ambiguous"
-            max_similarity = max(track_info['similarity_history']) if track_info['similarity_history'] else DEFAULT_DISPLAY_CONFIDENCE
-            track_info['similarity'] = max(max_similarity, DEFAULT_DISPLAY_CONFIDENCE)
-            track_info['matched'] = False
-            track_info['evaluated'] = True
-            track_info['can_register'] = False
-            
+            track.name = "Ambiguous"
+            max_similarity = max(track.similarity_history) if track.similarity_history else DEFAULT_DISPLAY_CONFIDENCE
+            track.similarity = max(max_similarity, DEFAULT_DISPLAY_CONFIDENCE)
+            track.matched = False
+            track.evaluated = True
+            track.can_register = False
+
             if DEBUG_MODE:
                 face_logger.log(f"  Decision: Ambiguous ({frames_with_match}/{EVALUATION_FRAMES} frames had matches) - cannot register", "INFO")
 
     def add_embedding(self, track_id, features, quality_score):
         """Add embedding to collection based on current phase"""
-        if track_id not in self.face_tracking:
-            return
-            
-        track_info = self.face_tracking[track_id]
-        
-        # Initialize collections if they don't exist
-        if 'recognition_embeddings' not in track_info:
-            track_info['recognition_embeddings'] = []
-        if 'registration_embeddings' not in track_info:
-            track_info['registration_embeddings'] = []
-            
         # Normalize features before storing
         features = features / np.linalg.norm(features)
-        
-        if track_info['phase'] == 'recognition':
+
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if track is not None:
+                self._add_embedding(track, features, quality_score)
+
+    def _add_embedding(self, track, features, quality_score):
+        if track.phase == 'recognition':
             # Collecting embeddings for recognition
-            if len(track_info['recognition_embeddings']) < self.EMBEDDING_COLLECTION_FRAMES:
-                track_info['recognition_embeddings'].append(features)
-                if len(track_info['recognition_embeddings']) >= self.EMBEDDING_COLLECTION_FRAMES:
-                    track_info['evaluated'] = True
-                    
-        elif track_info['phase'] == 'registration' and track_info.get('can_register', False):
+            if len(track.recognition_embeddings) < self.EMBEDDING_COLLECTION_FRAMES:
+                track.recognition_embeddings.append(features, quality_score)
+                if len(track.recognition_embeddings) >= self.EMBEDDING_COLLECTION_FRAMES:
+                    track.evaluated = True
+
+        elif track.phase == 'registration' and track.can_register:
             # Collecting embeddings for registration
-            if len(track_info['registration_embeddings']) < self.EMBEDDING_COLLECTION_FRAMES:
-                track_info['registration_embeddings'].append(features)
-                
-        # Store the embedding for the current active collection
-        track_info['embeddings'] = (track_info['registration_embeddings'] 
-                                  if track_info['phase'] == 'registration' 
-                                  else track_info['recognition_embeddings'])
-        
-        # Store quality score
-        if 'embedding_qualities' not in track_info:
-            track_info['embedding_qualities'] = []
-        track_info['embedding_qualities'].append(quality_score)
+            if len(track.registration_embeddings) < self.EMBEDDING_COLLECTION_FRAMES:
+                track.registration_embeddings.append(features, quality_score)
 
     def has_enough_embeddings(self, track_id):
         """Check if we have enough embeddings for the current phase"""
-        track_info = self.face_tracking.get(track_id)
-        if not track_info:
-            return False
-            
-        if track_info['phase'] == 'recognition':
-            return len(track_info.get('recognition_embeddings', [])) >= self.EMBEDDING_COLLECTION_FRAMES
-        else:
-            return len(track_info.get('registration_embeddings', [])) >= self.EMBEDDING_COLLECTION_FRAMES
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if not track:
+                return False
+            return len(track.embeddings) >= self.EMBEDDING_COLLECTION_FRAMES
 
-    def start_registration_phase(self, track_id):
-        """Switch to registration phase for a track"""
-        if track_id in self.face_tracking:
-            track_info = self.face_tracking[track_id]
-            track_info['phase'] = 'registration'
-            track_info['registration_embeddings'] = []  # Clear any old registration embeddings
-            track_info['evaluated'] = False  # Reset evaluation for new phase
+    def start_registration_phase(self, track_id, closest_match=None):
+        """Switch to registration phase for a track, remembering the best candidate recognition found"""
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if track is None:
+                return
+            if closest_match is not None:
+                track.closest_match = closest_match
+            track.can_register = True
+            track.phase = 'registration'
+            track.registration_embeddings.clear()  # Clear any old registration embeddings
+            track.evaluated = False  # Reset evaluation for new phase
 
     def get_average_embedding(self, track_id):
         """Get average embedding for current phase"""
-        track_info = self.face_tracking[track_id]
-        embeddings = (track_info['registration_embeddings'] 
-                     if track_info['phase'] == 'registration' 
-                     else track_info['recognition_embeddings'])
-        
-        if not embeddings:
-            return None
-            
-        # Convert list of embeddings to numpy array
-        embeddings_array = np.array(embeddings)
-        
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if track is None or not len(track.embeddings):
+                return None
+            embeddings = track.embeddings.embeddings()
+
         # Calculate simple average without weights
-        avg_embedding = np.mean(embeddings_array, axis=0)
-        
+        avg_embedding = np.mean(embeddings, axis=0)
+
         # Normalize the averaged embedding
         avg_embedding = avg_embedding / np.linalg.norm(avg_embedding)
         return avg_embedding
 
     def start_post_registration_collection(self, track_id):
         """Start collecting additional embeddings after registration"""
-        if track_id in self.face_tracking:
-            track_info = self.face_tracking[track_id]
-            track_info['post_registration_embeddings'] = 0
-            track_info['needs_more_embeddings'] = True
-            track_info['recognition_embeddings'] = []  # Clear existing embeddings
-            track_info['embedding_qualities'] = []
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if track is None:
+                return
+            track.post_registration_embeddings = 0
+            track.needs_more_embeddings = True
+            track.recognition_embeddings.clear()  # Clear existing embeddings
             if DEBUG_MODE:
-                face_logger.log(f"Starting post-registration embedding collection for {track_info['name']}", "INFO")
+                face_logger.log(f"Starting post-registration embedding collection for {track.name}", "INFO")
 
     def needs_more_embeddings(self, track_id):
         """Check if we need to collect more embeddings for this track"""
-        if track_id in self.face_tracking:
-            track_info = self.face_tracking[track_id]
-            return track_info.get('needs_more_embeddings', False)
-        return False
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            return track is not None and track.needs_more_embeddings
 
     def increment_post_registration_embeddings(self, track_id):
         """Increment the counter for post-registration embeddings"""
-        if track_id in self.face_tracking:
-            track_info = self.face_tracking[track_id]
-            track_info['post_registration_embeddings'] += 1
-            if track_info['post_registration_embeddings'] >= 5:
-                track_info['needs_more_embeddings'] = False
+        with self._lock:
+            track = self.face_tracking.get(track_id)
+            if track is None:
+                return 0
+            track.post_registration_embeddings += 1
+            if track.post_registration_embeddings >= 5:
+                track.needs_more_embeddings = False
             if DEBUG_MODE:
-                face_logger.log(f"Post-registration embeddings for {track_info['name']}: {track_info['post_registration_embeddings']}/5", "INFO")
-            return track_info['post_registration_embeddings']
-        return 0
+                face_logger.log(f"Post-registration embeddings for {track.name}: {track.post_registration_embeddings}/5", "INFO")
+            return track.post_registration_embeddings
 
     def _handle_registration(self, face_features, face_bbox, frame):
         """Handle face registration process"""
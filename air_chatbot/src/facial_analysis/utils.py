@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 from logger import face_logger
+from quality import face_pose_reason, quality_gate
 
 def calculate_iou(box1, box2):
     """Calculate IoU between two bounding boxes"""
@@ -22,6 +23,23 @@ def calculate_iou(box1, box2):
     face_logger.log(f"IoU calculated: {iou:.4f} between boxes {box1} and {box2}", "INFO")
     return iou
 
+def iou_matrix(boxes1, boxes2):
+    """Calculate IoU between every pair of boxes, returns a (len(boxes1), len(boxes2)) array"""
+    # box format: (x1, y1, x2, y2)
+    boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+    
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
 def calculate_brightness(img):
     """Calculate the average brightness of an image"""
     if len(img.shape) == 3:
@@ -40,108 +58,12 @@ def check_face_pose(face_img, landmarks):
     Check if face is frontal/straight using facial landmarks
     Returns (is_straight, reason)
     """
-    if landmarks is None:
-        face_logger.log("No landmarks detected for pose check", "WARNING")
-        return False, "No landmarks detected"
-        
-    # Get key landmarks for pose estimation
-    left_eye = landmarks[0]
-    right_eye = landmarks[1]
-    nose = landmarks[2]
-    left_mouth = landmarks[3]
-    right_mouth = landmarks[4]
-    
-    # Calculate eye angle to check if face is tilted - make more strict
-    eye_angle = np.degrees(np.arctan2(right_eye[1] - left_eye[1], right_eye[0] - left_eye[0]))
-    if abs(eye_angle) > 10:  # More strict: 10 degrees instead of 15
-        face_logger.log(f"Face pose rejected: tilted {eye_angle:.1f} degrees", "INFO")
-        return False, "Face is tilted"
-    
-    # Check if face is turned sideways using eye distance ratio - make more strict
-    eye_distance = np.linalg.norm(right_eye - left_eye)
-    face_width = face_img.shape[1]
-    eye_ratio = eye_distance / face_width
-    if eye_ratio < 0.25:  # More strict: 0.25 instead of 0.2
-        face_logger.log(f"Face pose rejected: not frontal (eye ratio {eye_ratio:.2f})", "INFO")
-        return False, "Face is not frontal"
-    
-    # Check nose position relative to eyes (horizontal center) - make more strict
-    eye_center = (left_eye + right_eye) / 2
-    nose_offset = abs(nose[0] - eye_center[0]) / face_width
-    if nose_offset > 0.08:  # More strict: 0.08 instead of 0.1
-        face_logger.log(f"Face pose rejected: turned sideways (nose offset {nose_offset:.2f})", "INFO")
-        return False, "Face is turned sideways"
-        
-    # Check vertical angle (looking up/down) - make more strict
-    eye_level = (left_eye[1] + right_eye[1]) / 2
-    mouth_level = (left_mouth[1] + right_mouth[1]) / 2
-    nose_to_eye = nose[1] - eye_level
-    nose_to_mouth = mouth_level - nose[1]
-    vertical_ratio = nose_to_eye / nose_to_mouth if nose_to_mouth != 0 else float('inf')
-    
-    # More strict ratios for vertical angle
-    if vertical_ratio < 0.8:  # Looking up (was 0.7)
-        face_logger.log(f"Face pose rejected: looking up (ratio {vertical_ratio:.2f})", "INFO")
-        return False, "Face is looking up"
-    if vertical_ratio > 1.5:  # Looking down (was 1.5)
-        face_logger.log(f"Face pose rejected: looking down (ratio {vertical_ratio:.2f})", "INFO")
-        return False, "Face is looking down"
-    
-    face_logger.log("Face pose check passed", "INFO")
-    return True, None
+    reason = face_pose_reason(landmarks, face_img.shape[1])
+    return reason is None, reason
 
 def check_face_quality(face_img, landmarks=None, for_registration=False):
-    """Check various quality metrics of a face image"""
-    try:
-        # Check brightness (existing check)
-        brightness = calculate_brightness(face_img)
-        if brightness < 65:
-            face_logger.log(f"Face quality check failed: too dark ({brightness:.1f})", "INFO")
-            return False, "Too dark"
-        if brightness > 165:
-            face_logger.log(f"Face quality check failed: too bright ({brightness:.1f})", "INFO")
-            return False, "Too bright"
-        
-        # Check blur - make it stricter for registration
-        gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-        blur_value = cv2.Laplacian(gray, cv2.CV_64F).var()
-        
-        if blur_value < 20:  # Basic check for recognition
-            face_logger.log(f"Face quality check failed: too blurry ({blur_value:.1f})", "INFO")
-            return False, "Too blurry"
-            
-        # Check face size - stricter for registration
-        height, width = face_img.shape[:2]
-        min_dimension = min(height, width)
-        
-        if min_dimension < 80:  # Stricter size requirement for registration
-            face_logger.log(f"Face quality check failed: too small ({min_dimension}px)", "INFO")
-            return False, "Face too small for registration"
-            
-        # Check face aspect ratio (to detect partial faces)
-        aspect_ratio = height / width
-        if for_registration:
-            if not (0.5 <= aspect_ratio <= 1.5):  # Stricter aspect ratio for registration
-                face_logger.log(f"Face quality check failed: invalid proportions for registration ({aspect_ratio:.2f})", "INFO")
-                return False, "Invalid face proportions for registration"
-        else:
-            if not (0.5 <= aspect_ratio <= 1.5):  # Basic check for recognition
-                face_logger.log(f"Face quality check failed: invalid proportions ({aspect_ratio:.2f})", "INFO")
-                return False, "Invalid face proportions"
-        
-        # Face pose checks only for registration
-        if for_registration and landmarks is not None:
-            is_straight, pose_reason = check_face_pose(face_img, landmarks)
-            if not is_straight:
-                face_logger.log(f"Face quality check failed: {pose_reason}", "INFO")
-                return False, f"Poor face pose: {pose_reason}"
-        
-        face_logger.log("Face quality check passed", "INFO")
-        return True, None
-        
-    except Exception as e:
-        face_logger.log(f"Face quality check failed with error: {str(e)}", "ERROR")
-        return False, f"Quality check failed: {str(e)}"
+    """Check various quality metrics of a face image, see quality.QualityGate"""
+    return quality_gate.check(face_img, landmarks, for_registration=for_registration)
 
 def get_embedding_based_threshold(embedding_count):
     """
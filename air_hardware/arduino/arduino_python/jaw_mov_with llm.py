@@ -1,31 +1,32 @@
 import os
+import sys
 import openai
 
 from openai import OpenAI
-from gtts import gTTS
 import serial
-from pygame import mixer
 import speech_recognition as sr
 import time
 from dotenv import load_dotenv
-# Initialize pygame mixer
-mixer.init()
+
+# The TTS service lives in air_ML; it only needs pygame and numpy
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../air_ML/src/audio')))
+from tts_service import TTSService, JawController, create_engine
 
 # Setup serial connection (Update the port name to the one used by your Arduino)
 ser = serial.Serial('/dev/cu.usbmodem11101', 9600)
 time.sleep(2)  # Give some time for the serial connection to establish
 
+# gTTS first, espeak when offline (gTTS is skipped for a minute after it fails);
+# repeated replies are played from the cache
+tts = TTSService(
+    [create_engine("gtts"), create_engine("espeak")],
+    cache_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache"),
+    jaw=JawController(ser)
+)
+
 def speak(text):
-    print("Generating speech...")
-    tts = gTTS(text=text, lang='en', tld='com', slow=False)  # Create speech
-    tts.save("output.mp3")  # Save the speech to an mp3 file
-    mixer.music.load("output.mp3")  # Load the mp3 file
     print("Speaking: " + text)
-    ser.write(b's')  # Send command to start jaw movement
-    mixer.music.play()  # Play the speech
-    while mixer.music.get_busy():  # Wait for the speech to finish
-        time.sleep(0.1)
-    ser.write(b'e')  # Send command to stop jaw movement
+    tts.speak(text)  # Jaw opens and closes with the speech envelope
     print("Speech and jaw movement completed.")
 
 def handle_response(text):
@@ -29,7 +29,11 @@ void loop() {
     char command = Serial.read(); // Read the incoming command
     Serial.print("Received command: "); Serial.println(command); // Debug print
 
-    if (command == 's') { // Start movement
+    if (command == 'o') { // Open, timed by the speech envelope on the Python side
+      pwm.setPWM(SERVO_PIN, 0, pulseLengthToPWM(PULSE_END));
+    } else if (command == 'c') { // Close
+      pwm.setPWM(SERVO_PIN, 0, pulseLengthToPWM(PULSE_START));
+    } else if (command == 's') { // Start movement
       Serial.println("Starting jaw movement...");
       while (true) {
         // Check for stop command continuously within the loop